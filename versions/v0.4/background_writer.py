@@ -0,0 +1,95 @@
+"""
+Background saving for MZ
+Moves memory writes off the REPL thread and coalesces rapid saves
+"""
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger('MZ')
+
+
+class BackgroundWriter:
+    """
+    Debounced writer thread in front of a storage backend.
+
+    save() only captures the changes (store.prepare) and returns; the
+    thread waits until saves have been quiet for `delay` seconds (but
+    never longer than `max_delay`) and writes everything queued in one
+    go (store.write). Pending saves are flushed when the program exits,
+    and any compaction they start is waited for.
+    """
+
+    def __init__(self, store, delay=0.5, max_delay=5.0):
+        self.store = store
+        self.delay = delay
+        self.max_delay = max_delay
+
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        # Held while writing so flush() and the thread never write at the same time
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="mz-writer", daemon=True)
+        self._thread.start()
+
+        atexit.register(self.close)
+
+    def save(self, memory):
+        """Queue the changes in memory for writing. Never blocks on disk."""
+        batch = self.store.prepare(memory)
+        if batch is None:
+            return
+
+        with self._pending_lock:
+            self._pending.append(batch)
+        self._wake.set()
+
+    def flush(self):
+        """Write everything queued so far, on the calling thread."""
+        with self._write_lock:
+            with self._pending_lock:
+                batches, self._pending = self._pending, []
+
+            if not batches:
+                return
+
+            try:
+                self.store.write(batches)
+            except Exception as e:
+                logger.error(f"Failed to save memory: {e}")
+                # Put them back so the next flush retries them in order
+                with self._pending_lock:
+                    self._pending = batches + self._pending
+
+    def close(self):
+        """Stop the writer thread and flush pending saves. Safe to call twice."""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+        # The last write may have started a compaction on a daemon thread, which
+        # exiting would cut off halfway through writing the new snapshot
+        if hasattr(self.store, "wait_for_compaction"):
+            self.store.wait_for_compaction()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait()
+
+            # Debounce: keep waiting while saves keep arriving, up to max_delay
+            deadline = time.monotonic() + self.max_delay
+            while not self._closed:
+                self._wake.clear()
+                if not self._wake.wait(self.delay) or time.monotonic() >= deadline:
+                    break
+
+            if not self._closed:
+                self.flush()
@@ -0,0 +1,515 @@
+"""
+Benchmarks for MZ storage and task code
+
+Usage:
+    python benchmarks.py                # run everything
+    python benchmarks.py snapshot       # just one benchmark
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+
+import binary_format
+import migrations
+from task_store import TaskStore
+
+
+def synthetic_memory(messages=100_000, tasks=20_000):
+    """Build a memory dict shaped like a long-running install"""
+    return {
+        "conversations": [
+            {
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"Message {i}: can you help me plan the rest of the week around CS50P and job applications?"
+            }
+            for i in range(messages)
+        ],
+        "tasks": [
+            {
+                "id": f"task_{i:08x}",
+                "content": f"Task {i}: finish the next chapter",
+                "priority": ("high", "medium", "low")[i % 3],
+                "category": ("learning", "job_search", "mz_development", "personal")[i % 4],
+                "due_date": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                "priority_reasoning": None,
+                "completed": i % 5 == 0,
+                "created_at": "2025-12-01T09:00:00.000000",
+                "completed_at": None
+            }
+            for i in range(tasks)
+        ]
+    }
+
+
+def timed(function, repeat=3):
+    """Best wall-clock time of `repeat` runs, in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_snapshot():
+    """JSON (indent=4) vs binary snapshot: size, save and load time"""
+    memory = synthetic_memory()
+    directory = tempfile.mkdtemp()
+    json_path = os.path.join(directory, "memory.json")
+    binary_path = os.path.join(directory, "memory.mzb")
+
+    def save_json():
+        with open(json_path, "w") as f:
+            json.dump(memory, f, indent=4)
+
+    def load_json():
+        with open(json_path, "r") as f:
+            json.load(f)
+
+    results = [
+        ("json indent=4", timed(save_json), timed(load_json), json_path),
+        ("binary", timed(lambda: binary_format.dump(memory, binary_path)),
+         timed(lambda: binary_format.load(binary_path)), binary_path),
+    ]
+
+    print(f"{len(memory['conversations'])} messages, {len(memory['tasks'])} tasks")
+    print(f"{'format':<16}{'size (MB)':>12}{'save (s)':>12}{'load (s)':>12}")
+    for name, save_time, load_time, path in results:
+        size = os.path.getsize(path) / 1_000_000
+        print(f"{name:<16}{size:>12.1f}{save_time:>12.3f}{load_time:>12.3f}")
+
+
+def bench_migrate():
+    """Streaming schema 2 -> 3 migration of a large memory.json"""
+    memory = synthetic_memory(messages=500_000, tasks=50_000)
+    # Schema 2 tasks don't carry the fields added since
+    for task in memory["tasks"]:
+        del task["priority_reasoning"], task["completed_at"]
+
+    path = os.path.join(tempfile.mkdtemp(), "memory.json")
+    with open(path, "w") as f:
+        json.dump(memory, f, indent=4)
+    size = os.path.getsize(path) / 1_000_000
+    del memory
+
+    start = time.perf_counter()
+    result = migrations.migrate_file(path)
+    elapsed = time.perf_counter() - start
+
+    print(f"{result['messages']} messages, {result['tasks']} tasks, {size:.1f} MB")
+    print(f"schema {result['from_version']} -> {result['to_version']} in {elapsed:.2f}s ({size / elapsed:.1f} MB/s)")
+
+    # Already current: only the head of the file is read
+    print(f"re-run on current file: {timed(lambda: migrations.migrate_file(path)) * 1000:.2f} ms")
+
+
+def bench_tasks():
+    """Indexed TaskStore queries vs scanning the task list"""
+    tasks = synthetic_memory(messages=0, tasks=100_000)["tasks"]
+    store = TaskStore(tasks)
+
+    queries = [
+        {"category": "learning", "due_before": "2026-01-07"},
+        {"completed": False, "category": "learning", "priority": "high", "due_before": "2026-01-31"},
+    ]
+
+    print(f"{len(tasks)} tasks")
+    print(f"{'query':<70}{'matches':>8}{'scan (ms)':>11}{'index (ms)':>12}")
+    for query in queries:
+        def scan():
+            return [task for task in tasks
+                    if all(task[field] == value for field, value in query.items() if field != "due_before")
+                    and task["due_date"] <= query["due_before"]]
+
+        def indexed():
+            return store.list_tasks(**query)
+
+        assert scan() == indexed()
+        label = ", ".join(f"{field}={value}" for field, value in query.items())
+        print(f"{label:<70}{len(indexed()):>8}{timed(scan) * 1000:>11.2f}{timed(indexed) * 1000:>12.2f}")
+
+    print(f"get by id x1000: {timed(lambda: [store.get(f'task_{i:08x}') for i in range(1000)]) * 1000:.2f} ms")
+
+
+def bench_next():
+    """Top-k "what next" from the scheduler heap vs sorting every task"""
+    tasks = synthetic_memory(messages=0, tasks=100_000)["tasks"]
+    store = TaskStore(tasks)
+    order = ["urgent", "high", "medium", "low"]
+    ranks = {priority: rank for rank, priority in enumerate(order)}
+
+    def by_sorting():
+        active = [task for task in tasks if not task["completed"]]
+        active.sort(key=lambda task: (task["due_date"], ranks[task["priority"]], task["created_at"], task["id"]))
+        return active[:10]
+
+    # The first call builds the heap
+    build = timed(lambda: store.next_tasks(10, order), repeat=1)
+    assert by_sorting() == store.next_tasks(10, order)
+
+    print(f"{len(tasks)} tasks, top 10")
+    print(f"sort everything: {timed(by_sorting) * 1000:8.2f} ms")
+    print(f"first heap call: {build * 1000:8.2f} ms")
+    print(f"heap after that: {timed(lambda: store.next_tasks(10, order)) * 1000:8.2f} ms")
+
+
+def bench_bulk():
+    """500 tasks added one save at a time vs one add_tasks batch and a single save"""
+    import task_manager
+    from memory_store import MemoryStore
+
+    specs = [{"content": f"Imported task {i}", "priority": "medium", "due_date": "2026-03-01"} for i in range(500)]
+
+    def one_by_one():
+        store = MemoryStore(os.path.join(tempfile.mkdtemp(), "memory.json"))
+        memory = store.load()
+        for spec in specs:
+            task_manager.add_task(memory, **spec)
+            store.save(memory)
+
+    def batch():
+        store = MemoryStore(os.path.join(tempfile.mkdtemp(), "memory.json"))
+        memory = store.load()
+        task_manager.add_tasks(memory, specs)
+        store.save(memory)
+
+    print(f"{len(specs)} tasks into a journaled memory.json")
+    print(f"add_task + save each: {timed(one_by_one, repeat=1) * 1000:8.1f} ms")
+    print(f"add_tasks + one save: {timed(batch, repeat=1) * 1000:8.1f} ms")
+
+
+def bench_search():
+    """Full-text task search at 100k tasks, index vs scanning every task"""
+    rng = random.Random(42)
+    syllables = ["ka", "ro", "mi", "te", "su", "lo", "ne", "pa", "vi", "do", "re", "zu"]
+    vocabulary = sorted({"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(5000)})
+
+    tasks = synthetic_memory(messages=0, tasks=100_000)["tasks"]
+    for task in tasks:
+        task["content"] = " ".join(rng.choices(vocabulary, k=6))
+    store = TaskStore(tasks)
+
+    start = time.perf_counter()
+    store.search("warm up")
+    build = time.perf_counter() - start
+
+    queries = [vocabulary[100], f"{vocabulary[200]} {vocabulary[300]}", vocabulary[400][:4], f"{vocabulary[500]} {vocabulary[600][:3]}"]
+
+    def scan(query):
+        terms = query.split()
+        return [task for task in tasks if all(any(word.startswith(term) for word in task["content"].split()) for term in terms)]
+
+    print(f"{len(tasks)} tasks, {len(vocabulary)} distinct words, index built in {build * 1000:.0f} ms")
+    print(f"{'query':<24}{'matches':>8}{'scan (ms)':>11}{'index (ms)':>12}")
+    for query in queries:
+        matches = store.search(query)
+        assert len(matches) == len(scan(query))
+        print(f"{query:<24}{len(matches):>8}{timed(lambda: scan(query), repeat=1) * 1000:>11.1f}"
+              f"{timed(lambda: store.search(query, limit=10)) * 1000:>12.3f}")
+
+
+def bench_table():
+    """Dict-per-task TaskStore vs columnar TaskTable: memory and filter time"""
+    import task_table
+    from task_table import TaskTable
+
+    count = 200_000
+    query = {"completed": False, "category": "learning", "priority": "high", "due_before": "2026-01-31"}
+
+    def measure(build):
+        tracemalloc.start()
+        store = build(synthetic_memory(messages=0, tasks=count)["tasks"])
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return store, size
+
+    store, store_size = measure(TaskStore)
+    table, table_size = measure(TaskTable)
+    assert table.list_tasks(**query) == store.list_tasks(**query)
+
+    # Row numbers only - building the result dicts costs the same either way
+    filters = [("python", None)]
+    if task_table.np is not None:
+        filters.append(("numpy", task_table.np))
+
+    print(f"{count} tasks, query {query}")
+    print(f"TaskStore: {store_size / 1_000_000:7.1f} MB, list_tasks {timed(lambda: store.list_tasks(**query)) * 1000:7.2f} ms")
+    print(f"TaskTable: {table_size / 1_000_000:7.1f} MB, list_tasks {timed(lambda: table.list_tasks(**query)) * 1000:7.2f} ms")
+    for name, numpy in filters:
+        task_table.np = numpy
+        print(f"  {name} filter only: {timed(lambda: table._matching_rows(**query)) * 1000:7.2f} ms")
+    task_table.np = filters[-1][1]
+    if task_table.np is None:
+        print("  (numpy not installed)")
+
+
+def legacy_validate(content, priority, category, due_date, config):
+    """validate_task_input as it was before TaskValidator, for comparison"""
+    from datetime import datetime
+
+    VALID_PRIORITIES = config['tasks']['valid_priorities']
+    VALID_CATEGORIES = config['tasks']['valid_categories']
+    errors = []
+    if not content or len(content.strip()) == 0:
+        errors.append("Task content cannot be empty")
+    if priority and priority not in VALID_PRIORITIES:
+        errors.append(f"Invalid priority: {priority}. Must be one of: {VALID_PRIORITIES}")
+    if category:
+        if category not in VALID_CATEGORIES:
+            errors.append(f"Invalid category: {category}. Must be one of: {VALID_CATEGORIES}")
+    if due_date:
+        try:
+            datetime.strptime(due_date, "%Y-%m-%d")
+        except ValueError:
+            errors.append(f"Invalid date format: {due_date}. Must be YYYY-MM-DD")
+    return errors
+
+
+def bench_validate():
+    """Validating a 100k-task import: old validate_task_input vs TaskValidator"""
+    from config import load_config
+    from task_validator import TaskValidator
+
+    config = load_config()
+    validator = TaskValidator.from_config(config["tasks"])
+    specs = [(task["content"], task["priority"], task["category"], task["due_date"])
+             for task in synthetic_memory(messages=0, tasks=100_000)["tasks"]]
+    # Every 50th task has a mistake, like a real import might
+    for i in range(0, len(specs), 50):
+        specs[i] = (specs[i][0], "whenever", specs[i][2], "2026-02-31")
+
+    def old():
+        return [legacy_validate(*spec, config) for spec in specs]
+
+    def new():
+        return [validator.check(*spec) for spec in specs]
+
+    assert [[str(e) for e in errors] for errors in new()] == old()
+    print(f"{len(specs)} tasks")
+    print(f"validate_task_input (strptime, list lookups): {timed(old) * 1000:8.1f} ms")
+    print(f"TaskValidator (fromisoformat, frozensets):     {timed(new) * 1000:8.1f} ms")
+
+
+
+def bench_page():
+    """/task list: rendering every active task with += vs one page with join"""
+    tasks = synthetic_memory(messages=0, tasks=100_000)["tasks"]
+    store = TaskStore(tasks)
+
+    def describe(task):
+        # Same shape as monozukuri.format_task, which can't be imported without an API key
+        return f"[{task['priority'].upper()}] {task['content']}\n  ID: {task['id']}\n  Due: {task['due_date']}\n"
+
+    def everything():
+        result = ""
+        for task in store.list_tasks(completed=False):
+            result += describe(task) + "\n"
+        return result
+
+    def one_page(page):
+        start = (page - 1) * 50
+        parts = [describe(task) + "\n" for task in islice(store.iter_tasks(completed=False), start, start + 50)]
+        return "".join(parts)
+
+    print(f"{len(store.list_tasks(completed=False))} active tasks")
+    print(f"whole list, += concatenation: {timed(everything) * 1000:8.2f} ms")
+    for page in (1, 20, 1000):
+        print(f"page {page:>4} of 50, join:         {timed(lambda: one_page(page)) * 1000:8.2f} ms")
+
+
+def bench_repeat():
+    """Due dates in a one-week window: repeating tasks expanded lazily vs stored one task per date"""
+    import task_manager
+    from datetime import date, timedelta
+
+    rules = ("daily", "weekly", "3d", "monthly")
+    memory = {"tasks": []}
+    task_manager.add_tasks(memory, [
+        {"content": f"Chore {i}", "due_date": "2026-01-01", "repeat": rules[i % 4]} for i in range(1000)
+    ])
+
+    # The same schedule stored the naive way: one task for every date, three years ahead
+    stored = {"tasks": []}
+    first = date(2026, 1, 1)
+    for task in memory["tasks"]:
+        step = {"daily": 1, "weekly": 7, "3d": 3, "monthly": 30}[rules[int(task["content"].split()[1]) % 4]]
+        for n in range(0, 3 * 365, step):
+            stored["tasks"].append({"id": f"{task['id']}-{n}", "content": task["content"],
+                                    "due_date": (first + timedelta(days=n)).isoformat(), "completed": False})
+    stored_tasks = TaskStore(stored["tasks"])
+
+    for start in ("2026-02-01", "2028-06-01"):
+        end = (date.fromisoformat(start) + timedelta(days=6)).isoformat()
+
+        def lazy():
+            return list(task_manager.iter_occurrences(memory, start, end))
+
+        def materialized():
+            return [task for task in stored_tasks.list_tasks(due_before=end) if task["due_date"] >= start]
+
+        print(f"week of {start}: repeat rules {timed(lazy) * 1000:7.2f} ms ({len(lazy())} dates), "
+              f"one task per date {timed(materialized) * 1000:7.2f} ms ({len(materialized())} dates)")
+    print(f"tasks stored: {len(memory['tasks'])} with rules, {len(stored_tasks)} one per date")
+
+
+def bench_reminders():
+    """Reminder wheel: filing/cancelling tasks and a check, vs scanning every task per check"""
+    from datetime import date
+    from reminders import ReminderWheel
+
+    tasks = [task for task in synthetic_memory(messages=0, tasks=100_000)["tasks"] if not task["completed"]]
+    today = date(2026, 1, 3)
+
+    def scan():
+        return [task for task in tasks if not task["completed"] and task["due_date"] <= today.isoformat()]
+
+    wheel = ReminderWheel(tasks)
+    ids = [task["id"] for task in wheel.pop_due(today)]
+    assert sorted(ids) == sorted(task["id"] for task in scan())
+
+    def check():
+        return wheel.pop_due(today)
+
+    def churn():
+        for task in tasks[:1000]:
+            wheel.task_deleted(task["id"])
+            wheel.task_changed(task)
+
+    print(f"{len(wheel) + len(ids)} active tasks with due dates, {len(ids)} due by {today}")
+    print(f"scan every task per check:     {timed(scan) * 1000:8.3f} ms")
+    print(f"wheel check (nothing new due): {timed(check) * 1000:8.3f} ms")
+    print(f"wheel cancel + refile x1000:   {timed(churn) * 1000:8.3f} ms")
+
+
+def bench_undo():
+    """Memory for 200 undo levels: the change log vs a deep copy of memory per change"""
+    import copy
+    import task_manager
+    from undo_log import UndoLog
+
+    memory = {"tasks": synthetic_memory(messages=0, tasks=20_000)["tasks"]}
+    task_manager.history = UndoLog(200)
+    ids = [task["id"] for task in memory["tasks"]]
+    task_manager.list_tasks(memory)  # Build the store and its indexes first, so only the log is measured
+
+    tracemalloc.start()
+    for task_id in ids[:200]:
+        task_manager.complete_task(memory, task_id)
+    log_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    snapshots = [copy.deepcopy(list(memory["tasks"])) for _ in range(5)]
+    copy_bytes = tracemalloc.get_traced_memory()[0] / len(snapshots) * 200
+    tracemalloc.stop()
+
+    print(f"{len(ids)} tasks, 200 completes")
+    print(f"undo log:               {log_bytes / 1024:10.0f} KiB")
+    print(f"deep copy per change:   {copy_bytes / 1024:10.0f} KiB (estimated from 5 copies)")
+    print(f"undo all 200: {timed(lambda: [task_manager.undo(memory) for _ in range(200)], repeat=1) * 1000:.2f} ms")
+
+
+def topological_ready(tasks):
+    """Ready tasks the way it would be done without a kept graph: a full Kahn pass per query"""
+    active = {task["id"] for task in tasks if not task["completed"]}
+    waiting = {task["id"]: sum(1 for d in task.get("depends_on", ()) if d in active) for task in tasks}
+    return [task for task in tasks if task["id"] in active and not waiting[task["id"]]]
+
+
+def bench_ready():
+    """/task ready: incrementally kept ready set vs recomputing from every task per query"""
+    tasks = synthetic_memory(messages=0, tasks=100_000)["tasks"]
+    # Chains of 10: each task waits on the one before it
+    for i, task in enumerate(tasks):
+        task["completed"] = False
+        if i % 10:
+            task["depends_on"] = [tasks[i - 1]["id"]]
+    store = TaskStore(tasks)
+    store.ready_tasks()
+
+    assert store.ready_tasks() == topological_ready(tasks)
+    print(f"{len(tasks)} tasks in chains of 10, {len(store.ready_tasks())} ready")
+    print(f"recompute per query:        {timed(lambda: topological_ready(tasks)) * 1000:8.2f} ms")
+    print(f"kept ready set:             {timed(store.ready_tasks) * 1000:8.2f} ms")
+
+    def complete_heads():
+        for i in range(0, 10_000, 10):
+            store.update(tasks[i]["id"], completed=True)
+
+    print(f"complete 1000 chain heads:  {timed(complete_heads, repeat=1) * 1000:8.2f} ms")
+
+
+def bench_duplicates():
+    """Near-duplicate check for a new task: MinHash LSH index vs comparing with every task"""
+    from duplicates import SimilarityIndex, jaccard, shingles
+
+    rng = random.Random(7)
+
+    def words(count):
+        return ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9))) for _ in range(count)]
+
+    # Tasks like "<verb> <person> <thing> <thing>", from a few thousand made-up words
+    verbs, people, nouns = words(200), words(300), words(3000)
+
+    def task_text():
+        return f"{rng.choice(verbs)} {rng.choice(people)} {rng.choice(nouns)} {rng.choice(nouns)}"
+
+    queries = [task_text() for _ in range(100)]
+    print(f"{len(queries)} checks against:")
+    for size in (10_000, 50_000, 100_000):
+        texts = [task_text() for _ in range(size)]
+        index = SimilarityIndex()
+        build = timed(lambda: [index.add(i, text) for i, text in enumerate(texts)], repeat=1)
+        all_shingles = [shingles(text) for text in texts]
+
+        def scan():
+            for query in queries:
+                pieces = shingles(query)
+                [i for i, other in enumerate(all_shingles) if jaccard(pieces, other) >= 0.6]
+
+        def lsh():
+            for query in queries:
+                index.similar(query)
+
+        print(f"{size:>7} tasks: scan {timed(scan, repeat=1) * 1000:8.1f} ms, LSH {timed(lsh) * 1000:6.1f} ms"
+              f"  (index built in {build:.1f} s)")
+
+BENCHMARKS = {
+    "snapshot": bench_snapshot,
+    "migrate": bench_migrate,
+    "tasks": bench_tasks,
+    "next": bench_next,
+    "bulk": bench_bulk,
+    "search": bench_search,
+    "table": bench_table,
+    "validate": bench_validate,
+    "page": bench_page,
+    "repeat": bench_repeat,
+    "reminders": bench_reminders,
+    "undo": bench_undo,
+    "ready": bench_ready,
+    "duplicates": bench_duplicates,
+}
+
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name}. Available: {', '.join(BENCHMARKS)}")
+            return 1
+
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,336 @@
+"""
+Compact binary snapshot format for MZ memory
+
+Layout (all integers little-endian):
+
+    header      b"MZB\\0", u16 format version, u16 flags (unused)
+    strings     u32 count, then per string: u16 length + UTF-8 bytes
+    messages    u32 count, then one record per message
+    tasks       u32 count, then one record per task
+    extras      one record: a dict of any other top-level keys
+
+Every record is a u32 byte length followed by one encoded value, so a
+reader can skip or stop at a damaged record. Dict keys, message roles and
+task priorities/categories are stored once in the string table and
+referenced by index.
+
+Usage:
+    python binary_format.py to-binary memory.json memory.mzb
+    python binary_format.py to-json memory.mzb memory.json
+"""
+import json
+import struct
+import sys
+
+MAGIC = b"MZB\0"
+FORMAT_VERSION = 1
+
+# Values that repeat across records and are worth interning
+INTERNED_FIELDS = ("role", "priority", "category")
+
+# Value tags
+NONE, FALSE, TRUE, INT, FLOAT, STRING, INTERNED, LIST, DICT, MESSAGE = range(10)
+
+HEADER = struct.Struct("<4sHH")
+U8 = struct.Struct("<B")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+I64 = struct.Struct("<q")
+F64 = struct.Struct("<d")
+# MESSAGE fast path: role index + content length
+MESSAGE_HEAD = struct.Struct("<HI")
+
+
+class BinaryFormatError(ValueError):
+    """Raised when a file isn't a valid MZ binary snapshot"""
+
+
+def is_binary_snapshot(path):
+    """True if the file at path starts with the binary snapshot magic"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# --------------------------------------------------
+# Encoding
+# --------------------------------------------------
+
+def _collect_strings(memory):
+    strings = {}
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key not in strings:
+                    strings[key] = len(strings)
+                if key in INTERNED_FIELDS and isinstance(item, str) and item not in strings:
+                    strings[item] = len(strings)
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(list(memory["conversations"]))
+    walk(list(memory["tasks"]))
+
+    extras = {key: value for key, value in memory.items() if key not in ("conversations", "tasks")}
+    walk(extras)
+
+    return strings, extras
+
+
+def _encode(value, strings, out):
+    if value is None:
+        out.append(U8.pack(NONE))
+    elif value is True:
+        out.append(U8.pack(TRUE))
+    elif value is False:
+        out.append(U8.pack(FALSE))
+    elif isinstance(value, int):
+        out.append(U8.pack(INT) + I64.pack(value))
+    elif isinstance(value, float):
+        out.append(U8.pack(FLOAT) + F64.pack(value))
+    elif isinstance(value, str):
+        index = strings.get(value)
+        if index is not None:
+            out.append(U8.pack(INTERNED) + U16.pack(index))
+        else:
+            data = value.encode("utf-8")
+            out.append(U8.pack(STRING) + U32.pack(len(data)) + data)
+    elif isinstance(value, (list, tuple)):
+        out.append(U8.pack(LIST) + U32.pack(len(value)))
+        for item in value:
+            _encode(item, strings, out)
+    elif isinstance(value, dict):
+        # The common {"role", "content"} message gets a compact fixed layout
+        if (len(value) == 2 and isinstance(value.get("content"), str)
+                and isinstance(value.get("role"), str) and value["role"] in strings):
+            data = value["content"].encode("utf-8")
+            out.append(U8.pack(MESSAGE) + MESSAGE_HEAD.pack(strings[value["role"]], len(data)) + data)
+            return
+
+        out.append(U8.pack(DICT) + U32.pack(len(value)))
+        for key, item in value.items():
+            if key not in strings:
+                raise BinaryFormatError(f"Key not in string table: {key}")
+            out.append(U16.pack(strings[key]))
+            _encode(item, strings, out)
+    else:
+        raise BinaryFormatError(f"Can't encode {type(value).__name__}")
+
+
+def _record(value, strings):
+    out = []
+    _encode(value, strings, out)
+    payload = b"".join(out)
+    return U32.pack(len(payload)) + payload
+
+
+def dumps(memory):
+    """
+    Encode a memory dictionary as binary snapshot bytes.
+
+    Args:
+        memory: Dictionary with 'conversations' and 'tasks' lists
+
+    Returns:
+        The encoded bytes
+    """
+    strings, extras = _collect_strings(memory)
+    if len(strings) > 0xFFFF:
+        raise BinaryFormatError("Too many distinct keys and field values to intern")
+
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, 0), U32.pack(len(strings))]
+    for value in strings:
+        data = value.encode("utf-8")
+        parts.append(U16.pack(len(data)) + data)
+
+    for section in ("conversations", "tasks"):
+        records = memory[section]
+        parts.append(U32.pack(len(records)))
+        parts.extend(_record(record, strings) for record in records)
+
+    parts.append(_record(extras, strings))
+    return b"".join(parts)
+
+
+# --------------------------------------------------
+# Decoding
+# --------------------------------------------------
+
+def _decode(data, pos, strings):
+    tag = data[pos]
+    pos += 1
+
+    if tag == MESSAGE:
+        role, length = MESSAGE_HEAD.unpack_from(data, pos)
+        pos += MESSAGE_HEAD.size
+        return {"role": strings[role], "content": data[pos:pos + length].decode("utf-8")}, pos + length
+    if tag == INTERNED:
+        return strings[U16.unpack_from(data, pos)[0]], pos + 2
+    if tag == STRING:
+        length = U32.unpack_from(data, pos)[0]
+        pos += 4
+        return data[pos:pos + length].decode("utf-8"), pos + length
+    if tag == NONE:
+        return None, pos
+    if tag == FALSE:
+        return False, pos
+    if tag == TRUE:
+        return True, pos
+    if tag == INT:
+        return I64.unpack_from(data, pos)[0], pos + 8
+    if tag == FLOAT:
+        return F64.unpack_from(data, pos)[0], pos + 8
+    if tag == DICT:
+        count = U32.unpack_from(data, pos)[0]
+        pos += 4
+        result = {}
+        for _ in range(count):
+            key = strings[data[pos] | data[pos + 1] << 8]
+            pos += 2
+            # Inline the common scalar cases - this loop is the hot path for tasks
+            item_tag = data[pos]
+            if item_tag == NONE:
+                result[key] = None
+                pos += 1
+            elif item_tag == STRING:
+                length = U32.unpack_from(data, pos + 1)[0]
+                pos += 5
+                result[key] = data[pos:pos + length].decode("utf-8")
+                pos += length
+            elif item_tag == INTERNED:
+                result[key] = strings[data[pos + 1] | data[pos + 2] << 8]
+                pos += 3
+            elif item_tag == FALSE:
+                result[key] = False
+                pos += 1
+            elif item_tag == TRUE:
+                result[key] = True
+                pos += 1
+            else:
+                result[key], pos = _decode(data, pos, strings)
+        return result, pos
+    if tag == LIST:
+        count = U32.unpack_from(data, pos)[0]
+        pos += 4
+        result = []
+        for _ in range(count):
+            item, pos = _decode(data, pos, strings)
+            result.append(item)
+        return result, pos
+
+    raise BinaryFormatError(f"Unknown value tag {tag} at byte {pos - 1}")
+
+
+def loads(data, strict=True):
+    """
+    Decode binary snapshot bytes into a memory dictionary.
+
+    Args:
+        data: The encoded bytes
+        strict: If False, stop at the first damaged record and return
+            everything read up to that point instead of raising
+
+    Returns:
+        Dictionary with 'conversations', 'tasks' and any extra keys
+    """
+    if len(data) < HEADER.size:
+        raise BinaryFormatError("File too short for a binary snapshot")
+
+    magic, version, _ = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise BinaryFormatError("Not an MZ binary snapshot")
+    if version > FORMAT_VERSION:
+        raise BinaryFormatError(f"Snapshot format v{version} is newer than this MZ (v{FORMAT_VERSION})")
+
+    memory = {"conversations": [], "tasks": []}
+    pos = HEADER.size
+
+    try:
+        count = U32.unpack_from(data, pos)[0]
+        pos += 4
+        strings = []
+        for _ in range(count):
+            length = U16.unpack_from(data, pos)[0]
+            pos += 2
+            strings.append(data[pos:pos + length].decode("utf-8"))
+            pos += length
+
+        for section in ("conversations", "tasks"):
+            records = memory[section]
+            count = U32.unpack_from(data, pos)[0]
+            pos += 4
+            for _ in range(count):
+                length = U32.unpack_from(data, pos)[0]
+                end = pos + 4 + length
+                if end > len(data):
+                    raise BinaryFormatError("Record runs past the end of the file")
+                record, _ = _decode(data, pos + 4, strings)
+                records.append(record)
+                pos = end
+
+        length = U32.unpack_from(data, pos)[0]
+        extras, _ = _decode(data, pos + 4, strings)
+        memory.update(extras)
+
+    except (struct.error, IndexError, UnicodeDecodeError, BinaryFormatError) as e:
+        if strict:
+            raise BinaryFormatError(f"Damaged binary snapshot: {e}") from e
+
+    return memory
+
+
+def load(path, strict=True):
+    """Read a binary snapshot file. See loads()."""
+    with open(path, "rb") as f:
+        return loads(f.read(), strict=strict)
+
+
+def dump(memory, path):
+    """Write memory to path as a binary snapshot (not atomic - see memory_store)."""
+    with open(path, "wb") as f:
+        f.write(dumps(memory))
+
+
+# --------------------------------------------------
+# Converter
+# --------------------------------------------------
+
+def convert(source, destination):
+    """
+    Convert a snapshot between JSON and binary, based on the source's contents.
+
+    Returns:
+        "binary" or "json" - the format written
+    """
+    if is_binary_snapshot(source):
+        with open(destination, "w") as f:
+            json.dump(load(source), f, indent=4)
+        return "json"
+
+    with open(source, "r") as f:
+        dump(json.load(f), destination)
+    return "binary"
+
+
+def main(argv):
+    if len(argv) != 3 or argv[0] not in ("to-binary", "to-json"):
+        print("Usage: python binary_format.py to-binary|to-json <source> <destination>")
+        return 1
+
+    action, source, destination = argv
+    if (action == "to-json") != is_binary_snapshot(source):
+        print(f"ERROR: {source} is not in the format '{action}' converts from")
+        return 1
+
+    written = convert(source, destination)
+    print(f"Wrote {written} snapshot to {destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
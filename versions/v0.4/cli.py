@@ -19,6 +19,7 @@ Examples:
   python monozukuri.py                    # Normal mode
   python monozukuri.py --debug            # Debug mode
   python monozukuri.py --config my.yaml  # Custom config
+  python monozukuri.py migrate            # Upgrade data/memory.json to the current schema
   
 For more information, visit: https://github.com/yalenholmes/MZ
         """
@@ -43,4 +44,17 @@ For more information, visit: https://github.com/yalenholmes/MZ
         version='MZ v0.3.0'
     )
     
+    # Maintenance commands (run instead of the chat loop)
+    subparsers = parser.add_subparsers(dest='command')
+    
+    migrate_parser = subparsers.add_parser(
+        'migrate',
+        help='Upgrade a memory file to the current schema, keeping a backup'
+    )
+    migrate_parser.add_argument(
+        'path',
+        nargs='?',
+        help='Memory file to upgrade (default: data/memory.json)'
+    )
+    
     return parser.parse_args()
\ No newline at end of file
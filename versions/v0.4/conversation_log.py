@@ -0,0 +1,353 @@
+"""
+Conversation history storage for MZ
+Append-only segment files with an offset index, paged in on demand
+"""
+import json
+import logging
+import lzma
+import os
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+logger = logging.getLogger('MZ')
+
+# Each .idx entry is the byte offset of one message line, as an unsigned 64-bit int
+OFFSET_TYPE = "Q"
+OFFSET_SIZE = array(OFFSET_TYPE).itemsize
+
+# Archive codecs for sealed segments: file suffix, compress, decompress
+CODECS = {
+    "zlib": (".zz", zlib.compress, zlib.decompress),
+    "lzma": (".xz", lzma.compress, lzma.decompress),
+}
+
+
+def recent_messages(conversations, limit):
+    """
+    Get the last `limit` messages, starting on a user message.
+
+    Works on a plain list or a ConversationLog. Claude expects the
+    conversation to open with the user, so a leading assistant reply
+    cut off from its question is dropped.
+    """
+    if limit is None:
+        return list(conversations)
+
+    window = list(conversations[-limit:]) if limit > 0 else []
+    while window and window[0].get("role") != "user":
+        window.pop(0)
+    return window
+
+
+class ConversationLog:
+    """
+    List-like conversation history that only keeps recent messages in RAM.
+
+    Messages are stored one JSON line each in seg-NNNNNN.jsonl files of at
+    most `segment_size` messages. Next to each is seg-NNNNNN.idx, the byte
+    offset of every line, so any message can be found with two seeks.
+
+    Opening the log reads just the .idx sizes plus the last `eager`
+    messages. Older messages are read a segment at a time when something
+    asks for them, and only `cache_segments` segments are kept around.
+
+    New messages are appended in memory (append) and persisted later by
+    the storage backend (write_messages), which may run on another thread.
+
+    With an archive `codec` ("zlib" or "lzma"), each segment is compressed
+    into seg-NNNNNN.jsonl.zz / .xz once it is full and never written again.
+    Reading from an archived segment decompresses it as a whole page; the
+    .idx offsets point into the uncompressed data.
+    """
+
+    def __init__(self, directory, segment_size=1000, eager=50, cache_segments=4, codec=None):
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unknown archive codec: {codec}. Must be one of: {list(CODECS)}")
+
+        self.directory = directory
+        self.segment_size = segment_size
+        self.eager = eager
+        self.cache_segments = cache_segments
+        self.codec = codec
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+
+        # Segment numbers on disk, the index of each one's first message, and how many they hold
+        self._segments = []
+        self._starts = []
+        self._counts = []
+        self._persisted = 0
+
+        # Segment number -> archive suffix, for segments that have been compressed
+        self._archived = {}
+
+        names = sorted(os.listdir(directory))
+        for name in names:
+            if name.startswith("seg-") and name.endswith(".idx"):
+                number = int(name[4:-4])
+                count = self._repair_index(number)
+                self._segments.append(number)
+                self._starts.append(self._persisted)
+                self._counts.append(count)
+                self._persisted += count
+
+                data_path, _ = self._paths(number)
+                for suffix, _, _ in CODECS.values():
+                    if os.path.basename(data_path) + suffix in names:
+                        self._archived[number] = suffix
+                        # Archived but the plain copy wasn't removed yet
+                        if os.path.exists(data_path):
+                            os.remove(data_path)
+
+        # Recent messages, plus any that haven't been written yet
+        self._tail_start = max(0, self._persisted - eager)
+        self._tail = self._read_range(self._tail_start, self._persisted)
+
+        logger.debug(f"Conversation log opened: {self._persisted} messages, {len(self._tail)} loaded.")
+
+    # ------------------------------------------------------------------
+    # List interface
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        with self._lock:
+            return self._tail_start + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._get_range(start, stop)
+            return [self[i] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("conversation index out of range")
+
+        with self._lock:
+            if index >= self._tail_start:
+                return self._tail[index - self._tail_start]
+
+        return self._read_message(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def append(self, message):
+        """Add a message. It reaches disk on the next write_messages()."""
+        with self._lock:
+            self._tail.append(message)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def write_messages(self, first_index, messages):
+        """
+        Append messages to the segment files.
+
+        Args:
+            first_index: Position of messages[0] in the conversation
+            messages: The messages to write, in order
+
+        Messages that are already on disk are skipped, so writing the same
+        batch twice is harmless.
+        """
+        skip = max(0, self._persisted - first_index)
+        messages = messages[skip:]
+        if not messages:
+            return
+
+        while messages:
+            if not self._segments or self._counts[-1] >= self.segment_size:
+                self._start_segment()
+
+            room = self.segment_size - self._counts[-1]
+            chunk, messages = messages[:room], messages[room:]
+            self._append_to_segment(self._segments[-1], chunk)
+
+            with self._lock:
+                self._counts[-1] += len(chunk)
+                self._persisted += len(chunk)
+
+        # Only keep `eager` persisted messages in RAM - anything unwritten always stays
+        with self._lock:
+            trim = max(self._tail_start, self._persisted - self.eager) - self._tail_start
+            if trim > 0:
+                del self._tail[:trim]
+                self._tail_start += trim
+
+        if self.codec is not None:
+            self.archive_sealed()
+
+    def archive_sealed(self):
+        """Compress every full segment that isn't archived yet. Returns how many were archived."""
+        archived = 0
+        # Newest first, stopping at the first one already archived - older ones will be too.
+        # The last segment is still being appended to, unless it's full.
+        for position in range(len(self._segments) - 1, -1, -1):
+            number = self._segments[position]
+            if number in self._archived:
+                break
+
+            sealed = position < len(self._segments) - 1 or self._counts[position] >= self.segment_size
+            if sealed:
+                self._archive_segment(number)
+                archived += 1
+        return archived
+
+    def _archive_segment(self, number):
+        suffix, compress, _ = CODECS[self.codec]
+        data_path, _ = self._paths(number)
+        archive_path = data_path + suffix
+        tmp_path = archive_path + ".tmp"
+
+        with open(data_path, "rb") as f:
+            data = f.read()
+
+        # Write the archive completely before the plain file goes away
+        with open(tmp_path, "wb") as f:
+            f.write(compress(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, archive_path)
+
+        with self._lock:
+            self._archived[number] = suffix
+        os.remove(data_path)
+
+        logger.debug(f"Archived conversation segment {number} ({len(data)} bytes).")
+
+    def flush(self):
+        """Write every message that hasn't been persisted yet."""
+        with self._lock:
+            pending = self._tail[self._persisted - self._tail_start:]
+            first_index = self._persisted
+        self.write_messages(first_index, pending)
+
+    def _start_segment(self):
+        number = self._segments[-1] + 1 if self._segments else 0
+        with self._lock:
+            self._segments.append(number)
+            self._starts.append(self._persisted)
+            self._counts.append(0)
+
+    def _append_to_segment(self, number, messages):
+        data_path, index_path = self._paths(number)
+        offsets = array(OFFSET_TYPE)
+
+        # Data first, then the index: a crash in between leaves unindexed
+        # lines at the end of the data file, which are simply never read
+        with open(data_path, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            for message in messages:
+                line = (json.dumps(message) + "\n").encode("utf-8")
+                offsets.append(offset)
+                f.write(line)
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(index_path, "ab") as f:
+            offsets.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _repair_index(self, number):
+        """Drop a torn trailing .idx entry and return the segment's message count."""
+        _, index_path = self._paths(number)
+        size = os.path.getsize(index_path)
+        if size % OFFSET_SIZE:
+            logger.info(f"Repairing torn conversation index {index_path}.")
+            with open(index_path, "r+b") as f:
+                f.truncate(size - size % OFFSET_SIZE)
+        return size // OFFSET_SIZE
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _paths(self, number):
+        base = os.path.join(self.directory, f"seg-{number:06d}")
+        return base + ".jsonl", base + ".idx"
+
+    def _locate(self, index):
+        """Find the segment holding message `index`: (position in _segments, offset within it)."""
+        position = bisect_right(self._starts, index) - 1
+        return position, index - self._starts[position]
+
+    def _read_message(self, index):
+        position, within = self._locate(index)
+        return self._page(position)[within]
+
+    def _get_range(self, start, stop):
+        with self._lock:
+            tail_start = self._tail_start
+            tail = self._tail[max(0, start - tail_start):max(0, stop - tail_start)]
+
+        older = self._read_range(start, min(stop, tail_start)) if start < tail_start else []
+        return older + tail
+
+    def _read_range(self, start, stop):
+        """Read persisted messages [start, stop) straight from the segment files."""
+        messages = []
+        index = start
+        while index < stop:
+            position, within = self._locate(index)
+            count = min(self._counts[position] - within, stop - index)
+            messages.extend(self._read_segment(self._segments[position], within, count))
+            index += count
+        return messages
+
+    def _page(self, position):
+        """A whole segment's messages, from the cache or disk."""
+        number = self._segments[position]
+        page = self._pages.get(number)
+
+        # The last segment may have grown since it was cached
+        if page is None or len(page) < self._counts[position]:
+            page = self._read_segment(number, 0, self._counts[position])
+            self._pages[number] = page
+
+        self._pages.move_to_end(number)
+        while len(self._pages) > self.cache_segments:
+            self._pages.popitem(last=False)
+        return page
+
+    def _read_segment(self, number, first, count):
+        """Read `count` messages starting at position `first` within one segment."""
+        data_path, index_path = self._paths(number)
+
+        offsets = array(OFFSET_TYPE)
+        with open(index_path, "rb") as f:
+            f.seek(first * OFFSET_SIZE)
+            offsets.fromfile(f, count)
+
+        suffix = self._archived.get(number)
+        if suffix is None:
+            try:
+                messages = []
+                with open(data_path, "rb") as f:
+                    for offset in offsets:
+                        f.seek(offset)
+                        messages.append(json.loads(f.readline()))
+                return messages
+            except FileNotFoundError:
+                # Archived by the writer thread since we looked
+                suffix = self._archived[number]
+
+        decompress = next(codec[2] for codec in CODECS.values() if codec[0] == suffix)
+        with open(data_path + suffix, "rb") as f:
+            data = decompress(f.read())
+        return [json.loads(data[offset:data.index(b"\n", offset)]) for offset in offsets]
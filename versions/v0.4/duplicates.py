@@ -0,0 +1,150 @@
+"""
+Near-duplicate detection for MZ tasks
+MinHash signatures in locality-sensitive hash buckets, so similar wording is
+found without comparing a new task against every task
+"""
+import random
+import zlib
+
+from text_index import tokenize
+
+# 12 bands of 3 hashes: tasks about 60% alike almost always share a bucket,
+# tasks under 20% alike almost never do
+BANDS = 12
+ROWS = 3
+NUM_HASHES = BANDS * ROWS
+
+# Hash functions (a * x + b) mod a prime, with a fixed seed so signatures are the same every run
+_PRIME = (1 << 61) - 1
+_random = random.Random(25)
+_HASHES = [(_random.randrange(1, _PRIME), _random.randrange(_PRIME)) for _ in range(NUM_HASHES)]
+
+# Words that don't change what a task is about
+STOP_WORDS = frozenset({"a", "an", "the", "to", "for", "of", "on", "in", "at", "and", "my", "about", "with"})
+
+
+def shingles(text):
+    """
+    The pieces two texts are compared by: each word, plus its 3-letter
+    chunks so "interview" and "interviews" mostly match.
+    Numbers are only kept whole, since "week 4" and "week 5" differ.
+    """
+    result = set()
+    for word in tokenize(text):
+        if word in STOP_WORDS:
+            continue
+        result.add(word)
+        if not word.isdigit():
+            padded = f"#{word}#"
+            result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def jaccard(first, second):
+    """How alike two shingle sets are: shared / total, from 0 to 1"""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def _numbers(pieces):
+    return frozenset(piece for piece in pieces if piece.isdigit())
+
+
+class SimilarityIndex:
+    """
+    Finds texts that are nearly the same as a given one.
+
+    Each text gets a MinHash signature: for each of NUM_HASHES hash
+    functions, the smallest hash of any of its shingles. Two texts agree
+    on a signature position with probability equal to how alike they
+    are (their Jaccard similarity). The signature is cut into BANDS
+    groups of ROWS values, and each group is a bucket key - so texts
+    only get compared if they share a bucket, which similar texts very
+    likely do and unrelated ones very likely don't. The candidates are
+    then checked exactly, so there are no false matches, only the rare
+    miss.
+
+    Shingles repeat across texts a lot, so each shingle's hashes are
+    worked out once and cached.
+    """
+
+    def __init__(self):
+        # doc id -> its shingles
+        self._shingles = {}
+        # doc id -> its bucket keys
+        self._keys = {}
+        # (band, values) -> doc ids
+        self._buckets = {}
+        # shingle -> its NUM_HASHES hash values
+        self._hash_cache = {}
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def _hashes(self, shingle):
+        hashes = self._hash_cache.get(shingle)
+        if hashes is None:
+            x = zlib.crc32(shingle.encode("utf-8"))
+            hashes = self._hash_cache[shingle] = tuple((a * x + b) % _PRIME for a, b in _HASHES)
+        return hashes
+
+    def _bucket_keys(self, pieces):
+        # Position by position minimum over every shingle's hashes
+        signature = tuple(map(min, zip(*(self._hashes(piece) for piece in pieces))))
+        return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def add(self, doc_id, text):
+        """Index (or re-index) a document's text"""
+        pieces = shingles(text)
+        if self._shingles.get(doc_id) == pieces:
+            return
+        self.discard(doc_id)
+        if not pieces:
+            return
+
+        keys = self._bucket_keys(pieces)
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(doc_id)
+        self._shingles[doc_id] = pieces
+        self._keys[doc_id] = keys
+
+    def discard(self, doc_id):
+        """Remove a document, if it's there"""
+        self._shingles.pop(doc_id, None)
+        for key in self._keys.pop(doc_id, ()):
+            bucket = self._buckets[key]
+            bucket.discard(doc_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def similar(self, text, threshold=0.6):
+        """
+        Documents nearly the same as text.
+
+        Args:
+            text: Text to look for
+            threshold: Lowest Jaccard similarity that counts (0 to 1)
+
+        Returns:
+            List of (similarity, doc_id), most similar first. Documents
+            with different numbers in them ("week 4" vs "week 5") never match.
+        """
+        pieces = shingles(text)
+        if not pieces:
+            return []
+
+        candidates = set()
+        for key in self._bucket_keys(pieces):
+            candidates.update(self._buckets.get(key, ()))
+
+        numbers = _numbers(pieces)
+        results = []
+        for doc_id in candidates:
+            doc_pieces = self._shingles[doc_id]
+            score = jaccard(pieces, doc_pieces)
+            if score >= threshold and _numbers(doc_pieces) == numbers:
+                results.append((score, doc_id))
+
+        results.sort(key=lambda result: -result[0])
+        return results
@@ -0,0 +1,619 @@
+"""
+Memory persistence for MZ
+Keeps a JSON snapshot plus an append-only journal of changes
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import binary_format
+import migrations
+from conversation_log import ConversationLog
+from task_store import task_store
+from salvage import quarantine_file, salvage_memory
+
+logger = logging.getLogger('MZ')
+
+
+def open_store(memory_path, storage_config, columnar=False):
+    """
+    Create the storage backend selected in config.yaml.
+
+    Args:
+        memory_path: Path to memory.json
+        storage_config: The 'storage' section of the config (may be empty)
+        columnar: Load tasks into a TaskTable instead of a TaskStore ('table' in the tasks config)
+
+    Returns:
+        An object with load() and save(memory)
+    """
+    backend = storage_config.get('backend', 'json')
+
+    if backend == 'sqlite':
+        from sqlite_store import SqliteStore
+        db_path = os.path.splitext(memory_path)[0] + ".db"
+        return SqliteStore(db_path, import_from=memory_path, columnar=columnar)
+
+    if backend != 'json':
+        logger.info(f"Unknown storage backend '{backend}' - using json.")
+
+    return MemoryStore(
+        memory_path,
+        journal=storage_config.get('journal', True),
+        compact_entries=storage_config.get('compact_after_entries', 1000),
+        compact_bytes=storage_config.get('compact_after_bytes', 1024 * 1024),
+        lazy_history=storage_config.get('lazy_history', False),
+        history_window=storage_config.get('history_window', 50),
+        snapshot_format=storage_config.get('snapshot_format', 'json'),
+        archive_codec=storage_config.get('archive_codec'),
+        columnar=columnar
+    )
+
+
+def default_memory():
+    """Return a fresh, empty memory dictionary"""
+    return {
+        "schema_version": migrations.CURRENT_SCHEMA_VERSION,
+        "conversations": [],
+        "tasks": []
+    }
+
+def validate_memory_structure(data):
+    """
+    Deep validation: ensures the memory file has the right structure and types.
+    Returns True if valid, False otherwise.
+    """
+    # Must be a JSON object at the top level
+    if not isinstance(data, dict):
+        logger.debug("Validation failed: memory must be an object.")
+        return False
+
+    # Must contain 'conversations'
+    if 'conversations' not in data:
+        logger.debug("Validation failed: missing 'conversations' key.")
+        return False
+
+    # 'conversations' must be a list
+    if not isinstance(data["conversations"], list):
+        logger.debug("Validation failed: 'conversations' must be a list.")
+        return False
+
+    # Must contain 'tasks'
+    if 'tasks' not in data:
+        logger.debug("Validation failed: missing 'tasks' key.")
+        return False
+
+    # 'tasks' must be a list
+    if not isinstance(data["tasks"], list):
+        logger.debug("Validation failed: 'tasks' must be a list.")
+        return False
+
+    return True
+
+
+class MemoryStore:
+    """
+    Snapshot + journal storage for the memory dictionary.
+
+    In journal mode, save() appends one JSON line per new conversation
+    message or changed task to <memory>.journal instead of rewriting the
+    whole snapshot, and load() replays those lines on top of the snapshot.
+
+    Once the journal grows past compact_entries lines or compact_bytes
+    bytes, it is rotated to <memory>.journal.old and a background thread
+    folds it into a fresh snapshot, so load() only ever reads one snapshot
+    plus a short tail.
+
+    With lazy_history, conversations move out of the snapshot into a
+    ConversationLog directory next to it (<memory>.conversations/), and
+    only the last history_window messages are loaded at startup. The
+    snapshot then records "conversation_log" and keeps only the tasks.
+    Setting archive_codec ("zlib"/"lzma") also uses the log, and
+    compresses its older segments.
+
+    Snapshots are written as indented JSON, or in the compact format from
+    binary_format when snapshot_format is "binary". Loading accepts
+    either, so switching formats just takes effect on the next snapshot.
+
+    With columnar, loaded tasks go straight into a TaskTable instead of a
+    TaskStore, so they are never indexed twice.
+
+    Journal entries:
+        {"op": "message", "index": 12, "message": {...}}
+        {"op": "task", "task": {...}}
+        {"op": "delete_task", "id": "task_abc123"}
+    """
+
+    def __init__(self, path, journal=True, compact_entries=1000, compact_bytes=1024 * 1024,
+                 lazy_history=False, history_window=50, snapshot_format="json", archive_codec=None,
+                 columnar=False):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.old_journal_path = self.journal_path + ".old"
+        self.journal = journal
+        self.compact_entries = compact_entries
+        self.compact_bytes = compact_bytes
+        self.lazy_history = lazy_history
+        self.history_window = history_window
+        self.snapshot_format = snapshot_format
+        self.archive_codec = archive_codec
+        self.columnar = columnar
+        self.log_path = os.path.splitext(path)[0] + ".conversations"
+        self._log = None
+
+        # What the files on disk already contain, so save() only writes the difference
+        self._tracker = ChangeTracker()
+
+        # Size of the live journal, checked after every append
+        self._journal_entries = 0
+        self._journal_bytes = 0
+
+        self._compaction = None
+        self._compaction_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """
+        Load memory with multiple layers of validation, then replay the journal.
+
+        Returns:
+            A Memory object (a dict that tracks its own changes)
+        """
+        memory = self._load_snapshot()
+
+        # A rotated journal is only left behind if compaction didn't finish
+        replayed = replay_journal(memory, self.old_journal_path)
+
+        # Journal entries written since the snapshot
+        self._journal_entries = replay_journal(memory, self.journal_path)
+        self._journal_bytes = _file_size(self.journal_path)
+
+        replayed += self._journal_entries
+        if replayed:
+            logger.info(f"Replayed {replayed} journal entries.")
+
+        self._attach_log(memory)
+
+        memory = Memory(memory, columnar=self.columnar)
+        self._tracker.mark_saved(memory)
+
+        if self.journal and (os.path.exists(self.old_journal_path) or self._needs_compaction()):
+            self.compact()
+
+        return memory
+
+    def _load_snapshot(self):
+        # If file doesn't exist -> create
+        if not os.path.exists(self.path):
+            logger.info("memory.json not found - creating new memory file.")
+            return self._reset()
+
+        # If the file exists but is empty -> rebuild
+        if os.path.getsize(self.path) == 0:
+            logger.info("memory.json is empty - repairing.")
+            return self._reset()
+
+        # File exists -> try loading (JSON or binary, whichever it holds)
+        try:
+            data = read_snapshot(self.path)
+            logger.info("memory.json loaded successfully.")
+        except (ValueError, UnicodeDecodeError):
+            logger.info("memory.json was corrupted. Salvaging what we can.")
+            return self._salvage()
+
+        # Files from older MZ versions are upgraded rather than rejected
+        data, version = migrations.migrate_memory(data)
+        if version is not None and version < migrations.CURRENT_SCHEMA_VERSION:
+            logger.info(f"memory.json upgraded from schema {version} to {migrations.CURRENT_SCHEMA_VERSION}.")
+            os.replace(self.path, migrations.backup_path(self.path, version))
+            self._write_snapshot(data)
+
+        # Deep structural validation
+        if not validate_memory_structure(data):
+            logger.info("memory.json failed structure validation - salvaging what we can.")
+            return self._salvage()
+
+        # Passed all checks
+        return data
+
+    def _salvage(self):
+        """Rebuild memory.json from its intact records instead of wiping it."""
+        if binary_format.is_binary_snapshot(self.path):
+            # Binary records are length-prefixed, so everything before the damage reads back fine
+            data = binary_format.load(self.path, strict=False)
+            quarantine_file(self.path)
+            self._write_snapshot(data)
+            return data
+
+        salvage_memory(self.path)
+
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            # Shouldn't happen - the salvaged file is written by us
+            logger.info("Salvaged memory.json unreadable - rebuilding.")
+            return self._reset()
+
+        return data
+
+    def _reset(self):
+        memory = default_memory()
+        self._write_snapshot(memory)
+        return memory
+
+    def _attach_log(self, memory):
+        """Swap the conversations list for a ConversationLog if history lives (or should live) in one."""
+        uses_log = memory.pop("conversation_log", None) is not None
+        if not uses_log and not self.lazy_history and not self.archive_codec:
+            return
+
+        log = ConversationLog(self.log_path, eager=self.history_window, codec=self.archive_codec)
+        self._log = log
+        inline = memory["conversations"]
+        memory["conversations"] = log
+
+        if inline:
+            # One-off move of inline history into the log. If an earlier move was
+            # interrupted, the log already holds the first part of it.
+            for message in inline[len(log):]:
+                log.append(message)
+            log.flush()
+
+            self._write_snapshot(memory)
+            self._clear_journal()
+            self._journal_entries = 0
+            self._journal_bytes = 0
+            logger.info(f"Moved {len(inline)} messages into the conversation log.")
+
+    def _snapshot_data(self, memory):
+        """What goes into memory.json - everything except a ConversationLog's messages."""
+        if isinstance(memory["conversations"], ConversationLog):
+            data = dict(memory)
+            data["conversations"] = []
+            data["conversation_log"] = os.path.basename(self.log_path)
+            return data
+        return memory
+
+    # ------------------------------------------------------------------
+    # Saving
+    # ------------------------------------------------------------------
+
+    def save(self, memory):
+        """Persist memory - appends to the journal, or rewrites the snapshot if journaling is off."""
+        batch = self.prepare(memory)
+        if batch is not None:
+            self.write([batch])
+
+    def prepare(self, memory):
+        """
+        Capture what needs writing for this save, without touching the disk.
+
+        Runs on the caller's thread, so later changes to memory can't leak
+        into a write that happens on another thread.
+
+        Returns:
+            A batch for write() (a list of parts), or None if nothing changed
+        """
+        if not self._tracker.has_changes(memory) and os.path.exists(self.path):
+            return None
+
+        entries = self._tracker.changes(memory)
+        batch = []
+
+        # A ConversationLog persists its own messages; the snapshot and journal only get tasks
+        if isinstance(memory["conversations"], ConversationLog):
+            messages = [entry for entry in entries if entry["op"] == "message"]
+            entries = [entry for entry in entries if entry["op"] != "message"]
+            if messages:
+                batch.append(("messages", (messages[0]["index"], [entry["message"] for entry in messages])))
+
+        if not self.journal or not os.path.exists(self.path):
+            batch.append(("snapshot", self._encode_snapshot(self._snapshot_data(memory))))
+        elif entries:
+            batch.append(("journal", [json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries]))
+
+        self._tracker.mark_saved(memory)
+        return batch
+
+    def write(self, batches):
+        """
+        Write prepared batches in order, coalescing them.
+
+        Only the newest snapshot matters, and all journal lines after it
+        go out in a single append + fsync.
+        """
+        snapshot = None
+        lines = []
+        for batch in batches:
+            for kind, payload in batch:
+                if kind == "messages":
+                    first_index, messages = payload
+                    self._log.write_messages(first_index, messages)
+                elif kind == "snapshot":
+                    snapshot = payload
+                    lines = []
+                else:
+                    lines.extend(payload)
+
+        if snapshot is not None:
+            write_atomic(self.path, snapshot)
+            self._clear_journal()
+            self._journal_entries = 0
+            self._journal_bytes = 0
+            logger.info("Memory saved successfully.")
+
+        if lines:
+            with open(self.journal_path, "a") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                self._journal_bytes = f.tell()
+
+            self._journal_entries += len(lines)
+            logger.info(f"Memory saved successfully ({len(lines)} journal entries).")
+
+            if self._needs_compaction():
+                self.compact()
+
+    def _write_snapshot(self, memory):
+        write_atomic(self.path, self._encode_snapshot(self._snapshot_data(memory)))
+
+    def _encode_snapshot(self, data):
+        if self.snapshot_format == "binary":
+            return binary_format.dumps(data)
+        # default=list turns the TaskStore (or TaskTable) back into a plain list of tasks
+        return json.dumps(data, indent=4, default=list)
+
+    def _clear_journal(self):
+        for path in (self.journal_path, self.old_journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def _needs_compaction(self):
+        return (self._journal_entries >= self.compact_entries
+                or self._journal_bytes >= self.compact_bytes)
+
+    def compact(self, wait=False):
+        """
+        Fold the journal into a fresh snapshot on a background thread.
+
+        Args:
+            wait: If True, block until the compaction has finished
+
+        Returns:
+            True if a compaction was started, False if one was already running
+        """
+        with self._compaction_lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                started = False
+            else:
+                # New appends go to a fresh journal while the old one is folded in.
+                # If an earlier compaction died, finish that rotated journal first.
+                if not os.path.exists(self.old_journal_path) and os.path.exists(self.journal_path):
+                    os.replace(self.journal_path, self.old_journal_path)
+                    self._journal_entries = 0
+                    self._journal_bytes = 0
+
+                self._compaction = threading.Thread(target=self._compact, name="mz-compaction", daemon=True)
+                self._compaction.start()
+                started = True
+
+        if wait:
+            self.wait_for_compaction()
+        return started
+
+    def wait_for_compaction(self):
+        """Block until any running compaction has finished."""
+        thread = self._compaction
+        if thread is not None:
+            thread.join()
+
+    def _compact(self):
+        if not os.path.exists(self.old_journal_path):
+            return
+
+        # Work from the files rather than the live memory dict, which the REPL keeps mutating
+        try:
+            memory = read_snapshot(self.path)
+        except (OSError, ValueError, UnicodeDecodeError):
+            logger.info("Compaction skipped - snapshot could not be read.")
+            return
+
+        folded = replay_journal(memory, self.old_journal_path)
+
+        # Only drop the rotated journal once the new snapshot is safely in place
+        write_atomic(self.path, self._encode_snapshot(memory))
+        os.remove(self.old_journal_path)
+        logger.info(f"Compacted {folded} journal entries into memory.json.")
+
+
+class Memory(dict):
+    """
+    Memory dictionary that keeps track of its own changes.
+
+    Conversation appends are seen by comparing the list length with the
+    last save. Task changes have to be reported by whoever makes them
+    (task_manager does this through task_changed/task_deleted), so a save
+    only touches the tasks that actually changed.
+    """
+
+    def __init__(self, data, columnar=False):
+        super().__init__(data)
+        # A TaskStore, or a TaskTable if tasks.table is "columnar" in config.yaml
+        task_store(self, columnar=columnar)
+        self.saved_conversations = len(self["conversations"])
+        # id -> task for tasks added or modified since the last save
+        self.changed_tasks = {}
+        self.deleted_tasks = set()
+
+    def task_changed(self, task):
+        """Record that a task was added or modified."""
+        # Keeps the task indexes right even if the task dict was edited directly
+        self["tasks"].reindex(task)
+        self.changed_tasks[task["id"]] = task
+        self.deleted_tasks.discard(task["id"])
+
+    def task_deleted(self, task_id):
+        """Record that a task was removed."""
+        self.changed_tasks.pop(task_id, None)
+        self.deleted_tasks.add(task_id)
+
+    @property
+    def dirty(self):
+        """True if anything changed since the last save."""
+        return (len(self["conversations"]) != self.saved_conversations
+                or bool(self.changed_tasks)
+                or bool(self.deleted_tasks))
+
+    def mark_saved(self):
+        """Forget recorded changes once they have been persisted."""
+        self.saved_conversations = len(self["conversations"])
+        self.changed_tasks = {}
+        self.deleted_tasks = set()
+
+
+class ChangeTracker:
+    """
+    Remembers what a backend has already persisted, so each save only
+    has to write the messages and tasks that changed since.
+
+    For a Memory object the recorded changes are used directly; for a
+    plain dict the tasks are compared against a copy from the last save.
+    Changes come back as journal-style entries (see MemoryStore).
+    """
+
+    def __init__(self):
+        self.saved_conversations = 0
+        self.saved_tasks = {}
+
+    def has_changes(self, memory):
+        """True if a save would have anything to write."""
+        if isinstance(memory, Memory):
+            return memory.dirty
+        return bool(self.changes(memory))
+
+    def changes(self, memory):
+        """Work out which messages and tasks changed since the last save."""
+        entries = []
+
+        # New conversation messages are always at the end of the list
+        conversations = memory["conversations"]
+        for index in range(self.saved_conversations, len(conversations)):
+            entries.append({"op": "message", "index": index, "message": conversations[index]})
+
+        if isinstance(memory, Memory):
+            for task in memory.changed_tasks.values():
+                entries.append({"op": "task", "task": task})
+            for task_id in memory.deleted_tasks:
+                entries.append({"op": "delete_task", "id": task_id})
+            return entries
+
+        # Added or modified tasks
+        current_ids = set()
+        for task in memory["tasks"]:
+            current_ids.add(task["id"])
+            if self.saved_tasks.get(task["id"]) != task:
+                entries.append({"op": "task", "task": task})
+
+        # Deleted tasks
+        for task_id in self.saved_tasks:
+            if task_id not in current_ids:
+                entries.append({"op": "delete_task", "id": task_id})
+
+        return entries
+
+    def mark_saved(self, memory):
+        """Record memory as fully persisted."""
+        self.saved_conversations = len(memory["conversations"])
+
+        if isinstance(memory, Memory):
+            memory.mark_saved()
+        else:
+            self.saved_tasks = {task["id"]: dict(task) for task in memory["tasks"]}
+
+
+def replay_journal(memory, journal_path):
+    """Apply the entries in a journal file to memory. Returns the number of entries applied."""
+    if not os.path.exists(journal_path):
+        return 0
+
+    conversations = memory["conversations"]
+    # Keyed by id so each task entry is a dict update, not a list scan
+    tasks = {task["id"]: task for task in memory["tasks"]}
+
+    applied = 0
+    with open(journal_path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-append leaves a torn last line - everything before it is intact
+                logger.info("Skipping unreadable journal entry.")
+                continue
+
+            op = entry.get("op")
+            if op == "message":
+                # Entries carry their position so replaying one twice is harmless
+                if entry["index"] >= len(conversations):
+                    conversations.append(entry["message"])
+            elif op == "task":
+                tasks[entry["task"]["id"]] = entry["task"]
+            elif op == "delete_task":
+                tasks.pop(entry["id"], None)
+            else:
+                logger.debug(f"Unknown journal op: {op}")
+                continue
+
+            applied += 1
+
+    memory["tasks"] = list(tasks.values())
+    return applied
+
+
+def read_snapshot(path):
+    """
+    Read a snapshot file, JSON or binary (detected from its first bytes).
+
+    Raises:
+        ValueError: If the file is damaged (json.JSONDecodeError or BinaryFormatError)
+    """
+    if binary_format.is_binary_snapshot(path):
+        return binary_format.load(path)
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_atomic(path, content):
+    """
+    Replace path with content (str or bytes) so a crash leaves either the old or the new file.
+
+    Writes to a temp file in the same directory, fsyncs it, then renames
+    it over path (rename is atomic on the same filesystem).
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
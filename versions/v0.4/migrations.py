@@ -0,0 +1,174 @@
+"""
+Memory schema versions and migrations for MZ
+
+Schema history:
+    1 - v0.1: {"conversations": [...]}
+    2 - v0.2 to v0.4: adds "tasks"
+    3 - adds "schema_version"; every task carries the full set of task fields
+"""
+import logging
+import os
+import re
+
+import binary_format
+from salvage import rewrite_memory_file
+
+logger = logging.getLogger('MZ')
+
+CURRENT_SCHEMA_VERSION = 3
+
+# Every task field and the value an old task gets if it's missing one
+TASK_DEFAULTS = {
+    "id": None,
+    "content": "",
+    "priority": None,
+    "category": None,
+    "due_date": None,
+    "priority_reasoning": None,
+    "completed": False,
+    "created_at": None,
+    "completed_at": None
+}
+
+# Enough of the start of a file to find a schema_version we wrote ourselves
+HEAD_SIZE = 4096
+SCHEMA_VERSION_KEY = re.compile(r'^\s*\{\s*"schema_version"\s*:\s*(\d+)')
+
+
+def detect_version(data):
+    """Work out which schema a loaded memory dictionary uses"""
+    if "schema_version" in data:
+        return data["schema_version"]
+    if "tasks" in data:
+        return 2
+    return 1
+
+
+def upgrade_task(task):
+    """Return a copy of task with every current field present (extra fields are kept)"""
+    upgraded = dict(TASK_DEFAULTS)
+    upgraded.update(task)
+    return upgraded
+
+
+def migrate_memory(data):
+    """
+    Upgrade a loaded memory dictionary to the current schema, in place.
+
+    Args:
+        data: Whatever was loaded from the memory file
+
+    Returns:
+        (data, version it was at before), or (data, None) if data isn't a memory dict
+    """
+    if not isinstance(data, dict):
+        return data, None
+
+    version = detect_version(data)
+    if version >= CURRENT_SCHEMA_VERSION:
+        return data, version
+
+    # 1 -> 2: tasks arrive
+    if version < 2:
+        data.setdefault("tasks", [])
+
+    # 2 -> 3: schema_version, and tasks with every field
+    if version < 3 and isinstance(data.get("tasks"), list):
+        data["tasks"] = [upgrade_task(task) if isinstance(task, dict) else task for task in data["tasks"]]
+
+    # schema_version goes first, so migrate_file can read it from the head of the file later
+    rest = {key: value for key, value in data.items() if key != "schema_version"}
+    data.clear()
+    data["schema_version"] = CURRENT_SCHEMA_VERSION
+    data.update(rest)
+    return data, version
+
+
+def backup_path(path, version):
+    """Where the pre-migration copy of a memory file is kept"""
+    return f"{path}.v{version}.bak"
+
+
+def _head_version(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        match = SCHEMA_VERSION_KEY.match(f.read(HEAD_SIZE))
+    return int(match.group(1)) if match else None
+
+
+def migrate_file(path, chunk_size=1024 * 1024):
+    """
+    Upgrade a memory file on disk to the current schema in one streaming pass.
+
+    Messages are copied through without being held in memory, so this
+    works on files far larger than RAM. The original is kept as
+    <path>.v<old version>.bak.
+
+    Args:
+        path: The memory file (JSON or binary snapshot)
+        chunk_size: How much to read at a time
+
+    Returns:
+        Dictionary with 'from_version', 'to_version', 'messages', 'tasks'
+        and 'backup' (None if the file was already current)
+    """
+    if binary_format.is_binary_snapshot(path):
+        # Binary snapshots only exist from schema 3 on, but check anyway
+        data, version = migrate_memory(binary_format.load(path))
+        result = {"from_version": version, "to_version": CURRENT_SCHEMA_VERSION,
+                  "messages": len(data["conversations"]), "tasks": len(data["tasks"]), "backup": None}
+        if version < CURRENT_SCHEMA_VERSION:
+            result["backup"] = backup_path(path, version)
+            os.replace(path, result["backup"])
+            binary_format.dump(data, path)
+        return result
+
+    # Files we wrote start with their version, so current ones cost one small read
+    version = _head_version(path)
+    if version is not None and version >= CURRENT_SCHEMA_VERSION:
+        return {"from_version": version, "to_version": version, "messages": None, "tasks": None, "backup": None}
+
+    tmp_path = path + ".migrate"
+    stats = rewrite_memory_file(
+        path,
+        tmp_path,
+        transform_task=upgrade_task,
+        top_level={"schema_version": CURRENT_SCHEMA_VERSION},
+        chunk_size=chunk_size
+    )
+
+    # schema_version wasn't at the top, but the file may still have one.
+    # Without it, tasks mean schema 2 (an empty v2 file is indistinguishable from v1
+    # in one pass, and migrates the same way).
+    version = stats["keys"].get("schema_version")
+    if version is None:
+        version = 2 if stats["tasks"] else 1
+
+    result = {"from_version": version, "to_version": CURRENT_SCHEMA_VERSION,
+              "messages": stats["messages"], "tasks": stats["tasks"], "backup": None}
+
+    if version >= CURRENT_SCHEMA_VERSION:
+        os.remove(tmp_path)
+        return result
+
+    result["backup"] = backup_path(path, version)
+    os.replace(path, result["backup"])
+    os.replace(tmp_path, path)
+    logger.info(f"Migrated {path} from schema {version} to {CURRENT_SCHEMA_VERSION}.")
+    return result
+
+
+def main(path):
+    """Entry point for `python monozukuri.py migrate [path]`"""
+    if not os.path.exists(path):
+        print(f"ERROR: {path} not found")
+        return 1
+
+    result = migrate_file(path)
+
+    if result["backup"] is None:
+        print(f"{path} is already at schema {result['to_version']}. Nothing to do.")
+    else:
+        print(f"Migrated {path} from schema {result['from_version']} to {result['to_version']} "
+              f"({result['messages']} messages, {result['tasks']} tasks).")
+        print(f"Original kept at {result['backup']}")
+    return 0
@@ -1,11 +1,19 @@
-import json
 import os
+import json
+from datetime import date, timedelta
 from dotenv import load_dotenv
 import anthropic
 import task_manager
 from logger import setup_logging
 from cli import parse_args
 from intent_detector import is_task_intent
+from config import load_config
+from memory_store import open_store
+from background_writer import BackgroundWriter
+from conversation_log import ConversationLog, recent_messages
+from recurrence import describe as describe_rule
+from reminders import ReminderThread, ReminderWheel
+from task_validator import parse_due_date
 
 # --------------------------------------------------
 # Setup logging
@@ -31,6 +39,11 @@ if args.debug:
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 ENV_PATH = os.path.join(PROJECT_ROOT, ".env")
 
+# Maintenance commands don't need Claude, so handle them before the API key check
+if args.command == "migrate":
+	import migrations
+	exit(migrations.main(args.path or os.path.join(PROJECT_ROOT, "data", "memory.json")))
+
 # Load .env from project root
 load_dotenv(ENV_PATH) 
 logger.info(f"Looking for .env at: {ENV_PATH}")
@@ -58,77 +71,27 @@ logger.info("Claude client initialized.")
 MEMORY_PATH = os.path.join(PROJECT_ROOT, "data", "memory.json")
 logger.info(f"Memory path: {MEMORY_PATH}")
 
-DEFAULT_MEMORY = {
-	"conversations": [],
-	"tasks": []
-}
+# Storage backend selected in config.yaml (see memory_store.py)
+storage_config = load_config(args.config).get('storage', {})
+# "columnar" keeps tasks in a TaskTable (see task_table.py) from the moment they're loaded
+columnar_tasks = load_config(args.config).get('tasks', {}).get('table') == 'columnar'
+memory_store = open_store(MEMORY_PATH, storage_config, columnar=columnar_tasks)
 
-def validate_memory_structure(data):
-	"""
-	Deep validation: ensures the memory file has the right structure and types.
-	Returns True if valid, False otherwise.
-	"""
+# When history lives in a ConversationLog only the recent window is kept in RAM, so that's what Claude sees
+HISTORY_WINDOW = storage_config.get('history_window', 50)
 
-	# Must contain 'conversations'
-	if 'conversations' not in data:
-		logger.debug("Validation failed: missing 'conversations' key.")
-		return False
-	
-	# 'conversations' must be a list
-	if not isinstance(data["conversations"], list):
-		logger.debug("Validation failed: 'conversations' must be a list.")
-		return False
-	
-    # Must contain 'tasks'
-	if 'tasks' not in data:
-		logger.debug("Validation failed: missing 'tasks' key.")
-		return False
-	
-	# 'tasks' must be a list
-	if not isinstance(data["tasks"], list):
-		logger.debug("Validation failed: 'tasks' must be a list.")
-		return False
-	
-	return True
+# Saves are written by a background thread so the REPL never waits on disk
+memory_writer = BackgroundWriter(memory_store, delay=storage_config.get('write_delay', 0.5))
+
+# Due-date reminders (see reminders.py)
+reminder_config = load_config(args.config).get('reminders', {})
 
 def load_memory():
 	"""Load memory with multiple layers of validation."""
-
-	# If file doesn't exist -> create
-	if not os.path.exists(MEMORY_PATH):
-		logger.info("memory.json not found - creating new memory file.")
-		save_memory(DEFAULT_MEMORY)
-		return DEFAULT_MEMORY
-	
-	# If the file exists but is empty -> rebuild
-	if os.path.getsize(MEMORY_PATH) == 0:
-		logger.info("memory.json is empty - repairing.")
-		save_memory(DEFAULT_MEMORY)
-		return DEFAULT_MEMORY
-	
-	# File exists -> try loading 
-	try:
-		with open(MEMORY_PATH, "r") as f:
-			data = json.load(f)
-			logger.info("memory.json loaded successfully.")
-	except json.JSONDecodeError:
-		logger.info("memory.json was empty or corrupted. Repairing memory file.")
-		save_memory(DEFAULT_MEMORY)
-		return DEFAULT_MEMORY
-	
-	# Deep structural validation
-	if not validate_memory_structure(data):
-		logger.info("memory.json failed structure validation - rebuilding.")
-		save_memory(DEFAULT_MEMORY)
-		return DEFAULT_MEMORY
-	
-	# Passed all checks
-	return data 
+	return memory_store.load()
 
 def save_memory(memory): 
-	with open(MEMORY_PATH, "w") as f:
-		json.dump(memory, f, indent=4)
-	logger.info("Memory saved successfully.")
+	memory_writer.save(memory)
 
 # --------------------------------------------------
 # Claude API integration
@@ -202,6 +165,121 @@ def parse_command(user_input):
 	return command, args
 
 
+def parse_task_input(full_input):
+	"""
+	Split "/task add" style text into task fields
+	
+	Example:
+		"Read chapter 3 priority:high due:2026-01-10"
+		-> {"content": "Read chapter 3", "priority": "high", "due_date": "2026-01-10", ...}
+	
+	after:<id>[,<id>...] adds a "depends_on" list of the ids as typed.
+	"""
+	spec = {"content": "", "priority": None, "category": None, "due_date": None, "reasoning": None, "repeat": None}
+	
+	parts = full_input.split()
+	content_parts = []
+	
+	for part in parts:
+		if ":" in part:
+			key, value = part.split(":", 1)
+			
+			if key == "priority":
+				spec["priority"] = value
+			elif key == "category":
+				spec["category"] = value
+			elif key == "due":
+				spec["due_date"] = value
+			elif key == "reason":
+				spec["reasoning"] = value
+			elif key == "repeat":
+				spec["repeat"] = value
+			elif key == "after":
+				spec.setdefault("depends_on", []).extend(word for word in value.split(",") if word)
+		else:
+			content_parts.append(part)
+	
+	spec["content"] = " ".join(content_parts)
+	return spec
+
+
+def read_task_file(path):
+	"""
+	Read tasks to import from a file
+	
+	A .json file holds a list of task dicts (content, priority, category,
+	due_date, reasoning, repeat, depends_on). Anything else is read as one
+	task per line, written like /task add (after:<id> included). Blank lines
+	and lines starting with # are skipped.
+	"""
+	with open(path, "r") as f:
+		if path.endswith(".json"):
+			return json.load(f)
+		
+		return [
+			parse_task_input(line)
+			for line in f
+			if line.strip() and not line.lstrip().startswith("#")
+		]
+
+
+def resolve_task_ids(memory, words):
+	"""
+	Turn the ids (or id abbreviations) the user typed into full task ids
+	
+	Returns:
+		(task ids, None) if every word matched exactly one task,
+		or (None, message explaining what didn't match)
+	"""
+	task_ids = []
+	for word in words:
+		matches = task_manager.match_task_ids(memory, word)
+		
+		if len(matches) == 0:
+			return None, f"✗ Task {word} not found."
+		
+		if len(matches) > 1:
+			message = f"✗ '{word}' matches {len(matches)} tasks - type more of the id:\n"
+			for task_id in matches[:10]:
+				task = memory["tasks"].get(task_id)
+				message += f" - {task_manager.display_id(task_id)}  {task['content']}\n"
+			if len(matches) > 10:
+				message += f" - ...and {len(matches) - 10} more\n"
+			return None, message.strip()
+		
+		task_ids.append(matches[0])
+	return task_ids, None
+
+
+def format_task(task):
+	"""Describe one task over a few lines, for /task list and /task next"""
+	priority = task.get('priority', 'none')
+	priority_display = f"[{priority.upper()}]" if priority else "[NONE]"
+	
+	lines = [
+		f"{priority_display} {task['content']}\n",
+		f"  ID: {task_manager.display_id(task['id'])}\n"
+	]
+	
+	if task.get('category'):
+		lines.append(f"  Category: {task['category']}\n")
+	
+	if task.get('due_date'):
+		lines.append(f"  Due: {task['due_date']}\n")
+	
+	if task.get('repeat'):
+		lines.append(f"  Repeats: {describe_rule(task['repeat'])}\n")
+	
+	if task.get('depends_on'):
+		waits_on = ", ".join(task_manager.display_id(task_id) for task_id in task['depends_on'])
+		lines.append(f"  After: {waits_on}\n")
+	
+	if task.get('priority_reasoning'):
+		lines.append(f"  Why? {task['priority_reasoning']}\n")
+	
+	return "".join(lines)
+
+
 def handle_task_command(args, memory):
 	"""
 	Handle /task commands
@@ -209,67 +287,67 @@ def handle_task_command(args, memory):
 	Examples:
 		/task add Finish CS50P Week 4
 		/task list
+		/task list category:learning priority:high due:2026-01-31
+		/task list --page 2 --limit 50
+		/task next 3
+		/task upcoming 14
+		/task ready
+		/task after a1b2c3d4 e5f6g7h8
+		/task search cs50 week
+		/task import tasks.txt
 		/task done task_abc123
 		/task delete task_abc123
 	"""
 	if len(args) == 0:
-		return "Task commands: /task add <description>, /task list, /task done <id>, /task delete <id>"
+		return "Task commands: /task add <description>, /task list, /task next [n], /task ready, /task after <id> <ids>, /task upcoming [days], /task search <words>, /task import <file>, /task done <id>, /task delete <id>"
 	
 	action = args[0]
 	
 	# /task add
 	if action == "add":
 		if len(args) < 2:
-			return "Usage: /task add <description> [priority:high/medium/low] [category:name] [due:YYYY-MM-DD] [reason:text]"
+			return "Usage: /task add <description> [priority:high/medium/low] [category:name] [due:YYYY-MM-DD] [reason:text] [repeat:daily/weekly/monthly/3d] [after:id,id]"
 		
 		# Parse the input
-		full_input = args[1]
-		
-		# Extract properties
-		priority = None
-		category = None
-		due_date = None
-		reasoning = None
-		
-		parts = full_input.split()
-		content_parts = []
-		
-		for part in parts:
-			if ":" in part:
-				key, value = part.split(":", 1)
-				
-				if key == "priority":
-					priority = value
-				elif key == "category":
-					category = value
-				elif key == "due":
-					due_date = value
-				elif key == "reason":
-					reasoning = value
-			else:
-				content_parts.append(part)
-		
-		content = " ".join(content_parts)
+		spec = parse_task_input(args[1])
+		content = spec["content"]
+		priority = spec["priority"]
+		category = spec["category"]
+		due_date = spec["due_date"]
+		reasoning = spec["reasoning"]
+		repeat = spec["repeat"]
 		
 		if not content:
 			return "Error: Task description cannot be empty"
 		
-		# Add the task
+		depends_on = None
+		if spec.get("depends_on"):
+			depends_on, error = resolve_task_ids(memory, spec["depends_on"])
+			if error:
+				return error
+		
+		# Add the task (or merge it into an existing one, with tasks: duplicates: merge)
+		count = len(memory["tasks"])
 		task = task_manager.add_task(
 			memory, 
 			content, 
 			priority=priority,
 			category=category,
 			due_date=due_date,
-			reasoning=reasoning
+			reasoning=reasoning,
+			repeat=repeat,
+			depends_on=depends_on
 		)
 		
 		if task is None:
 			return "Failed to add task (validation errors printed above)"
 		
+		if len(memory["tasks"]) == count:
+			return f"✓ Already on your list as task {task_manager.display_id(task['id'])}: {task['content']}"
+		
 		# Build response
 		response = f"✓ Task added: {content}\n"
-		response += f"  ID: {task['id']}\n"
+		response += f"  ID: {task_manager.display_id(task['id'])}\n"
 		
 		if priority:
 			response += f"  Priority: {priority.upper()}\n"
@@ -279,65 +357,312 @@ def handle_task_command(args, memory):
 			response += f"  Due: {due_date}\n"
 		if reasoning:
 			response += f"  Reasoning: {reasoning}\n"
+		if repeat:
+			response += f"  Repeats: {describe_rule(task['repeat'])}\n"
+		if depends_on:
+			response += f"  After: {', '.join(task_manager.display_id(task_id) for task_id in depends_on)}\n"
 		
 		return response.strip()
 	
 	# /task list
 	elif action == "list":
-		tasks = task_manager.list_tasks(memory, filter_completed=True)
+		# Optional filters, e.g. /task list category:learning priority:high due:2026-01-31
+		# and paging, e.g. /task list --page 2 --limit 50
+		usage = "Usage: /task list [category:name] [priority:high/medium/low] [due:YYYY-MM-DD] [--page n] [--limit n]"
+		filters = {}
+		filter_words = []
+		paging = {"page": 1, "limit": task_manager.config['tasks'].get('page_size', 50)}
+		words = args[1].split() if len(args) > 1 else []
+		while words:
+			part = words.pop(0)
+			key, _, value = part.partition(":")
+			if part in ("--page", "--limit"):
+				if not words or not words[0].isdigit() or int(words[0]) < 1:
+					return usage
+				paging[part[2:]] = int(words.pop(0))
+			elif key in ("category", "priority") and value:
+				filters[key] = value
+				filter_words.append(part)
+			elif key == "due" and parse_due_date(value) is not None:
+				filters["due_before"] = value
+				filter_words.append(part)
+			else:
+				return usage
+		
+		page, limit = paging["page"], paging["limit"]
+		tasks, more = task_manager.list_page(memory, page, limit, filter_completed=True, **filters)
+		
+		if len(tasks) == 0:
+			if page > 1:
+				return f"No tasks on page {page}."
+			return "No matching tasks." if filters else "No active tasks! 🎉"
+		
+		# Only this page's tasks are looked at, and the text is joined once at the end
+		parts = []
+		if page == 1 and not more:
+			parts.append(f"You have {len(tasks)} active task(s)")
+		else:
+			first = (page - 1) * limit + 1
+			parts.append(f"Active tasks {first}-{first + len(tasks) - 1} (page {page})")
+		parts.append(" matching those filters:\n\n" if filters else ":\n\n")
+		for task in tasks:
+			parts.append(format_task(task))
+			parts.append("\n")
+		if more:
+			next_page = " ".join(filter_words + ["--page", str(page + 1), "--limit", str(limit)])
+			parts.append(f"More on the next page: /task list {next_page}")
+		
+		return "".join(parts).strip()
+	
+	# /task next
+	elif action == "next":
+		count = 1
+		if len(args) > 1:
+			if not args[1].strip().isdigit() or int(args[1]) < 1:
+				return "Usage: /task next [n]"
+			count = int(args[1])
+		
+		tasks = task_manager.next_tasks(memory, count)
 		
 		if len(tasks) == 0:
 			return "No active tasks! 🎉"
 		
-		result = f"You have {len(tasks)} active task(s):\n\n"
+		result = "Up next:\n\n" if count > 1 else "Do this next:\n\n"
+		for number, task in enumerate(tasks, 1):
+			result += f"{number}. " + format_task(task) + "\n"
+		
+		return result.strip()
+	
+	# /task ready
+	elif action == "ready":
+		# Active tasks with nothing left to wait for
+		tasks = task_manager.ready_tasks(memory)
+		if not tasks:
+			active, _ = task_manager.list_page(memory, limit=1, filter_completed=True)
+			return "Nothing is ready - every active task is waiting on another one." if active else "No active tasks! 🎉"
+		
+		parts = [f"{len(tasks)} task(s) ready to start:\n\n"]
 		for task in tasks:
-			priority = task.get('priority', 'none')
-			priority_display = f"[{priority.upper()}]" if priority else "[NONE]"
-			
-			result += f"{priority_display} {task['content']}\n"
-			result += f"  ID: {task['id']}\n"
-			
-			if task.get('category'):
-				result += f"  Category: {task['category']}\n"
-			
-			if task.get('due_date'):
-				result += f"  Due: {task['due_date']}\n"
-			
-			if task.get('priority_reasoning'):
-				result += f"  Why? {task['priority_reasoning']}\n"
-			
-			result += "\n"
+			parts.append(format_task(task))
+			parts.append("\n")
+		return "".join(parts).strip()
+	
+	# /task after
+	elif action == "after":
+		# /task after <id> <ids it waits on...>
+		words = args[1].split() if len(args) > 1 else []
+		if len(words) < 2:
+			return "Usage: /task after <task_id> <id it waits on> [more ids...]"
+		
+		task_ids, error = resolve_task_ids(memory, words)
+		if error:
+			return error
+		
+		try:
+			task_manager.add_dependencies(memory, task_ids[0], task_ids[1:])
+		except task_manager.TaskValidationError as e:
+			return "✗ " + "\n".join(e.errors)
+		
+		waiting = task_manager.blocked_by(memory, task_ids[0])
+		response = f"✓ Task {task_manager.display_id(task_ids[0])} now comes after {', '.join(task_manager.display_id(i) for i in task_ids[1:])}"
+		if not waiting:
+			response += " (all done already, so it's ready)"
+		return response
+	
+	# /task upcoming
+	elif action == "upcoming":
+		# Every due date in the next n days (default 7), with repeating tasks expanded
+		days = 7
+		if len(args) > 1:
+			if not args[1].strip().isdigit() or int(args[1]) < 1:
+				return "Usage: /task upcoming [days]"
+			days = int(args[1])
+		
+		today = date.today()
+		end = today + timedelta(days=days - 1)
+		parts = []
+		for due, task in task_manager.iter_occurrences(memory, today.isoformat(), end.isoformat()):
+			priority = f"[{task['priority'].upper()}] " if task.get('priority') else ""
+			# Dates before today are repeating tasks still waiting to be done
+			overdue = " - overdue" if due < today.isoformat() else ""
+			parts.append(f"{due}  {priority}{task['content']} (ID: {task_manager.display_id(task['id'])}{overdue})\n")
+		
+		if not parts:
+			return f"Nothing due in the next {days} day(s)."
+		return f"Due in the next {days} day(s):\n\n" + "".join(parts).strip()
+	
+	# /task search
+	elif action == "search":
+		if len(args) < 2:
+			return "Usage: /task search <words>"
+		
+		limit = 10
+		tasks = task_manager.search_tasks(memory, args[1])
+		
+		if len(tasks) == 0:
+			return f"No tasks match '{args[1]}'."
+		
+		result = f"Found {len(tasks)} task(s) matching '{args[1]}':\n\n"
+		for task in tasks[:limit]:
+			done = "✓ " if task.get('completed') else ""
+			result += done + format_task(task) + "\n"
+		
+		if len(tasks) > limit:
+			result += f"...and {len(tasks) - limit} more. Add words to narrow it down.\n"
 		
 		return result.strip()
 	
+	# /task import
+	elif action == "import":
+		if len(args) < 2:
+			return "Usage: /task import <file> (.json list of tasks, or one '/task add' line per task)"
+		
+		path = args[1].strip()
+		try:
+			specs = read_task_file(path)
+		except OSError as e:
+			return f"✗ Couldn't read {path}: {e}"
+		except json.JSONDecodeError as e:
+			return f"✗ {path} is not valid JSON: {e}"
+		
+		if not isinstance(specs, list):
+			return f"✗ {path} must contain a list of tasks"
+		
+		# All or nothing - one bad line and nothing is imported
+		try:
+			tasks = task_manager.add_tasks(memory, specs)
+		except task_manager.TaskValidationError as e:
+			return "✗ Nothing imported:\n" + "\n".join(f" - {error}" for error in e.errors)
+		
+		return f"✓ Imported {len(tasks)} task(s) from {path}"
+	
 	# /task done
 	elif action == "done":
 		if len(args) < 2:
-			return "Usage: /task done <task_id>"
+			return "Usage: /task done <task_id> [more ids...]"
+		
+		task_ids, error = resolve_task_ids(memory, args[1].split())
+		if error:
+			return error
 		
-		task_id = args[1]
+		if len(task_ids) > 1:
+			try:
+				count = task_manager.complete_tasks(memory, task_ids)
+			except task_manager.TaskValidationError as e:
+				return "✗ Nothing completed:\n" + "\n".join(f" - {error}" for error in e.errors)
+			return f"✓ {count} tasks marked as complete!"
+		
+		task_id = task_ids[0]
 		success = task_manager.complete_task(memory, task_id)
 		
 		if success:
-			return f"✓ Task {task_id} marked as complete!"
+			task = memory["tasks"].get(task_id)
+			if task.get("repeat") and not task.get("completed"):
+				return f"✓ Task {task_manager.display_id(task_id)} done - next due {task['due_date']}"
+			return f"✓ Task {task_manager.display_id(task_id)} marked as complete!"
 		else:
-			return f"✗ Task {task_id} not found."
+			return f"✗ Task {task_manager.display_id(task_id)} not found."
 	
 	# /task delete
 	elif action == "delete":
 		if len(args) < 2:
-			return "Usage: /task delete <task_id>"
+			return "Usage: /task delete <task_id> [more ids...]"
+		
+		task_ids, error = resolve_task_ids(memory, args[1].split())
+		if error:
+			return error
 		
-		task_id = args[1]
+		if len(task_ids) > 1:
+			try:
+				count = task_manager.delete_tasks(memory, task_ids)
+			except task_manager.TaskValidationError as e:
+				return "✗ Nothing deleted:\n" + "\n".join(f" - {error}" for error in e.errors)
+			return f"✓ {count} tasks deleted."
+		
+		task_id = task_ids[0]
 		success = task_manager.delete_task(memory, task_id)
 		
 		if success:
-			return f"✓ Task {task_id} deleted."
+			return f"✓ Task {task_manager.display_id(task_id)} deleted."
 		else:
-			return f"✗ Task {task_id} not found."
+			return f"✗ Task {task_manager.display_id(task_id)} not found."
 	
 	else:
-		return f"Unknown task action: {action}\nAvailable: add, list, done, delete"
+		return f"Unknown task action: {action}\nAvailable: add, list, next, ready, after, upcoming, search, import, done, delete"
+
+def print_reminders(tasks):
+	"""Show due tasks in the REPL (called from the reminder thread while input() waits)"""
+	today = date.today().isoformat()
+	parts = ["\nMZ: ⏰ Reminder\n"]
+	for task in tasks:
+		when = "due today" if task['due_date'] == today else f"overdue since {task['due_date']}"
+		parts.append(f"  {task['content']} ({when}, ID: {task_manager.display_id(task['id'])})\n")
+	# Put the prompt back, since input() is still waiting
+	parts.append("You: ")
+	print("".join(parts), end="", flush=True)
+
+def start_reminders(memory):
+	"""
+	Start reminding about due tasks, if reminders are on in config.yaml
+	
+	Returns:
+		The running ReminderThread, or None
+	"""
+	if not reminder_config.get('enabled', True):
+		return None
+	
+	wheel = ReminderWheel(memory["tasks"])
+	# Adding, completing and deleting tasks keeps the wheel up to date from here on
+	task_manager.watchers.append(wheel)
+	return ReminderThread(wheel, print_reminders, interval=reminder_config.get('check_every', 60)).start()
+
+def setup_tab_completion(get_memory):
+	"""
+	Let Tab complete commands and task ids in the REPL
+	
+	Args:
+		get_memory: Function returning the current memory (it changes as the REPL runs)
+	"""
+	try:
+		import readline
+	except ImportError:
+		# Not available on every platform (e.g. plain Windows) - the REPL works without it
+		return
+	
+	actions = ["add", "list", "next", "ready", "after", "upcoming", "search", "import", "done", "delete"]
+	
+	def candidates(line, text):
+		words = line.split()
+		# Count the word being typed even if it's still empty
+		position = len(words) if line.endswith(" ") or not words else len(words) - 1
+		
+		if position == 0:
+			return [command for command in ("/task ", "/undo", "/redo") if command.startswith(text)]
+		if words[0] != "/task":
+			return []
+		if position == 1:
+			return [action + " " for action in actions if action.startswith(text)]
+		if words[1] in ("done", "delete", "after") and text:
+			completions = []
+			for task_id in task_manager.match_task_ids(get_memory(), text)[:50]:
+				# Complete whichever form of the id the user started typing
+				short = task_manager.display_id(task_id)
+				if short.lower().startswith(text.lower()):
+					completions.append(short + " ")
+				elif text.lower().startswith("task_"):
+					completions.append(task_id + " ")
+				else:
+					completions.append(task_id[len("task_"):] + " ")
+			return completions
+		return []
+	
+	def complete(text, state):
+		matches = candidates(readline.get_line_buffer()[:readline.get_endidx()], text)
+		return matches[state] if state < len(matches) else None
+	
+	readline.set_completer(complete)
+	readline.set_completer_delims(" ")
+	readline.parse_and_bind("tab: complete")
 
 # --------------------------------------------------
 # Core agent behavior
@@ -358,6 +683,16 @@ def think(input_text, memory):
         response = handle_task_command(args, memory)
         return response, memory
 
+    if command in ("undo", "redo"):
+        # Undo/redo the last task change (see undo_log.py)
+        if command == "undo":
+            description = task_manager.undo(memory)
+            response = f"↶ Undid: {description}" if description else "Nothing to undo."
+        else:
+            description = task_manager.redo(memory)
+            response = f"↷ Redid: {description}" if description else "Nothing to redo."
+        return response, memory
+
     # Check if this is a natural language task
     if is_task_intent(input_text):
         logger.info("Detected task intent in natural language")
@@ -373,7 +708,10 @@ def think(input_text, memory):
     })
 
     # Get intelligent response from Claude
-    response = ask_claude(memory["conversations"])
+    # A memory.json that moved its history into a ConversationLog keeps using it even
+    # with lazy_history turned off, so go by what's loaded rather than the config
+    window = HISTORY_WINDOW if isinstance(memory["conversations"], ConversationLog) else None
+    response = ask_claude(recent_messages(memory["conversations"], window))
 
     # Add assistant response to conversation history
     memory["conversations"].append({
@@ -401,6 +739,8 @@ def main():
 	
 	print("MZ v0.3 initialized.")
 	memory = load_memory()
+	setup_tab_completion(lambda: memory)
+	reminder_thread = start_reminders(memory)
 	
 	while True:
 		user_input = input("You: ")
@@ -411,7 +751,16 @@ def main():
 		response, memory = think(user_input, memory)
 		print("MZ:", response)
 		
-		save_memory(memory)
+		# Read-only turns (/task list, intent detection, ...) leave nothing to save
+		if memory.dirty:
+			save_memory(memory)
+
+		if user_input.lower() == "exit":
+			# Make sure queued saves hit the disk before we go
+			if reminder_thread:
+				reminder_thread.close()
+			memory_writer.close()
+			break
 		
 if __name__ == "__main__":
 	main()
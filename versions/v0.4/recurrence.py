@@ -0,0 +1,103 @@
+"""
+Repeating tasks for MZ
+A repeating task is stored once, with a rule; its dates are worked out when asked for
+"""
+import calendar
+import re
+from datetime import date, timedelta
+
+# repeat:daily / weekly / monthly, or a number and a unit, e.g. repeat:3d, repeat:2w, repeat:6m
+NAMED_RULES = {"daily": (1, "day"), "weekly": (1, "week"), "monthly": (1, "month")}
+UNITS = {"d": "day", "w": "week", "m": "month"}
+CUSTOM_RULE = re.compile(r"^(\d+)([dwm])$")
+
+
+def parse_rule(text):
+    """
+    Read a repeat rule as typed by the user.
+
+    Returns:
+        (interval, unit) - e.g. "weekly" -> (1, "week"), "3d" -> (3, "day") -
+        or None if text isn't a rule
+    """
+    text = text.strip().lower()
+    if text in NAMED_RULES:
+        return NAMED_RULES[text]
+    match = CUSTOM_RULE.match(text)
+    if match is None or int(match.group(1)) < 1:
+        return None
+    return int(match.group(1)), UNITS[match.group(2)]
+
+
+def make_rule(text, start):
+    """
+    The rule stored on a task: {"interval": 3, "unit": "day", "start": "2026-01-10"}
+
+    Args:
+        text: The rule as typed (must be valid, see parse_rule)
+        start: First due date, YYYY-MM-DD. Later dates are counted from it,
+            so a task due on the 31st stays on the last day of shorter months
+            instead of drifting to the 28th.
+    """
+    interval, unit = parse_rule(text)
+    return {"interval": interval, "unit": unit, "start": start}
+
+
+def describe(rule):
+    """Rule as text for the user, e.g. "weekly" or "every 3 days" """
+    for name, (interval, unit) in NAMED_RULES.items():
+        if (rule["interval"], rule["unit"]) == (interval, unit):
+            return name
+    return f"every {rule['interval']} {rule['unit']}s"
+
+
+def _add_months(day, months):
+    # Same day of the month, or the last day if the month is shorter
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _nth(rule, first, n):
+    # The date of occurrence number n (0 is the start date)
+    if rule["unit"] == "month":
+        return _add_months(first, n * rule["interval"])
+    days = rule["interval"] * (7 if rule["unit"] == "week" else 1)
+    return first + timedelta(days=n * days)
+
+
+def occurrences(rule, start=None, end=None):
+    """
+    The dates a rule falls on, from start to end (both included), earliest first.
+
+    Dates are made one at a time as they're asked for, starting straight
+    at the first one in the window - the dates before it are skipped with
+    arithmetic, not stepped through. With end=None the dates go on forever.
+
+    Args:
+        rule: A stored rule (see make_rule)
+        start, end: datetime.date window, or None for no limit on that side
+    """
+    first = date.fromisoformat(rule["start"])
+    n = 0
+    if start is not None and start > first:
+        # Jump to just before the window, then step into it
+        if rule["unit"] == "month":
+            n = ((start.year - first.year) * 12 + start.month - first.month) // rule["interval"]
+        else:
+            days = rule["interval"] * (7 if rule["unit"] == "week" else 1)
+            n = (start - first).days // days
+        while _nth(rule, first, n) < start:
+            n += 1
+
+    while True:
+        day = _nth(rule, first, n)
+        if end is not None and day > end:
+            return
+        yield day
+        n += 1
+
+
+def next_occurrence(rule, after):
+    """The first date the rule falls on after (not on) the date `after`"""
+    return next(occurrences(rule, start=after + timedelta(days=1)))
@@ -0,0 +1,160 @@
+"""
+Due-date reminders for MZ
+Keeps the active tasks with due dates in one slot per day and a thread that
+says when a day's tasks come due
+"""
+import heapq
+import logging
+import threading
+from datetime import date
+
+from task_validator import parse_due_date
+
+logger = logging.getLogger('MZ')
+
+
+def _due_day(task):
+    # The day number a task should be reminded on, or None if it shouldn't be
+    if task.get("completed") or not task.get("due_date"):
+        return None
+    due = parse_due_date(task["due_date"])
+    return None if due is None else due.toordinal()
+
+
+class ReminderWheel:
+    """
+    Tasks waiting for a reminder, filed by due day.
+
+    Due dates are whole days, so the wheel has one slot per day: a dict
+    of task id -> task. Filing a task, moving it or cancelling it is a
+    dict operation, O(1), because each task's day is remembered too.
+
+    A small heap holds the days that have slots. Checking what's due
+    pops days off it until the next one is in the future, so it only
+    ever looks at due tasks - never at every task. Days whose slot was
+    emptied by cancelling are left in the heap and skipped when they
+    come up.
+
+    It has the same task_changed/task_deleted methods as Memory, so it
+    can be told about changes the same way (see task_manager.watchers).
+    Calls from the REPL and the reminder thread can overlap, so
+    everything happens under a lock.
+    """
+
+    def __init__(self, tasks=()):
+        self._lock = threading.Lock()
+        # day number -> {task id: task}
+        self._slots = {}
+        # task id -> day number it's filed under
+        self._days = {}
+        # Day numbers with a slot, soonest first (may include emptied ones)
+        self._heap = []
+        for task in tasks:
+            self.task_changed(task)
+
+    def __len__(self):
+        return len(self._days)
+
+    def task_changed(self, task):
+        """File a new or changed task under its due day (completed tasks are taken out)"""
+        task_id = task["id"]
+        day = _due_day(task)
+        with self._lock:
+            old_day = self._days.get(task_id)
+            if old_day is not None and old_day != day:
+                self._cancel(task_id, old_day)
+            if day is None:
+                return
+
+            slot = self._slots.get(day)
+            if slot is None:
+                slot = self._slots[day] = {}
+                heapq.heappush(self._heap, day)
+            # A copy, so edits made after this (on another thread) don't change what gets shown
+            slot[task_id] = dict(task)
+            self._days[task_id] = day
+
+    def task_deleted(self, task_id):
+        """Forget a task"""
+        with self._lock:
+            day = self._days.get(task_id)
+            if day is not None:
+                self._cancel(task_id, day)
+
+    def _cancel(self, task_id, day):
+        del self._days[task_id]
+        slot = self._slots[day]
+        del slot[task_id]
+        if not slot:
+            # The day stays in the heap and is skipped when it comes up
+            del self._slots[day]
+
+    def pop_due(self, today=None):
+        """
+        Take out every task due on or before today.
+
+        Each task is only handed out once. It comes back if it's filed
+        again with a new due date (e.g. a repeating task that was done).
+
+        Args:
+            today: datetime.date to check against (default: today)
+
+        Returns:
+            List of tasks, soonest due first
+        """
+        today = (today or date.today()).toordinal()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0] <= today:
+                day = heapq.heappop(self._heap)
+                slot = self._slots.pop(day, None)
+                if slot is None:
+                    continue  # Emptied by cancelling
+                for task_id, task in slot.items():
+                    del self._days[task_id]
+                    due.append(task)
+        return due
+
+
+class ReminderThread:
+    """
+    Background thread that checks a ReminderWheel every `interval` seconds.
+
+    Due tasks are passed to notify(tasks), which is called on this
+    thread - it should just print, not touch memory.
+    """
+
+    def __init__(self, wheel, notify, interval=60.0, today=date.today):
+        self.wheel = wheel
+        self.notify = notify
+        self.interval = interval
+        self._today = today
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mz-reminders", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def check(self):
+        """Remind about anything due now. Returns the tasks reminded about."""
+        due = self.wheel.pop_due(self._today())
+        if due:
+            try:
+                self.notify(due)
+            except Exception as e:
+                logger.error(f"Reminder failed: {e}")
+        return due
+
+    def close(self):
+        """Stop the thread. Safe to call twice."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        # Check straight away (for anything overdue), then once per interval
+        while True:
+            self.check()
+            if self._stop.wait(self.interval):
+                break
@@ -0,0 +1,207 @@
+"""
+Recovery of damaged memory files for MZ
+Streams through a truncated or corrupted memory.json and keeps every intact record
+"""
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+logger = logging.getLogger('MZ')
+
+# Largest single record we'll buffer while looking for its end
+MAX_RECORD_SIZE = 16 * 1024 * 1024
+
+# Top-level scalar keys worth keeping. The lookbehind skips escaped quotes inside message text.
+TOP_LEVEL_KEY = re.compile(r'(?<!\\)"(conversation_log|schema_version)"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+)')
+
+_decoder = json.JSONDecoder()
+
+
+def is_message(record):
+    """True if record looks like a conversation message"""
+    return (isinstance(record, dict)
+            and record.get("role") in ("user", "assistant")
+            and "content" in record)
+
+def is_task(record):
+    """True if record looks like a task"""
+    return (isinstance(record, dict)
+            and isinstance(record.get("id"), str)
+            and "content" in record)
+
+
+def iter_records(f, chunk_size=1024 * 1024):
+    """
+    Yield every intact JSON object found inside a memory file, in file order.
+
+    Skips the outer {...} and tries to decode each '{' after it as a
+    complete object. Objects that decode are yielded and skipped over
+    whole; anything that doesn't decode is stepped past one character at
+    a time. Only a chunk or so of the file is held in memory at once.
+
+    Args:
+        f: File opened in text mode
+        chunk_size: How much to read at a time
+
+    Yields:
+        (kind, value): ("record", dict) for objects, or ("key", (name, value))
+        for top-level settings like schema_version and conversation_log
+    """
+    markers = []
+    overlap = ""
+
+    def read():
+        # Top-level keys aren't inside any record, so look for them in the raw text as it comes in
+        nonlocal overlap
+        text = f.read(chunk_size)
+        window = overlap + text
+        for match in TOP_LEVEL_KEY.finditer(window):
+            # Matches that end inside the overlap were already seen last time
+            if match.end() > len(overlap):
+                markers.append((match.group(1), match.group(2)))
+        overlap = window[-64:]
+        return text
+
+    buffer = read()
+    eof = len(buffer) < chunk_size
+
+    # Step inside the outer object so it isn't mistaken for a record
+    position = 0
+    if buffer.lstrip().startswith("{"):
+        position = buffer.index("{") + 1
+
+    while True:
+        for name, value in markers:
+            try:
+                yield "key", (name, json.loads(value))
+            except json.JSONDecodeError:
+                pass
+        markers.clear()
+
+        start = buffer.find("{", position)
+
+        if start == -1:
+            if eof:
+                return
+            buffer = read()
+            eof = len(buffer) < chunk_size
+            position = 0
+            continue
+
+        try:
+            record, end = _decoder.raw_decode(buffer, start)
+        except json.JSONDecodeError:
+            # Maybe the object just runs past the end of what we've read
+            if not eof and len(buffer) - start < MAX_RECORD_SIZE:
+                more = read()
+                eof = len(more) < chunk_size
+                buffer = buffer[start:] + more
+                position = 0
+                continue
+
+            # Genuinely broken - step past this brace and keep looking
+            position = start + 1
+            continue
+
+        yield "record", record
+        position = end
+
+
+def quarantine_file(path):
+    """Move a damaged file aside as <path>.corrupt-<timestamp>. Returns the new path."""
+    quarantine = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    os.replace(path, quarantine)
+    return quarantine
+
+
+def rewrite_memory_file(source_path, out_path, transform_task=None, top_level=None, chunk_size=1024 * 1024):
+    """
+    Stream the records of one memory file into a fresh, valid one.
+
+    Messages go straight to out_path as they are read; tasks are held in
+    memory (de-duplicated by id, last copy wins) and written at the end.
+    Top-level keys that come before the first message in the source
+    (like schema_version in files MZ wrote) stay at the top.
+
+    Args:
+        source_path: File to read (may be damaged)
+        out_path: File to write
+        transform_task: Optional function applied to each task before it's kept
+        top_level: Top-level keys to write, overriding any found in the source
+        chunk_size: How much to read at a time
+
+    Returns:
+        Dictionary with 'messages', 'tasks' and 'keys' (top-level keys found in the source)
+    """
+    tasks = {}
+    keys = {}
+    message_count = 0
+
+    top_level = top_level or {}
+    # Keys already written above the conversations
+    written = set(top_level)
+    started = False
+
+    with open(source_path, "r", encoding="utf-8", errors="replace") as source, open(out_path, "w") as out:
+        out.write("{\n")
+        for name, setting in top_level.items():
+            out.write(f'    {json.dumps(name)}: {json.dumps(setting)},\n')
+
+        for kind, value in iter_records(source, chunk_size):
+            if kind == "key":
+                name, setting = value
+                keys[name] = setting
+                if not started and name not in written:
+                    out.write(f'    {json.dumps(name)}: {json.dumps(setting)},\n')
+                    written.add(name)
+            elif is_message(value):
+                if not started:
+                    out.write('    "conversations": [')
+                    started = True
+                out.write(",\n        " if message_count else "\n        ")
+                out.write(json.dumps(value))
+                message_count += 1
+            elif is_task(value):
+                if transform_task is not None:
+                    value = transform_task(value)
+                tasks[value["id"]] = value
+
+        if not started:
+            out.write('    "conversations": [')
+        out.write("\n    ],\n")
+        for name, setting in keys.items():
+            if name not in written:
+                out.write(f'    {json.dumps(name)}: {json.dumps(setting)},\n')
+        out.write('    "tasks": ')
+        out.write(json.dumps(list(tasks.values()), indent=4).replace("\n", "\n    "))
+        out.write("\n}\n")
+        out.flush()
+        os.fsync(out.fileno())
+
+    return {"messages": message_count, "tasks": len(tasks), "keys": keys}
+
+
+def salvage_memory(path, chunk_size=1024 * 1024):
+    """
+    Rebuild a damaged memory file from whatever records are still intact.
+
+    The original file is kept next to it as <path>.corrupt-<timestamp>.
+
+    Args:
+        path: The damaged memory.json
+        chunk_size: How much to read at a time
+
+    Returns:
+        Dictionary with 'messages', 'tasks' and 'quarantine' (the original's new path)
+    """
+    tmp_path = path + ".salvage"
+    result = rewrite_memory_file(path, tmp_path, chunk_size=chunk_size)
+
+    # Keep the original around rather than overwrite it, then swap the rebuilt file in
+    quarantine = quarantine_file(path)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Salvaged {result['messages']} messages and {result['tasks']} tasks. Original kept at {quarantine}.")
+    return {"messages": result["messages"], "tasks": result["tasks"], "quarantine": quarantine}
@@ -0,0 +1,160 @@
+"""
+SQLite storage backend for MZ
+Stores conversations and tasks as rows instead of one JSON blob
+"""
+import json
+import logging
+import os
+import sqlite3
+
+from memory_store import ChangeTracker, Memory, MemoryStore, default_memory
+
+logger = logging.getLogger('MZ')
+
+# Task fields that get their own column, so the database can be read with any SQLite tool -
+# everything is also kept in 'data', which is what load() reads
+TASK_COLUMNS = ["id", "content", "priority", "category", "due_date", "completed", "created_at", "completed_at"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    position INTEGER PRIMARY KEY,
+    message TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    content TEXT,
+    priority TEXT,
+    category TEXT,
+    due_date TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    completed_at TEXT,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SqliteStore:
+    """
+    Memory backend backed by an SQLite database.
+
+    Has the same load()/save(memory) interface as MemoryStore. Each save
+    writes only the messages and tasks that changed, as single-row
+    INSERT/UPDATE/DELETE statements in one transaction.
+
+    load() still reads every task into memory, where task_manager's
+    TaskStore indexes answer the queries - what SQLite saves is rewriting
+    the whole file on every change.
+    """
+
+    def __init__(self, path, import_from=None, columnar=False):
+        """
+        Args:
+            path: Path to the .db file
+            import_from: memory.json to import the first time the database is created
+            columnar: Load tasks into a TaskTable instead of a TaskStore
+        """
+        self.path = path
+        self.import_from = import_from
+        self.columnar = columnar
+        self._tracker = ChangeTracker()
+
+        is_new = not os.path.exists(path)
+        # The background writer runs save batches from its own thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+        if is_new and import_from and os.path.exists(import_from):
+            self._import_json(import_from)
+
+    def _import_json(self, json_path):
+        # MemoryStore does the reading, so binary snapshots, the journal, old schemas and a
+        # conversation log all come across. journal=False just keeps it from compacting the json files.
+        try:
+            memory = MemoryStore(json_path, journal=False).load()
+        except (OSError, ValueError) as e:
+            logger.info(f"Could not import {json_path} ({e}) - starting with empty memory.")
+            return
+
+        data = {"conversations": list(memory["conversations"]), "tasks": list(memory["tasks"])}
+        self.write([[self._statement(entry) for entry in ChangeTracker().changes(data)]])
+        logger.info(f"Imported {len(data['conversations'])} messages and {len(data['tasks'])} tasks from {json_path}.")
+
+    # ------------------------------------------------------------------
+    # load/save interface
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Read every message and task into a memory dictionary."""
+        memory = default_memory()
+
+        rows = self.conn.execute("SELECT message FROM conversations ORDER BY position")
+        memory["conversations"] = [json.loads(message) for (message,) in rows]
+
+        rows = self.conn.execute("SELECT data FROM tasks ORDER BY seq")
+        memory["tasks"] = [json.loads(data) for (data,) in rows]
+
+        logger.info("memory.db loaded successfully.")
+        memory = Memory(memory, columnar=self.columnar)
+        self._tracker.mark_saved(memory)
+        return memory
+
+    def save(self, memory):
+        """Write the messages and tasks that changed since the last save."""
+        batch = self.prepare(memory)
+        if batch is not None:
+            self.write([batch])
+
+    def prepare(self, memory):
+        """
+        Turn the changes since the last save into ready-to-run statements.
+
+        Returns:
+            A batch for write(), or None if nothing changed
+        """
+        entries = self._tracker.changes(memory)
+        if not entries:
+            return None
+
+        self._tracker.mark_saved(memory)
+        return [self._statement(entry) for entry in entries]
+
+    def write(self, batches):
+        """Run prepared batches in a single transaction."""
+        # Committed on success, rolled back on error
+        with self.conn:
+            for batch in batches:
+                for sql, params in batch:
+                    self.conn.execute(sql, params)
+
+        logger.info(f"Memory saved successfully ({sum(len(batch) for batch in batches)} rows).")
+
+    def _statement(self, entry):
+        op = entry["op"]
+
+        if op == "message":
+            return (
+                "INSERT OR REPLACE INTO conversations (position, message) VALUES (?, ?)",
+                (entry["index"], json.dumps(entry["message"]))
+            )
+
+        if op == "delete_task":
+            return ("DELETE FROM tasks WHERE id = ?", (entry["id"],))
+
+        task = entry["task"]
+        values = [task.get(column) for column in TASK_COLUMNS]
+        values[TASK_COLUMNS.index("completed")] = 1 if task.get("completed") else 0
+
+        # ON CONFLICT ... DO UPDATE keeps the row's seq, so task order survives edits
+        updates = ", ".join(f"{column} = excluded.{column}" for column in TASK_COLUMNS[1:])
+        return (
+            f"INSERT INTO tasks ({', '.join(TASK_COLUMNS)}, data) "
+            f"VALUES ({', '.join('?' * len(TASK_COLUMNS))}, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}, data = excluded.data",
+            values + [json.dumps(task)]
+        )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,127 @@
+"""
+Task dependencies for MZ
+Which tasks are waiting on others, and which are ready to start
+"""
+
+
+class TaskGraph:
+    """
+    The "depends_on" links between tasks, kept ready for /task ready.
+
+    Every task id maps to the ids it depends on and the ids that depend
+    on it, plus a count of how many of its dependencies are still
+    active. A task is ready when it's active and that count is zero;
+    the ready ones are kept in a set, so asking for them is just
+    reading it - there's no topological sort per query.
+
+    Changes are handled locally: when a task is completed (or comes
+    back, or is deleted) only the counts of the tasks that depend on it
+    change. Dependencies on ids that aren't there (e.g. deleted tasks)
+    count as done.
+    """
+
+    def __init__(self, tasks=()):
+        # id -> True if completed, for every task in the graph
+        self._completed = {}
+        # id -> ids it depends on
+        self._depends_on = {}
+        # id -> ids that depend on it (may name ids that aren't in the graph yet)
+        self._dependents = {}
+        # id -> how many of its dependencies are still active
+        self._blocking = {}
+        # Active tasks with nothing left blocking them
+        self._ready = set()
+        for task in tasks:
+            self.update(task)
+
+    def _active(self, task_id):
+        return self._completed.get(task_id) is False
+
+    def _refresh(self, task_id):
+        if self._active(task_id) and not self._blocking.get(task_id):
+            self._ready.add(task_id)
+        else:
+            self._ready.discard(task_id)
+
+    def _set_active(self, task_id, was_active, is_active):
+        # A task that starts or stops being active blocks or unblocks its dependents
+        if was_active == is_active:
+            return
+        change = 1 if is_active else -1
+        for dependent in self._dependents.get(task_id, ()):
+            self._blocking[dependent] = self._blocking.get(dependent, 0) + change
+            self._refresh(dependent)
+
+    def update(self, task):
+        """Add a task, or take in changes to its depends_on list or completed flag"""
+        task_id = task["id"]
+        depends_on = set(task.get("depends_on") or ())
+        old_depends_on = self._depends_on.get(task_id, set())
+        was_active = self._active(task_id)
+
+        for dependency in old_depends_on - depends_on:
+            self._dependents[dependency].discard(task_id)
+            if self._active(dependency):
+                self._blocking[task_id] -= 1
+        for dependency in depends_on - old_depends_on:
+            self._dependents.setdefault(dependency, set()).add(task_id)
+            if self._active(dependency):
+                self._blocking[task_id] = self._blocking.get(task_id, 0) + 1
+
+        self._depends_on[task_id] = depends_on
+        self._completed[task_id] = bool(task.get("completed"))
+        self._set_active(task_id, was_active, self._active(task_id))
+        self._refresh(task_id)
+
+    def discard(self, task_id):
+        """Take a deleted task out. Tasks that depended on it stop waiting for it."""
+        if task_id not in self._completed:
+            return
+        self._set_active(task_id, self._active(task_id), False)
+        for dependency in self._depends_on.pop(task_id):
+            self._dependents[dependency].discard(task_id)
+        del self._completed[task_id]
+        self._blocking.pop(task_id, None)
+        self._ready.discard(task_id)
+
+    def ready(self):
+        """Ids of the active tasks that aren't waiting on any active task (in no particular order)"""
+        return self._ready
+
+    def blocked_by(self, task_id):
+        """The active tasks this task is still waiting on"""
+        return [dependency for dependency in self._depends_on.get(task_id, ()) if self._active(dependency)]
+
+    def dependents(self, task_id):
+        """Ids of the tasks that wait on this one (completed or not)"""
+        return [dependent for dependent in self._dependents.get(task_id, ()) if dependent in self._completed]
+
+    def would_cycle(self, task_id, depends_on):
+        """
+        Whether making task_id depend on these ids would make a loop of tasks waiting on each other.
+
+        Only the tasks reachable from the new dependencies are looked at.
+
+        Returns:
+            The loop as a list of ids, starting and ending at task_id, or None if there isn't one
+        """
+        # Depth-first search from each new dependency, looking for a way back to task_id
+        for start in depends_on:
+            path = [task_id, start]
+            stack = [iter(self._depends_on.get(start, ()))]
+            seen = {start}
+            if start == task_id:
+                return path
+            while stack:
+                dependency = next(stack[-1], None)
+                if dependency is None:
+                    stack.pop()
+                    path.pop()
+                    continue
+                if dependency == task_id:
+                    return path + [task_id]
+                if dependency not in seen:
+                    seen.add(dependency)
+                    path.append(dependency)
+                    stack.append(iter(self._depends_on.get(dependency, ())))
+        return None
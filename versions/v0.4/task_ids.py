@@ -0,0 +1,207 @@
+"""
+Task ids for MZ
+Time-sortable, ULID-style ids: task_ + 10 characters of timestamp + 16 of randomness
+"""
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+PREFIX = "task_"
+
+# Crockford's base32: no I, L, O or U, so ids can't be misread
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ALPHABET_SET = frozenset(ALPHABET)
+
+TIME_CHARS = 10      # 48-bit millisecond timestamp
+RANDOM_CHARS = 16    # 80 random bits
+RANDOM_BITS = 80
+ID_LENGTH = len(PREFIX) + TIME_CHARS + RANDOM_CHARS
+
+
+def _encode(number, length):
+    chars = []
+    for _ in range(length):
+        chars.append(ALPHABET[number & 31])
+        number >>= 5
+    return "".join(reversed(chars))
+
+
+def _decode(text):
+    number = 0
+    for char in text:
+        number = number * 32 + ALPHABET.index(char)
+    return number
+
+
+class IdGenerator:
+    """
+    Makes task ids that sort in the order they were made.
+
+    The timestamp comes first, so sorting ids as text sorts them by
+    creation time. Two ids made in the same millisecond get consecutive
+    random parts instead of two independent ones, so even then they come
+    out in order. With 80 random bits per millisecond there's no need to
+    check a new id against existing ones.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def __call__(self):
+        with self._lock:
+            now_ms = int(self._clock() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = secrets.randbits(RANDOM_BITS)
+            else:
+                # Same millisecond (or the clock went back): count up from the last id
+                self._last_random += 1
+                if self._last_random >> RANDOM_BITS:
+                    self._last_ms += 1
+                    self._last_random = 0
+            return PREFIX + _encode(self._last_ms, TIME_CHARS) + _encode(self._last_random, RANDOM_CHARS)
+
+
+new_task_id = IdGenerator()
+
+
+def is_sortable_id(task_id):
+    """True for ids made by IdGenerator (older MZ versions used task_ + 8 hex characters)"""
+    return (len(task_id) == ID_LENGTH and task_id.startswith(PREFIX)
+            and ALPHABET_SET.issuperset(task_id[len(PREFIX):]))
+
+
+def id_time(task_id):
+    """When a sortable id was made, as a local datetime (None for older ids)"""
+    if not is_sortable_id(task_id):
+        return None
+    ms = _decode(task_id[len(PREFIX):len(PREFIX) + TIME_CHARS])
+    return datetime.fromtimestamp(ms / 1000)
+
+
+def id_at(moment):
+    """The smallest possible id made at `moment` (a datetime) - a bound for range queries"""
+    ms = int(moment.timestamp() * 1000)
+    return PREFIX + _encode(ms, TIME_CHARS) + "0" * RANDOM_CHARS
+
+
+def short_id(task_id, length=8):
+    """
+    Short form of an id for display.
+
+    For sortable ids that's the end of the random part, which is what
+    differs between ids made close together. Older ids are short already
+    and are shown without the prefix.
+    """
+    if is_sortable_id(task_id) and length:
+        return task_id[-length:]
+    return task_id[len(PREFIX):] if task_id.startswith(PREFIX) else task_id
+
+
+class SortedIds:
+    """
+    The sortable task ids in order - which is creation order - for time-range queries.
+
+    New ids are the largest yet, so adding one is normally an append.
+    """
+
+    def __init__(self, task_ids=()):
+        self._ids = sorted(task_id for task_id in task_ids if is_sortable_id(task_id))
+
+    def add(self, task_id):
+        """Add an id (older, non-sortable ids are ignored)"""
+        if not is_sortable_id(task_id):
+            return
+        if not self._ids or task_id > self._ids[-1]:
+            self._ids.append(task_id)
+        else:
+            position = bisect_left(self._ids, task_id)
+            if position == len(self._ids) or self._ids[position] != task_id:
+                self._ids.insert(position, task_id)
+
+    def discard(self, task_id):
+        """Remove an id, if it's there"""
+        position = bisect_left(self._ids, task_id)
+        if position < len(self._ids) and self._ids[position] == task_id:
+            del self._ids[position]
+
+    def between(self, start=None, end=None):
+        """Ids made from start (inclusive) to end (exclusive). Either can be None for open-ended."""
+        low = bisect_left(self._ids, id_at(start)) if start is not None else 0
+        high = bisect_left(self._ids, id_at(end)) if end is not None else len(self._ids)
+        return self._ids[low:high]
+
+
+class IdLookup:
+    """
+    Finds task ids from the start of what the user typed.
+
+    Every id is filed under its full form (without "task_") and, for
+    sortable ids, under its short display form too, in one sorted list.
+    All keys starting with some text sit next to each other there, so a
+    binary search finds them without looking at any other id. Matching
+    ignores case.
+    """
+
+    def __init__(self, task_ids=(), display_length=8):
+        self.display_length = display_length
+        self._keys = sorted((key, task_id) for task_id in task_ids for key in self._keys_for(task_id))
+
+    def _keys_for(self, task_id):
+        keys = {(task_id[len(PREFIX):] if task_id.startswith(PREFIX) else task_id).lower()}
+        if is_sortable_id(task_id) and self.display_length:
+            keys.add(short_id(task_id, self.display_length).lower())
+        return keys
+
+    def add(self, task_id):
+        """File a new id"""
+        for key in self._keys_for(task_id):
+            entry = (key, task_id)
+            position = bisect_left(self._keys, entry)
+            if position == len(self._keys) or self._keys[position] != entry:
+                self._keys.insert(position, entry)
+
+    def discard(self, task_id):
+        """Remove an id, if it's there"""
+        for key in self._keys_for(task_id):
+            entry = (key, task_id)
+            position = bisect_left(self._keys, entry)
+            if position < len(self._keys) and self._keys[position] == entry:
+                del self._keys[position]
+
+    def matches(self, text):
+        """
+        Ids that text could be short for.
+
+        Args:
+            text: A full id, the start of one (with or without "task_"),
+                or the start of a short display form
+
+        Returns:
+            Matching ids, without repeats. If text is exactly one id's full
+            or display form, just that id.
+        """
+        query = text.strip().lower()
+        if query.startswith(PREFIX):
+            query = query[len(PREFIX):]
+        if not query:
+            return []
+
+        found = {}
+        exact = []
+        position = bisect_left(self._keys, (query,))
+        while position < len(self._keys) and self._keys[position][0].startswith(query):
+            key, task_id = self._keys[position]
+            found[task_id] = True
+            if key == query:
+                exact.append(task_id)
+            position += 1
+
+        if len(exact) == 1:
+            return exact
+        return list(found)
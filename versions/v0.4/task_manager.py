@@ -2,19 +2,76 @@
 Task management module for MZ
 Handles CRUD operations for tasks
 """
-import uuid
-from datetime import datetime
+import heapq
+from datetime import date, datetime
+from itertools import islice
 from config import load_config
+from recurrence import make_rule, next_occurrence, occurrences
+from task_ids import new_task_id, short_id
+from task_store import task_store
+from task_validator import TaskValidator, parse_due_date
+from undo_log import UndoLog
 
 # Load configuration
 config = load_config()
 
+# Checks new tasks against the priorities and categories in config
+validator = TaskValidator.from_config(config['tasks'])
+
+# "columnar" keeps tasks in a TaskTable (one array per field) - see task_table.py
+COLUMNAR = config['tasks'].get('table') == 'columnar'
+
+def _store(memory):
+    # memory["tasks"] as the configured kind of store
+    return task_store(memory, columnar=COLUMNAR)
+
+# Other things that want to hear about task changes, e.g. the reminder wheel
+# (see reminders.py). Each has task_changed(task) and task_deleted(task_id), like Memory.
+watchers = []
+
+# Every change made here is logged for /undo and /redo (see undo_log.py)
+history = UndoLog(config['tasks'].get('undo_levels', 200))
+
+def _notify_change(memory, task):
+    # Memory loaded from disk tracks changed tasks so saves only write those.
+    # Plain dicts (like in the tests) don't, and that's fine.
+    if hasattr(memory, "task_changed"):
+        memory.task_changed(task)
+    for watcher in watchers:
+        watcher.task_changed(task)
+
+def _notify_delete(memory, task_id):
+    if hasattr(memory, "task_deleted"):
+        memory.task_deleted(task_id)
+    for watcher in watchers:
+        watcher.task_deleted(task_id)
+
+def _record_change(memory, task, before=None):
+    # before: the task as it was (None for a new task) - what /undo puts back
+    history.record(task["id"], before, task, description=f"change task {display_id(task['id'])}")
+    _notify_change(memory, task)
+
+def _record_delete(memory, task):
+    history.record(task["id"], task, None, description=f"delete task {display_id(task['id'])}")
+    _notify_delete(memory, task["id"])
+
 # Define function that generated unique ids
 def generate_task_id():
-    # Generate a unique task ID
-    return f"task_{str(uuid.uuid4())[:8]}"
+    # Generate a unique task ID - sortable by creation time (see task_ids.py)
+    return new_task_id()
+
+def display_id(task_id):
+    """The short form of a task id to show the user (length set by id_display_length in config)"""
+    return short_id(task_id, config['tasks'].get('id_display_length', 8))
 
-def validate_task_input(content, priority, category, due_date):
+class TaskValidationError(ValueError):
+    """Raised by the bulk functions when any task in a batch is invalid (nothing is changed)"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+def validate_task_input(content, priority, category, due_date, repeat=None):
     """
     Validate task inputs before adding to memory.
 
@@ -23,41 +80,41 @@ def validate_task_input(content, priority, category, due_date):
         priority: Priority level (high/medium/low or None)
         category: Category name or None
         due_date: Date string (YYYY-MM-DD) or None
+        repeat: Repeat rule (daily/weekly/monthly/3d/2w/6m or None)
 
     Returns: 
         List if errors messages (empty list if valid)
     """
-    # Define valid value
-    VALID_PRIORITIES = config['tasks']['valid_priorities']
-    VALID_CATEGORIES = config['tasks']['valid_categories']
+    # The validator has the allowed values from config ready (see task_validator.py)
+    return [str(error) for error in validator.check(content, priority, category, due_date, repeat)]
 
-    # Create empty error list
-    errors = []
+def _new_task(content, priority, category, due_date, reasoning, repeat=None):
+    # Step 1: Generate a unique ID for this task
+    task_id = generate_task_id()
 
-    # Check content
-    if not content or len(content.strip()) == 0:
-        errors.append("Task content cannot be empty")
-        
-    # Check priority
-    if priority and priority not in VALID_PRIORITIES:
-        errors.append(f"Invalid priority: {priority}. Must be one of: {VALID_PRIORITIES}")  
-    
-    # Check category
-    if category:
-        if  category not in VALID_CATEGORIES:
-            errors.append(f"Invalid category: {category}. Must be one of: {VALID_CATEGORIES}")
-    
-    # Check due_date
-    if due_date:
-        try:
-            datetime.strptime(due_date, "%Y-%m-%d")
-            # If we get here, it's valid - do nothing
-        except ValueError:
-            errors.append(f"Invalid date format: {due_date}. Must be YYYY-MM-DD")
-        # Return all errors found
-    return errors
+    # Step 2: Get the current time
+    created_at = datetime.now().isoformat()
+
+    # Step 3: Create the task dictionary with all the fields
+    task = {
+        "id": task_id,
+        "content": content,
+        "priority": priority,
+        "category": category,
+        "due_date": due_date,
+        "priority_reasoning": reasoning,
+        "completed": False,
+        "created_at": created_at,
+        "completed_at": None
+    }
+
+    # Repeating tasks keep their rule; due_date is always the next time it's due
+    if repeat:
+        task["repeat"] = make_rule(repeat, due_date)
+    return task
 
-def add_task(memory, content, priority=None, category=None, due_date=None, reasoning=None):
+def add_task(memory, content, priority=None, category=None, due_date=None, reasoning=None, repeat=None,
+             depends_on=None, on_duplicate=None):
     """
     Add a new task to memory
     
@@ -68,12 +125,18 @@ def add_task(memory, content, priority=None, category=None, due_date=None, reaso
         category: Task category (optional)
         due_date: Due date string (optional)
         reasoning: Priority reasoning (optional)
+        repeat: Repeat rule, e.g. daily, weekly, monthly, 3d (optional - needs due_date)
+        depends_on: Ids of tasks that have to be done first (optional)
+        on_duplicate: What to do if an active task already says nearly the same -
+            "warn", "merge" or "off" (optional, default from config.yaml)
     
     Returns:
-        The created task
+        The created task - or with "merge", the existing task it was merged into
     """
     # Step 0
-    errors = validate_task_input(content, priority, category, due_date)
+    errors = validate_task_input(content, priority, category, due_date, repeat)
+    store = _store(memory)
+    errors += _dependency_errors(store, depends_on or ())
 
     if errors:
         # Validation failed - don't create task
@@ -90,73 +153,525 @@ def add_task(memory, content, priority=None, category=None, due_date=None, reaso
 
     # If we get here, validation passed
 
-    # Step 1: Generate a unique ID for this taskpyth
-    task_id = generate_task_id()
+    # Is this already on the list, worded a bit differently?
+    on_duplicate = on_duplicate or config['tasks'].get('duplicates', 'warn')
+    if on_duplicate != "off":
+        duplicates = find_duplicates(memory, content)
+        if duplicates and on_duplicate == "merge":
+            merged = _merge_into(memory, duplicates[0], repeat=repeat, depends_on=depends_on, priority=priority,
+                                 category=category, due_date=due_date, priority_reasoning=reasoning)
+            if merged is not None:
+                return merged
+        for duplicate in duplicates[:3]:
+            print(f"Possible duplicate of task {display_id(duplicate['id'])}: {duplicate['content']}")
 
-    # Step 2: Get the current time
-    created_at = datetime.now().isoformat()
-
-    # Step 3: Create the task dictionary with all the fields
-    task = {
-        "id": task_id,
-        "content": content,
-        "priority": priority,
-        "category": category,
-        "due_date": due_date,
-        "priority_reasoning": reasoning,
-        "completed": False,
-        "created_at": created_at,
-        "completed_at": None
-    }
+    # Steps 1-3: Build the task dictionary with a new id and the current time
+    task = _new_task(content, priority, category, due_date, reasoning, repeat)
+    if depends_on:
+        # A brand new task can't be part of a loop - nothing depends on it yet
+        task["depends_on"] = list(dict.fromkeys(depends_on))
 
     # Step 4: Add this task to memory
-    memory["tasks"].append(task)
+    store.add(task)
+    with history.step(f"add task {display_id(task['id'])}"):
+        _record_change(memory, task)
 
     # Step 5: Return the task we just created
     return task
 
-def list_tasks(memory, filter_completed=False):
+def list_tasks(memory, filter_completed=False, category=None, priority=None, due_before=None):
     """
-    List all tasks
+    List tasks, optionally filtered
     
     Args:
         memory: Memory dictionary
         filter_completed: If True, exclude completed tasks
+        category: Only tasks in this category (optional)
+        priority: Only tasks with this priority (optional)
+        due_before: Only tasks due on or before this YYYY-MM-DD date (optional)
     
     Returns:
-        List of tasks
+        List of tasks, oldest first
+    
+    Raises:
+        TaskValidationError: If due_before isn't a YYYY-MM-DD date
     """
-    # Get all tasks
-    all_tasks = memory["tasks"]
+    return list(iter_tasks(memory, filter_completed, category, priority, due_before))
 
-    # If we should filter out completed tasks
-    if filter_completed:
-        # Only return tasks where completed is False
-        return [task for task in all_tasks if not task["completed"]]
+def iter_tasks(memory, filter_completed=False, category=None, priority=None, due_before=None):
+    """
+    Like list_tasks, but gives the tasks one at a time as they're needed
     
-    # Otherwise return all tasks
-    return all_tasks
+    Yields:
+        Tasks, oldest first
+    
+    Raises:
+        TaskValidationError: If due_before isn't a YYYY-MM-DD date
+    """
+    # Dates are compared as text, so anything else would match the wrong tasks
+    if due_before is not None and parse_due_date(due_before) is None:
+        raise TaskValidationError([f"Invalid date format: {due_before}. Must be YYYY-MM-DD"])
+    
+    # The store keeps indexes for each filter, so this doesn't scan every task
+    return _store(memory).iter_tasks(
+        completed=False if filter_completed else None,
+        category=category,
+        priority=priority,
+        due_before=due_before
+    )
 
-def complete_task(memory, task_id):
-    """Mark a task as complete"""
-    # Loop through all tasks to find the matching one
-    for task in memory ["tasks"]:
-        # Found it! Mark as complete
-        task["completed"] = True
-        task["completed_at"] = datetime.now().isoformat
-        return True # Success
+def list_page(memory, page=1, limit=50, filter_completed=False, category=None, priority=None, due_before=None):
+    """
+    Get one page of list_tasks
     
-    # If we get here, task wasn't found
-    return False # Failure
+    Args:
+        memory: Memory dictionary
+        page: Which page, starting from 1
+        limit: Tasks per page
+        filter_completed, category, priority, due_before: Same as list_tasks
+    
+    Returns:
+        (tasks on that page, whether there are more pages after it)
+    """
+    tasks = iter_tasks(memory, filter_completed, category, priority, due_before)
+    start = (page - 1) * limit
+    # Ask for one task past the page - if it's there, there's another page
+    page_tasks = list(islice(tasks, start, start + limit + 1))
+    return page_tasks[:limit], len(page_tasks) > limit
+
+def next_tasks(memory, count=1):
+    """
+    Get the active tasks to work on next
+    
+    Args:
+        memory: Memory dictionary
+        count: How many tasks to return
+    
+    Returns:
+        Up to `count` tasks: soonest due date first, then highest priority
+        (in the order of valid_priorities in config.yaml), then oldest
+    """
+    return _store(memory).next_tasks(count, config['tasks']['valid_priorities'])
+
+def search_tasks(memory, query, limit=None):
+    """
+    Search tasks by the words in their content and priority reasoning
+    
+    Args:
+        memory: Memory dictionary
+        query: Words that must all appear (each can be the start of a word)
+        limit: Most results to return (optional)
+    
+    Returns:
+        Matching tasks, best match first
+    """
+    return _store(memory).search(query, limit)
+
+def tasks_created_between(memory, start=None, end=None):
+    """
+    Get the tasks created in a time range, using the time inside their ids
+    
+    Args:
+        memory: Memory dictionary
+        start: datetime to start from (inclusive), or None
+        end: datetime to stop at (exclusive), or None
+    
+    Returns:
+        List of tasks, oldest first
+    """
+    return _store(memory).created_between(start, end)
+
+def match_task_ids(memory, text):
+    """
+    Find the tasks an abbreviated id could mean
+    
+    Args:
+        memory: Memory dictionary
+        text: A full task id, the start of one, or the start of its short display form
+    
+    Returns:
+        List of matching task ids - exactly one if the abbreviation is unambiguous
+    """
+    return _store(memory).match_ids(text, config['tasks'].get('id_display_length', 8))
+
+def iter_occurrences(memory, start, end):
+    """
+    Every time an active task is due between two dates, repeats included
+    
+    Repeating tasks are stored once, so their dates are worked out here,
+    only for the window asked about. The results are merged lazily, so
+    taking the first few doesn't work out the rest.
+    
+    Args:
+        memory: Memory dictionary
+        start: First day, YYYY-MM-DD
+        end: Last day (included), YYYY-MM-DD
+    
+    Yields:
+        (due date as YYYY-MM-DD, task), earliest first. A repeating task
+        that's overdue (due before start) comes first at its real due
+        date, since it's still waiting to be done - so a date before
+        start means overdue.
+    """
+    first, last = parse_due_date(start), parse_due_date(end)
+    if first is None or last is None:
+        return
+
+    # A repeating task's due_date is its next date, so the tasks due by `end` are the only ones with dates in the window
+    streams = []
+    for task in iter_tasks(memory, filter_completed=True, due_before=end):
+        rule = task.get("repeat")
+        due = parse_due_date(task["due_date"])
+        if rule and due is not None:
+            if due < first:
+                streams.append([(task["due_date"], task)])
+            streams.append(_dated(occurrences(rule, start=max(first, due), end=last), task))
+        elif task["due_date"] >= start:
+            streams.append([(task["due_date"], task)])
+
+    yield from heapq.merge(*streams, key=lambda occurrence: occurrence[0])
+
+def ready_tasks(memory):
+    """
+    Get the active tasks that aren't waiting on another active task
+    
+    Returns:
+        List of tasks, oldest first
+    """
+    # The store keeps the ready set up to date as tasks change, so nothing is sorted out here
+    return _store(memory).ready_tasks()
+
+def blocked_by(memory, task_id):
+    """Ids of the active tasks a task is still waiting on"""
+    return _store(memory).dependency_graph().blocked_by(task_id)
+
+def _dependency_errors(store, depends_on):
+    # What's wrong with a list of ids to wait on. A repeating task is never
+    # completed (it moves to its next date), so waiting on one would be forever.
+    errors = []
+    for task_id in depends_on:
+        task = store.get(task_id)
+        if task is None:
+            errors.append(f"Task not found: {task_id}")
+        elif task.get("repeat"):
+            errors.append(f"Can't wait on task {display_id(task_id)}: it repeats, so it's never finished")
+    return errors
+
+def add_dependencies(memory, task_id, depends_on):
+    """
+    Make a task wait until other tasks are done
+    
+    Args:
+        memory: Memory dictionary
+        task_id: The task that has to wait
+        depends_on: Ids of the tasks it waits on
+    
+    Returns:
+        The updated task
+    
+    Raises:
+        TaskValidationError: If an id doesn't exist, a task to wait on repeats,
+            or the tasks would end up waiting on each other in a loop (nothing is changed)
+    """
+    store = _store(memory)
+    _check_ids(store, [task_id])
+    errors = _dependency_errors(store, depends_on)
+    if errors:
+        raise TaskValidationError(errors)
+
+    task = store.get(task_id)
+    current = task.get("depends_on") or []
+    new = [dependency for dependency in dict.fromkeys(depends_on) if dependency not in current]
+    if not new:
+        return task
+
+    loop = store.dependency_graph().would_cycle(task_id, new)
+    if loop:
+        raise TaskValidationError([
+            "That would make tasks wait on each other in a loop: " + " -> ".join(display_id(i) for i in loop)
+        ])
+
+    before = dict(task)
+    task = store.update(task_id, depends_on=current + new)
+    with history.step(f"make task {display_id(task_id)} wait on {len(new)} task(s)"):
+        _record_change(memory, task, before)
+    return task
+
+def _dated(days, task):
+    # (YYYY-MM-DD, task) for each date, made as they're asked for
+    for day in days:
+        yield day.isoformat(), task
+
+def _today():
+    # Today's date (a function so tests can pick the day)
+    return date.today()
+
+def _completion(task, completed_at):
+    # The fields to change when a task is done. A repeating task moves on to its next date instead -
+    # the first one after today if it was overdue, so it isn't left overdue.
+    rule = task.get("repeat")
+    due = parse_due_date(task.get("due_date") or "")
+    if rule and due is not None:
+        return {"due_date": next_occurrence(rule, max(due, _today())).isoformat()}
+    return {"completed": True, "completed_at": completed_at}
+
+def complete_task(memory, task_id):
+    """Mark a task as complete (a repeating task moves to its next due date instead)"""
+    # Look the task up by its id
+    store = _store(memory)
+    task = store.get(task_id)
+
+    # No task with that id
+    if task is None:
+        return False # Failure
+
+    # A copy of how it was, for /undo (the store changes the task in place)
+    before = dict(task)
+    task = store.update(task_id, **_completion(task, datetime.now().isoformat()))
+    with history.step(f"complete task {display_id(task_id)}"):
+        _record_change(memory, task, before)
+    return True # Success
 
 def delete_task(memory, task_id):
     """Remove a task from memory"""
-    # Loop through tasks to find the matching one
-    for i, task in enumerate(memory["tasks"]):
-        if task["id"] == task_id:
-            # Found it! Remove from lost
-            memory["tasks"].pop(i)
-            return True # Success
-        
-    # If we get here, task wan
-    
\ No newline at end of file
+    # Remove it by id - no need to search the list
+    task = _store(memory).remove(task_id)
+    if task is None:
+        # Task wasn't found
+        return False # Failure
+
+    with history.step(f"delete task {display_id(task_id)}"):
+        _record_delete(memory, task)
+    return True # Success
+
+# --------------------------------------------------
+# Bulk operations
+# --------------------------------------------------
+# Each one checks the whole batch first and only then changes anything,
+# so a bad entry means no changes at all rather than half a batch.
+
+TASK_FIELDS = ("content", "priority", "category", "due_date", "reasoning", "repeat", "depends_on")
+
+def find_duplicates(memory, content):
+    """
+    Find active tasks that say nearly the same thing as content
+    
+    Uses a MinHash index (see duplicates.py), so it doesn't compare
+    against every task. How alike counts as "nearly the same" is
+    duplicate_threshold in config.yaml.
+    
+    Returns:
+        List of tasks, most similar first
+    """
+    return _store(memory).similar_tasks(content, config['tasks'].get('duplicate_threshold', 0.6))
+
+def _merge_into(memory, task, repeat=None, depends_on=None, **fields):
+    # Fill in what the existing task doesn't have yet from the new one; its own values win.
+    # Returns None if the new task's repeat or depends_on can't go on the existing task
+    # (it would be waited on while repeating, or wait on tasks in a loop) - then it's added as usual.
+    store = _store(memory)
+    graph = store.dependency_graph()
+    fields = {field: value for field, value in fields.items() if value and not task.get(field)}
+
+    if repeat and not task.get("repeat"):
+        if graph.dependents(task["id"]):
+            return None
+        fields["repeat"] = make_rule(repeat, task.get("due_date") or fields["due_date"])
+
+    current = task.get("depends_on") or []
+    new = [dependency for dependency in dict.fromkeys(depends_on or ()) if dependency not in current]
+    if new:
+        if graph.would_cycle(task["id"], new):
+            return None
+        fields["depends_on"] = current + new
+
+    print(f"Merged into existing task {display_id(task['id'])}: {task['content']}")
+    if not fields:
+        return task
+
+    before = dict(task)
+    task = store.update(task["id"], **fields)
+    with history.step(f"merge into task {display_id(task['id'])}"):
+        _record_change(memory, task, before)
+    return task
+
+def add_tasks(memory, specs):
+    """
+    Add many tasks at once
+    
+    Args:
+        memory: Memory dictionary
+        specs: List of dicts with add_task's arguments, e.g.
+            {"content": "Read chapter 3", "priority": "high", "due_date": "2026-01-10"}
+            depends_on is a list of ids, which can be abbreviated like in /task done
+    
+    Returns:
+        The created tasks, in the same order
+    
+    Raises:
+        TaskValidationError: If any spec is invalid (no tasks are added)
+    """
+    store = _store(memory)
+    errors = []
+    # Spec number -> the full ids of the tasks it waits on
+    resolved = {}
+    for number, spec in enumerate(specs, 1):
+        if not isinstance(spec, dict):
+            errors.append(f"Task {number}: must be a dictionary of task fields")
+            continue
+
+        unknown = [field for field in spec if field not in TASK_FIELDS]
+        if unknown:
+            errors.append(f"Task {number}: unknown field(s) {unknown}. Must be among: {list(TASK_FIELDS)}")
+
+        # Files can hold anything, so make sure every field is text before checking values
+        not_text = [field for field in TASK_FIELDS
+                    if field != "depends_on" and spec.get(field) is not None and not isinstance(spec[field], str)]
+        if not_text:
+            errors.append(f"Task {number}: field(s) {not_text} must be text")
+            continue
+
+        depends_on = spec.get("depends_on")
+        if depends_on is not None:
+            if not isinstance(depends_on, list) or not all(isinstance(task_id, str) for task_id in depends_on):
+                errors.append(f"Task {number}: depends_on must be a list of task ids")
+                continue
+            # Same checks as add_dependencies. The new tasks can't make a loop:
+            # they only wait on tasks that already exist, and nothing waits on them yet.
+            task_ids, id_errors = _resolve_ids(store, depends_on)
+            errors += [f"Task {number}: {error}" for error in id_errors + _dependency_errors(store, task_ids)]
+            resolved[number] = task_ids
+
+        for error in validator.check(spec.get("content"), spec.get("priority"),
+                                     spec.get("category"), spec.get("due_date"), spec.get("repeat")):
+            errors.append(f"Task {number}: {error}")
+
+    if errors:
+        raise TaskValidationError(errors)
+
+    tasks = []
+    with history.step(f"add {len(specs)} tasks"):
+        for number, spec in enumerate(specs, 1):
+            task = _new_task(spec["content"], spec.get("priority"), spec.get("category"),
+                             spec.get("due_date"), spec.get("reasoning"), spec.get("repeat"))
+            if resolved.get(number):
+                task["depends_on"] = list(dict.fromkeys(resolved[number]))
+            store.add(task)
+            _record_change(memory, task)
+            tasks.append(task)
+
+    return tasks
+
+def _resolve_ids(store, words):
+    # Full ids for ids or abbreviations, plus an error for each that isn't exactly one task
+    task_ids, errors = [], []
+    for word in words:
+        matches = store.match_ids(word, config['tasks'].get('id_display_length', 8))
+        if len(matches) == 1:
+            task_ids.append(matches[0])
+        elif matches:
+            errors.append(f"'{word}' matches {len(matches)} tasks - type more of the id")
+        else:
+            errors.append(f"Task not found: {word}")
+    return task_ids, errors
+
+def _check_ids(store, task_ids):
+    # Returns the ids without repeats, so each task is only changed once
+    missing = [task_id for task_id in task_ids if task_id not in store]
+    if missing:
+        raise TaskValidationError([f"Task not found: {task_id}" for task_id in missing])
+    return list(dict.fromkeys(task_ids))
+
+def complete_tasks(memory, task_ids):
+    """
+    Mark many tasks complete at once (repeating tasks move to their next due date)
+    
+    Returns:
+        Number of tasks completed
+    
+    Raises:
+        TaskValidationError: If any id doesn't exist (no tasks are changed)
+    """
+    store = _store(memory)
+    task_ids = _check_ids(store, task_ids)
+
+    # One timestamp for the whole batch
+    completed_at = datetime.now().isoformat()
+    with history.step(f"complete {len(task_ids)} tasks"):
+        for task_id in task_ids:
+            before = dict(store.get(task_id))
+            task = store.update(task_id, **_completion(before, completed_at))
+            _record_change(memory, task, before)
+
+    return len(task_ids)
+
+def delete_tasks(memory, task_ids):
+    """
+    Delete many tasks at once
+    
+    Returns:
+        Number of tasks deleted
+    
+    Raises:
+        TaskValidationError: If any id doesn't exist (no tasks are deleted)
+    """
+    store = _store(memory)
+    task_ids = _check_ids(store, task_ids)
+
+    with history.step(f"delete {len(task_ids)} tasks"):
+        for task_id in task_ids:
+            _record_delete(memory, store.remove(task_id))
+
+    return len(task_ids)
+
+# --------------------------------------------------
+# Undo and redo
+# --------------------------------------------------
+
+def _restore(memory, task_id, state):
+    # Put one task back the way it was in a logged change (None = not there).
+    # A deleted task that comes back is added again, so it goes to the end of the list.
+    store = _store(memory)
+    if state is None:
+        if store.remove(task_id) is not None:
+            _notify_delete(memory, task_id)
+    else:
+        task = dict(state)
+        store.add(task)
+        _notify_change(memory, task)
+
+def undo(memory):
+    """
+    Undo the latest task change (an add, complete or delete - bulk ones as a whole)
+    
+    Returns:
+        What was undone, e.g. "delete task a1b2c3d4", or None if there's nothing to undo
+    """
+    step = history.undo()
+    if step is None:
+        return None
+    # Each task goes back to how it was before the step's first change to it
+    states = {}
+    for task_id, before, _ in step.changes:
+        states.setdefault(task_id, before)
+    for task_id, state in states.items():
+        _restore(memory, task_id, state)
+    return step.description
+
+def redo(memory):
+    """
+    Redo the latest undone task change
+    
+    Returns:
+        What was redone, or None if there's nothing to redo
+    """
+    step = history.redo()
+    if step is None:
+        return None
+    # Each task ends up as it was after the step's last change to it
+    states = {}
+    for task_id, _, after in step.changes:
+        states[task_id] = after
+    for task_id, state in states.items():
+        _restore(memory, task_id, state)
+    return step.description
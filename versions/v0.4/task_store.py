@@ -0,0 +1,537 @@
+"""
+In-memory task storage for MZ
+Tasks keyed by id, so finding, completing and deleting one doesn't mean scanning them all
+"""
+import heapq
+from bisect import bisect_right, insort
+from itertools import islice
+
+from duplicates import SimilarityIndex
+from task_graph import TaskGraph
+from task_ids import IdLookup, SortedIds
+from text_index import TextIndex
+
+# Sorts after any real YYYY-MM-DD, so tasks without a due date come last
+NO_DUE_DATE = "9999-99-99"
+
+
+class TaskStore:
+    """
+    The task list, indexed by id.
+
+    Tasks are kept in a dict of id -> task. Dicts remember insertion
+    order, so iterating gives tasks oldest first, exactly like the old
+    list did, and deleting one is O(1) instead of shifting every task
+    after it.
+
+    It behaves enough like a list (len, iteration, [0], append, ==) that
+    code written for memory["tasks"] being a list keeps working, and
+    list(store) is what gets saved - the file format doesn't change.
+
+    Alongside that it keeps secondary indexes for list_tasks(): tasks
+    bucketed by category, by priority and by completed, plus a sorted
+    (due_date, id) list. Changes made through add/update/remove keep them
+    current. If a task dict is edited directly, call reindex(task) after.
+
+    The first next_tasks() call also builds a heap of active tasks for
+    "what should I do next". It's kept up to date from then on, with
+    completed and deleted tasks left in it and skipped when they surface.
+    In the same way, the first search() builds a full-text index of task
+    content and priority reasoning (see text_index.py), the first
+    dependency query builds the depends_on graph (see task_graph.py), and
+    the first similar_tasks() builds a near-duplicate index of the active
+    tasks' content (see duplicates.py).
+    """
+
+    def __init__(self, tasks=()):
+        self._tasks = {}
+
+        # id -> position it was first added at, so query results come back oldest first
+        self._order = {}
+        self._next_order = 0
+
+        # id -> the indexed field values the task was filed under
+        self._indexed = {}
+        # (field, value) -> {id: task}, in the order tasks were filed
+        self._buckets = {}
+        # Buckets a task joined out of creation order (e.g. completed later), which need sorting
+        self._unordered = set()
+        # Sorted (due_date, id) for every task that has a due date
+        self._due = []
+
+        # next_tasks() heap of (due date, priority rank, created_at, id), built on first use.
+        # _scheduled holds the one entry per active task that is still current.
+        self._heap = None
+        self._ranks = None
+        self._scheduled = {}
+
+        # search() word index, built on first use
+        self._text = None
+        # created_between() and match_ids() id indexes, built on first use
+        self._created = None
+        self._lookup = None
+        # depends_on graph for ready_tasks(), built on first use
+        self._graph = None
+        # similar_tasks() index of active tasks' content, built on first use
+        self._similar = None
+
+        for task in tasks:
+            self.add(task)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, task_id):
+        """The task with this id, or None"""
+        return self._tasks.get(task_id)
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def ids(self):
+        """Every task id, oldest first"""
+        return self._tasks.keys()
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def add(self, task):
+        """Add a task, replacing any existing task with the same id (it keeps its place)."""
+        task_id = task["id"]
+        self._tasks[task_id] = task
+        if task_id not in self._order:
+            self._order[task_id] = self._next_order
+            self._next_order += 1
+            if self._created is not None:
+                self._created.add(task_id)
+            if self._lookup is not None:
+                self._lookup.add(task_id)
+        self._index(task)
+        return task
+
+    def update(self, task_id, **fields):
+        """
+        Change fields of a task in place.
+
+        Args:
+            task_id: The task to change
+            **fields: New values, e.g. completed=True
+
+        Returns:
+            The updated task, or None if there's no task with that id
+        """
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+        task.update(fields)
+        self.reindex(task)
+        return task
+
+    def remove(self, task_id):
+        """Delete a task. Returns the removed task, or None if it wasn't there."""
+        self._unindex(task_id)
+        self._order.pop(task_id, None)
+        if self._created is not None:
+            self._created.discard(task_id)
+        if self._lookup is not None:
+            self._lookup.discard(task_id)
+        return self._tasks.pop(task_id, None)
+
+    def clear(self):
+        """Delete every task"""
+        self._tasks.clear()
+        self._order.clear()
+        self._indexed.clear()
+        self._buckets.clear()
+        self._unordered.clear()
+        self._due.clear()
+        self._heap = None
+        self._scheduled.clear()
+        self._text = None
+        self._created = None
+        self._lookup = None
+        self._graph = None
+        self._similar = None
+
+    def reindex(self, task):
+        """Refile a task whose fields were changed directly."""
+        if self._tasks.get(task["id"]) is task:
+            self._index(task)
+
+    # ------------------------------------------------------------------
+    # Secondary indexes
+    # ------------------------------------------------------------------
+
+    def _index(self, task):
+        """File a task under its current field values, moving it only in the indexes that changed."""
+        task_id = task["id"]
+        keys = (
+            ("category", task.get("category")),
+            ("priority", task.get("priority")),
+            ("completed", bool(task.get("completed"))),
+        )
+        due_date = task.get("due_date") or None
+        old_keys, old_due_date = self._indexed.get(task_id, ((), None))
+
+        for key in old_keys:
+            if key not in keys:
+                self._drop_from_bucket(key, task_id)
+
+        order = self._order[task_id]
+        for key in keys:
+            bucket = self._buckets.setdefault(key, {})
+            if key in old_keys:
+                bucket[task_id] = task
+                continue
+            # Anything newer already in the bucket means it's no longer oldest first
+            if bucket and self._order[next(reversed(bucket))] > order:
+                self._unordered.add(key)
+            bucket[task_id] = task
+
+        if due_date != old_due_date:
+            if old_due_date:
+                self._drop_from_due(old_due_date, task_id)
+            if due_date:
+                insort(self._due, (due_date, task_id))
+
+        self._indexed[task_id] = (keys, due_date)
+
+        if self._heap is not None:
+            self._schedule(task)
+        if self._text is not None:
+            self._text.add(task_id, _searchable_text(task))
+        if self._graph is not None:
+            self._graph.update(task)
+        if self._similar is not None:
+            if task.get("completed"):
+                self._similar.discard(task_id)
+            else:
+                self._similar.add(task_id, task.get("content") or "")
+
+    def _unindex(self, task_id):
+        # Its heap entry stays behind and is skipped once it reaches the top
+        self._scheduled.pop(task_id, None)
+        if self._text is not None:
+            self._text.discard(task_id)
+        if self._graph is not None:
+            self._graph.discard(task_id)
+        if self._similar is not None:
+            self._similar.discard(task_id)
+
+        indexed = self._indexed.pop(task_id, None)
+        if indexed is None:
+            return
+
+        keys, due_date = indexed
+        for key in keys:
+            self._drop_from_bucket(key, task_id)
+        if due_date:
+            self._drop_from_due(due_date, task_id)
+
+    def _drop_from_bucket(self, key, task_id):
+        bucket = self._buckets[key]
+        del bucket[task_id]
+        if not bucket:
+            del self._buckets[key]
+            self._unordered.discard(key)
+
+    def _drop_from_due(self, due_date, task_id):
+        # Entries are unique, so the one just left of where it would go is it
+        position = bisect_right(self._due, (due_date, task_id)) - 1
+        del self._due[position]
+
+    def list_tasks(self, completed=None, category=None, priority=None, due_before=None):
+        """
+        List tasks matching every given filter. Same arguments as iter_tasks().
+
+        Returns:
+            List of matching tasks, oldest first
+        """
+        return list(self.iter_tasks(completed, category, priority, due_before))
+
+    def iter_tasks(self, completed=None, category=None, priority=None, due_before=None):
+        """
+        Go through the tasks matching every given filter, using the indexes.
+
+        The smallest index bucket among the filters is the starting point
+        and the other filters are checked against just those tasks, so the
+        cost follows the size of the answer, not the number of tasks.
+
+        Args:
+            completed: True/False to only get completed/active tasks, None for both
+            category: Only tasks in this category
+            priority: Only tasks with this priority
+            due_before: Only tasks due on or before this YYYY-MM-DD date
+
+        Yields:
+            Matching tasks, oldest first. Tasks are found as they're asked
+            for, so taking just the first few doesn't check the rest.
+        """
+        # Each filter: (how many tasks it allows, those tasks, its bucket key, a test for one task)
+        buckets = []
+        if completed is not None:
+            buckets.append((("completed", bool(completed)), lambda task: bool(task.get("completed")) == bool(completed)))
+        if category is not None:
+            buckets.append((("category", category), lambda task: task.get("category") == category))
+        if priority is not None:
+            buckets.append((("priority", priority), lambda task: task.get("priority") == priority))
+
+        filters = []
+        for key, check in buckets:
+            bucket = self._buckets.get(key, {})
+            filters.append((len(bucket), bucket.values(), key, check))
+
+        if due_before is not None:
+            # "\uffff" sorts after every id, so every task due on due_before is included
+            end = bisect_right(self._due, (due_before, "\uffff"))
+            due = (self._tasks[task_id] for _, task_id in islice(self._due, end))
+            filters.append((end, due, None, lambda task: bool(task.get("due_date")) and task["due_date"] <= due_before))
+
+        if not filters:
+            yield from self._tasks.values()
+            return
+
+        # Walk the smallest set and check the other filters on just those tasks
+        filters.sort(key=lambda f: f[0])
+        _, matches, key, _ = filters[0]
+        if key in self._unordered:
+            matches = self._sort_bucket(key).values()
+        for _, _, _, check in filters[1:]:
+            matches = filter(check, matches)
+
+        if key is None:
+            # The due date index isn't in creation order, so every match has to be found before the first can be given
+            order = self._order
+            matches = sorted(matches, key=lambda task: order[task["id"]])
+        yield from matches
+
+    def _sort_bucket(self, key):
+        # Put a bucket back in creation order once, so it can be walked in order again after that
+        order = self._order
+        bucket = self._buckets[key] = dict(sorted(self._buckets[key].items(), key=lambda item: order[item[0]]))
+        self._unordered.discard(key)
+        return bucket
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def next_tasks(self, count, priority_order):
+        """
+        The active tasks to do first: soonest due, then most important, then oldest.
+
+        Args:
+            count: How many tasks to return
+            priority_order: Priorities from most to least important. Tasks
+                with no priority (or one not listed) come after all of them.
+
+        Returns:
+            Up to `count` tasks, most pressing first
+        """
+        ranks = {priority: rank for rank, priority in enumerate(priority_order)}
+        if self._heap is None or ranks != self._ranks:
+            self._ranks = ranks
+            self._rebuild_heap()
+        elif len(self._heap) > 2 * len(self._scheduled) + 64:
+            # Mostly stale entries - cheaper to start over than to keep skipping them
+            self._rebuild_heap()
+
+        heap = self._heap
+        found = []
+        while heap and len(found) < count:
+            entry = heapq.heappop(heap)
+            task_id = entry[-1]
+            if self._scheduled.get(task_id) != entry:
+                continue  # Completed, deleted or rescheduled since it was pushed
+            found.append(entry)
+
+        # The tasks are still to do, so they go back in
+        for entry in found:
+            heapq.heappush(heap, entry)
+
+        return [self._tasks[entry[-1]] for entry in found]
+
+    def _schedule_key(self, task):
+        rank = self._ranks.get(task.get("priority"), len(self._ranks))
+        return (task.get("due_date") or NO_DUE_DATE, rank, task.get("created_at") or "", task["id"])
+
+    def _schedule(self, task):
+        task_id = task["id"]
+        if task.get("completed"):
+            self._scheduled.pop(task_id, None)
+            return
+
+        entry = self._schedule_key(task)
+        if self._scheduled.get(task_id) != entry:
+            self._scheduled[task_id] = entry
+            heapq.heappush(self._heap, entry)
+
+    def _rebuild_heap(self):
+        self._scheduled = {
+            task["id"]: self._schedule_key(task)
+            for task in self._tasks.values() if not task.get("completed")
+        }
+        self._heap = list(self._scheduled.values())
+        heapq.heapify(self._heap)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query, limit=None):
+        """
+        Find tasks whose content or priority reasoning contains every word of query.
+
+        Words match as prefixes, so "cs50 wee" finds "CS50P week 4".
+
+        Args:
+            query: Words to look for
+            limit: Most results to return (None for all)
+
+        Returns:
+            Matching tasks, best match first (oldest first among equal scores)
+        """
+        if self._text is None:
+            self._text = TextIndex()
+            for task_id, task in self._tasks.items():
+                self._text.add(task_id, _searchable_text(task))
+
+        order = self._order
+        results = self._text.search(query)
+
+        def rank(result):
+            return (-result[0], order[result[1]])
+
+        if limit is not None and limit < len(results):
+            results = heapq.nsmallest(limit, results, key=rank)
+        else:
+            results.sort(key=rank)
+        return [self._tasks[task_id] for _, task_id in results]
+
+    def created_between(self, start=None, end=None):
+        """
+        Tasks created from start up to (not including) end, oldest first.
+
+        Uses the creation time in the task ids (see task_ids.py), so tasks
+        with ids from before sortable ids aren't included.
+
+        Args:
+            start, end: datetimes, or None for no limit on that side
+        """
+        if self._created is None:
+            self._created = SortedIds(self._tasks)
+        return [self._tasks[task_id] for task_id in self._created.between(start, end)]
+
+    def match_ids(self, text, display_length=8):
+        """
+        Ids that an abbreviated id could stand for. See task_ids.IdLookup.
+
+        Args:
+            text: What the user typed
+            display_length: How long the short display form of an id is
+        """
+        if self._lookup is None or self._lookup.display_length != display_length:
+            self._lookup = IdLookup(self._tasks, display_length)
+        return self._lookup.matches(text)
+
+    def similar_tasks(self, content, threshold=0.6):
+        """
+        Active tasks whose content is nearly the same as content.
+
+        Args:
+            content: Text of a task, e.g. one about to be added
+            threshold: How alike they must be, from 0 to 1 (see duplicates.py)
+
+        Returns:
+            Matching tasks, most similar first (oldest first among equals)
+        """
+        if self._similar is None:
+            self._similar = SimilarityIndex()
+            for task_id, task in self._tasks.items():
+                if not task.get("completed"):
+                    self._similar.add(task_id, task.get("content") or "")
+
+        order = self._order
+        results = sorted(self._similar.similar(content, threshold), key=lambda result: (-result[0], order[result[1]]))
+        return [self._tasks[task_id] for _, task_id in results]
+
+    # ------------------------------------------------------------------
+    # Dependencies
+    # ------------------------------------------------------------------
+
+    def dependency_graph(self):
+        """The TaskGraph of depends_on links, built the first time it's needed"""
+        if self._graph is None:
+            self._graph = TaskGraph(self._tasks.values())
+        return self._graph
+
+    def ready_tasks(self):
+        """Active tasks that aren't waiting on any active task, oldest first"""
+        order = self._order
+        ready = sorted(self.dependency_graph().ready(), key=order.__getitem__)
+        return [self._tasks[task_id] for task_id in ready]
+
+    # ------------------------------------------------------------------
+    # List interface
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __getitem__(self, index):
+        # Positional access is a walk through the dict - fine for [0] or [-1], not for loops
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self._tasks)
+        if index < 0 or index >= len(self._tasks):
+            raise IndexError("task index out of range")
+        return next(islice(self._tasks.values(), index, None))
+
+    def __eq__(self, other):
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"TaskStore({list(self)!r})"
+
+    def append(self, task):
+        """Same as add() - for code that treats the store as a list"""
+        self.add(task)
+
+    def pop(self, index=-1):
+        """Remove and return the task at a position, like list.pop()"""
+        return self.remove(self[index]["id"])
+
+
+def task_store(memory, columnar=False):
+    """
+    Get memory's tasks as a TaskStore, converting a plain list in place the first time.
+
+    Args:
+        memory: Memory dictionary
+        columnar: Use a TaskTable (see task_table.py) instead of a TaskStore
+
+    Returns:
+        The TaskStore (or TaskTable) in memory["tasks"]
+    """
+    # Imported here because task_table only matters to very large task lists
+    from task_table import TaskTable
+
+    kind = TaskTable if columnar else TaskStore
+    tasks = memory["tasks"]
+    if not isinstance(tasks, kind):
+        tasks = kind(tasks)
+        memory["tasks"] = tasks
+    return tasks
+
+
+def _searchable_text(task):
+    return f"{task.get('content') or ''} {task.get('priority_reasoning') or ''}"
@@ -0,0 +1,490 @@
+"""
+Column-oriented task storage for MZ
+One array per field instead of one dict per task, for very large task lists
+"""
+import heapq
+from array import array
+from datetime import date
+from itertools import islice
+
+from duplicates import SimilarityIndex
+from task_graph import TaskGraph
+from task_ids import IdLookup, SortedIds
+from text_index import TextIndex
+
+# NumPy is optional - filters are vectorized with it and fall back to bytes tricks without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The fields every task has. Anything else a task carries is kept on the side.
+FIELDS = ("id", "content", "priority", "category", "due_date",
+          "priority_reasoning", "completed", "created_at", "completed_at")
+
+# Sorts after every real day ordinal, so tasks without a due date come last
+NO_DUE_DAY = 2 ** 31 - 1
+
+
+class Categories:
+    """Categorical encoding: each distinct value gets a small code. Code 0 means None."""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) > 255:
+                raise ValueError("More than 255 distinct values in a categorical column")
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _day(due_date):
+    """YYYY-MM-DD -> day ordinal, or None if it isn't a date"""
+    try:
+        return date.fromisoformat(due_date).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+class TaskTable:
+    """
+    Tasks stored column by column, with the same interface as TaskStore.
+
+    Each field is its own column: Python lists for the text fields, one
+    byte per task for priority and category (as codes, see Categories),
+    the due date as a day number in an int array, and one byte per task
+    for the completed flag. Deleted rows are marked dead in an `alive`
+    column and cleared out once they are half the table.
+
+    Filters in list_tasks() run over whole columns at once - with NumPy
+    if it's installed, otherwise with bytes.translate and big-integer
+    AND, which also run in C.
+
+    Tasks handed out are plain dicts built from a row. Changing one
+    doesn't change the table until it is passed to reindex() (which
+    Memory.task_changed does) or changed through update().
+    """
+
+    def __init__(self, tasks=()):
+        self.priorities = Categories()
+        self.categories = Categories()
+        self._reset_columns()
+        self._text = None
+        self._created = None
+        self._lookup = None
+        self._graph = None
+        self._similar = None
+        # Scheduling heap for next_tasks, built on first use. Same lazy deletion as
+        # TaskStore: _scheduled holds the one entry per active task that is still current.
+        self._heap = None
+        self._ranks = None
+        self._scheduled = {}
+        for task in tasks:
+            self.add(task)
+
+    def _reset_columns(self):
+        self._rows = {}
+        self._ids = []
+        self._content = []
+        self._reasoning = []
+        self._created_at = []
+        self._completed_at = []
+        self._priority = bytearray()
+        self._category = bytearray()
+        self._due = array("l")
+        self._completed = bytearray()
+        self._alive = bytearray()
+        # row -> fields that don't fit the columns (unknown keys, due dates that aren't dates)
+        self._extras = {}
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def _task(self, row):
+        task = {
+            "id": self._ids[row],
+            "content": self._content[row],
+            "priority": self.priorities.values[self._priority[row]],
+            "category": self.categories.values[self._category[row]],
+            "due_date": date.fromordinal(self._due[row]).isoformat() if self._due[row] else None,
+            "priority_reasoning": self._reasoning[row],
+            "completed": bool(self._completed[row]),
+            "created_at": self._created_at[row],
+            "completed_at": self._completed_at[row],
+        }
+        extras = self._extras.get(row)
+        if extras:
+            task.update(extras)
+        return task
+
+    def _write_row(self, row, task):
+        extras = {key: value for key, value in task.items() if key not in FIELDS}
+
+        due_date = task.get("due_date")
+        day = _day(due_date) if due_date else 0
+        if day is None:
+            extras["due_date"] = due_date
+            day = 0
+
+        self._content[row] = task.get("content")
+        self._reasoning[row] = task.get("priority_reasoning")
+        self._created_at[row] = task.get("created_at")
+        self._completed_at[row] = task.get("completed_at")
+        self._priority[row] = self.priorities.encode(task.get("priority"))
+        self._category[row] = self.categories.encode(task.get("category"))
+        self._due[row] = day
+        self._completed[row] = 1 if task.get("completed") else 0
+
+        if extras:
+            self._extras[row] = extras
+        else:
+            self._extras.pop(row, None)
+
+        if self._heap is not None:
+            self._schedule(row)
+        if self._text is not None:
+            self._text.add(row, f"{task.get('content') or ''} {task.get('priority_reasoning') or ''}")
+        if self._graph is not None:
+            self._graph.update(task)
+        if self._similar is not None:
+            if task.get("completed"):
+                self._similar.discard(task["id"])
+            else:
+                self._similar.add(task["id"], task.get("content") or "")
+
+    def _live_rows(self):
+        # Rows are only ever appended, so id order is row order - oldest first
+        return self._rows.values()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, task_id):
+        """The task with this id, or None"""
+        row = self._rows.get(task_id)
+        return None if row is None else self._task(row)
+
+    def __contains__(self, task_id):
+        return task_id in self._rows
+
+    def ids(self):
+        """Every task id, oldest first"""
+        return self._rows.keys()
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def add(self, task):
+        """Add a task, replacing any existing task with the same id (it keeps its place)."""
+        task_id = task["id"]
+        row = self._rows.get(task_id)
+        if row is None:
+            row = len(self._ids)
+            self._rows[task_id] = row
+            self._ids.append(task_id)
+            for column in (self._content, self._reasoning, self._created_at, self._completed_at):
+                column.append(None)
+            for column in (self._priority, self._category, self._completed):
+                column.append(0)
+            self._due.append(0)
+            self._alive.append(1)
+            if self._created is not None:
+                self._created.add(task_id)
+            if self._lookup is not None:
+                self._lookup.add(task_id)
+        self._write_row(row, task)
+        return task
+
+    def update(self, task_id, **fields):
+        """
+        Change fields of a task.
+
+        Returns:
+            The updated task, or None if there's no task with that id
+        """
+        row = self._rows.get(task_id)
+        if row is None:
+            return None
+        task = self._task(row)
+        task.update(fields)
+        self._write_row(row, task)
+        return task
+
+    def remove(self, task_id):
+        """Delete a task. Returns the removed task, or None if it wasn't there."""
+        row = self._rows.pop(task_id, None)
+        if row is None:
+            return None
+
+        task = self._task(row)
+        self._alive[row] = 0
+        self._extras.pop(row, None)
+        # Its heap entry stays behind and is skipped once it reaches the top
+        self._scheduled.pop(task_id, None)
+        if self._text is not None:
+            self._text.discard(row)
+        if self._created is not None:
+            self._created.discard(task_id)
+        if self._lookup is not None:
+            self._lookup.discard(task_id)
+        if self._graph is not None:
+            self._graph.discard(task_id)
+        if self._similar is not None:
+            self._similar.discard(task_id)
+
+        # Dead rows cost space and time in every filter, so clear them out once they pile up
+        if len(self._ids) > 64 and len(self._rows) * 2 < len(self._ids):
+            self._compact()
+        return task
+
+    def clear(self):
+        """Delete every task"""
+        self._reset_columns()
+        self._heap = None
+        self._scheduled.clear()
+        self._text = None
+        self._created = None
+        self._lookup = None
+        self._graph = None
+        self._similar = None
+
+    def reindex(self, task):
+        """Write back a task dict that was changed directly."""
+        row = self._rows.get(task["id"])
+        if row is not None:
+            self._write_row(row, task)
+
+    def _compact(self):
+        tasks = [self._task(row) for row in self._live_rows()]
+        self._reset_columns()
+        had_text = self._text is not None
+        self._text = TextIndex() if had_text else None
+        for task in tasks:
+            self.add(task)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _matching_rows(self, completed=None, category=None, priority=None, due_before=None):
+        """Row numbers (ascending) of live tasks that pass every filter"""
+        codes = []
+        if priority is not None:
+            code = self.priorities.codes.get(priority)
+            if code is None:
+                return []
+            codes.append((self._priority, code))
+        if category is not None:
+            code = self.categories.codes.get(category)
+            if code is None:
+                return []
+            codes.append((self._category, code))
+        if completed is not None:
+            codes.append((self._completed, 1 if completed else 0))
+
+        due_limit = None
+        if due_before is not None:
+            due_limit = _day(due_before)
+            if due_limit is None:
+                return []  # Not a date, so nothing is due before it
+
+        if np is not None:
+            return self._matching_rows_numpy(codes, due_limit)
+        return self._matching_rows_python(codes, due_limit)
+
+    def _matching_rows_numpy(self, codes, due_limit):
+        mask = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        for column, code in codes:
+            mask &= np.frombuffer(column, dtype=np.uint8) == code
+        if due_limit is not None:
+            due = np.frombuffer(self._due, dtype=self._due.typecode)
+            mask &= (due > 0) & (due <= due_limit)
+        return np.flatnonzero(mask).tolist()
+
+    def _matching_rows_python(self, codes, due_limit):
+        # Each byte column becomes a 0/1 mask via translate; masks combine as big integers
+        size = len(self._alive)
+        mask = int.from_bytes(self._alive, "big")
+        for column, code in codes:
+            table = bytes(1 if value == code else 0 for value in range(256))
+            mask &= int.from_bytes(column.translate(table), "big")
+
+        flags = mask.to_bytes(size, "big")
+        rows = []
+        row = flags.find(1)
+        while row != -1:
+            rows.append(row)
+            row = flags.find(1, row + 1)
+
+        if due_limit is not None:
+            due = self._due
+            rows = [row for row in rows if 0 < due[row] <= due_limit]
+        return rows
+
+    def list_tasks(self, completed=None, category=None, priority=None, due_before=None):
+        """
+        List tasks matching every given filter. Same arguments as TaskStore.list_tasks.
+
+        Returns:
+            List of matching tasks, oldest first
+        """
+        return list(self.iter_tasks(completed, category, priority, due_before))
+
+    def iter_tasks(self, completed=None, category=None, priority=None, due_before=None):
+        """
+        Go through the tasks matching every given filter. Same as TaskStore.iter_tasks.
+
+        The filters run over the columns up front, but each task dict is
+        only built when it's asked for.
+        """
+        for row in self._matching_rows(completed, category, priority, due_before):
+            yield self._task(row)
+
+    def next_tasks(self, count, priority_order):
+        """
+        The active tasks to do first. Same as TaskStore.next_tasks, with the
+        same lazily cleaned heap, so a call costs O(count log n) once it's built.
+        """
+        ranks = {priority: rank for rank, priority in enumerate(priority_order)}
+        if self._heap is None or ranks != self._ranks:
+            self._ranks = ranks
+            self._rebuild_heap()
+        elif len(self._heap) > 2 * len(self._scheduled) + 64:
+            # Mostly stale entries - cheaper to start over than to keep skipping them
+            self._rebuild_heap()
+
+        heap = self._heap
+        found = []
+        while heap and len(found) < count:
+            entry = heapq.heappop(heap)
+            if self._scheduled.get(entry[-1]) != entry:
+                continue  # Completed, deleted or rescheduled since it was pushed
+            found.append(entry)
+
+        # The tasks are still to do, so they go back in
+        for entry in found:
+            heapq.heappush(heap, entry)
+
+        return [self._task(self._rows[entry[-1]]) for entry in found]
+
+    def _schedule_key(self, row):
+        rank = self._ranks.get(self.priorities.values[self._priority[row]], len(self._ranks))
+        return (self._due[row] or NO_DUE_DAY, rank, self._created_at[row] or "", self._ids[row])
+
+    def _schedule(self, row):
+        task_id = self._ids[row]
+        if self._completed[row]:
+            self._scheduled.pop(task_id, None)
+            return
+
+        entry = self._schedule_key(row)
+        if self._scheduled.get(task_id) != entry:
+            self._scheduled[task_id] = entry
+            heapq.heappush(self._heap, entry)
+
+    def _rebuild_heap(self):
+        self._scheduled = {
+            self._ids[row]: self._schedule_key(row)
+            for row in self._matching_rows(completed=False)
+        }
+        self._heap = list(self._scheduled.values())
+        heapq.heapify(self._heap)
+
+    def search(self, query, limit=None):
+        """Full-text search. Same as TaskStore.search."""
+        if self._text is None:
+            self._text = TextIndex()
+            for row in self._live_rows():
+                self._text.add(row, f"{self._content[row] or ''} {self._reasoning[row] or ''}")
+
+        results = self._text.search(query)
+
+        def rank(result):
+            return (-result[0], result[1])
+
+        if limit is not None and limit < len(results):
+            results = heapq.nsmallest(limit, results, key=rank)
+        else:
+            results.sort(key=rank)
+        return [self._task(row) for _, row in results]
+
+    def created_between(self, start=None, end=None):
+        """Tasks created from start up to end. Same as TaskStore.created_between."""
+        if self._created is None:
+            self._created = SortedIds(self._rows)
+        return [self._task(self._rows[task_id]) for task_id in self._created.between(start, end)]
+
+    def match_ids(self, text, display_length=8):
+        """Ids that an abbreviated id could stand for. Same as TaskStore.match_ids."""
+        if self._lookup is None or self._lookup.display_length != display_length:
+            self._lookup = IdLookup(self._rows, display_length)
+        return self._lookup.matches(text)
+
+    def similar_tasks(self, content, threshold=0.6):
+        """Active tasks with nearly the same content. Same as TaskStore.similar_tasks."""
+        if self._similar is None:
+            self._similar = SimilarityIndex()
+            for row in self._live_rows():
+                if not self._completed[row]:
+                    self._similar.add(self._ids[row], self._content[row] or "")
+
+        rows = self._rows
+        results = sorted(self._similar.similar(content, threshold), key=lambda result: (-result[0], rows[result[1]]))
+        return [self._task(rows[task_id]) for _, task_id in results]
+
+    def dependency_graph(self):
+        """The TaskGraph of depends_on links. Same as TaskStore.dependency_graph."""
+        if self._graph is None:
+            self._graph = TaskGraph(self)
+        return self._graph
+
+    def ready_tasks(self):
+        """Tasks not waiting on any active task. Same as TaskStore.ready_tasks."""
+        rows = self._rows
+        ready = sorted(rows[task_id] for task_id in self.dependency_graph().ready())
+        return [self._task(row) for row in ready]
+
+    # ------------------------------------------------------------------
+    # List interface
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        for row in self._live_rows():
+            yield self._task(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self._rows)
+        if index < 0 or index >= len(self._rows):
+            raise IndexError("task index out of range")
+        return self._task(next(islice(self._live_rows(), index, None)))
+
+    def __eq__(self, other):
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"TaskTable({list(self)!r})"
+
+    def append(self, task):
+        """Same as add() - for code that treats the table as a list"""
+        self.add(task)
+
+    def pop(self, index=-1):
+        """Remove and return the task at a position, like list.pop()"""
+        return self.remove(self[index]["id"])
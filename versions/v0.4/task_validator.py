@@ -0,0 +1,116 @@
+"""
+Task input validation for MZ
+Built once from config, then reused for every task
+"""
+from datetime import date
+
+from recurrence import parse_rule
+
+
+class FieldError:
+    """
+    One problem with one field of a task.
+
+    Attributes:
+        field: Which field is wrong ("content", "priority", "category", "due_date", "repeat")
+        value: The value that was rejected
+        message: Explanation for the user (also what str() gives)
+    """
+
+    __slots__ = ("field", "value", "message")
+
+    def __init__(self, field, value, message):
+        self.field = field
+        self.value = value
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"FieldError({self.field!r}, {self.value!r}, {self.message!r})"
+
+    def __eq__(self, other):
+        return (isinstance(other, FieldError)
+                and (self.field, self.value, self.message) == (other.field, other.value, other.message))
+
+
+def parse_due_date(value):
+    """
+    Parse a YYYY-MM-DD due date.
+
+    date.fromisoformat is much faster than strptime, but also takes other
+    ISO forms like "20260110", so the shape is checked first. Due dates
+    are compared as text, which only works if they all look the same.
+
+    Returns:
+        The date, or None if value isn't a real YYYY-MM-DD date
+    """
+    if len(value) != 10 or value[4] != "-" or value[7] != "-":
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class TaskValidator:
+    """
+    Checks task fields against the allowed values from config.yaml.
+
+    The allowed priorities and categories are turned into frozensets once,
+    when the validator is built, instead of being looked up (and searched
+    as lists) for every task. The error messages still list them in config
+    order.
+    """
+
+    def __init__(self, valid_priorities, valid_categories):
+        self.valid_priorities = frozenset(valid_priorities)
+        self.valid_categories = frozenset(valid_categories)
+        self._priority_list = list(valid_priorities)
+        self._category_list = list(valid_categories)
+
+    @classmethod
+    def from_config(cls, tasks_config):
+        """Build a validator from the 'tasks' section of config.yaml"""
+        return cls(tasks_config['valid_priorities'], tasks_config['valid_categories'])
+
+    def check(self, content, priority=None, category=None, due_date=None, repeat=None):
+        """
+        Validate task inputs.
+
+        Args:
+            content: Task description
+            priority: Priority level or None
+            category: Category name or None
+            due_date: Date string (YYYY-MM-DD) or None
+            repeat: Repeat rule ("daily", "weekly", "monthly", "3d", ...) or None
+
+        Returns:
+            List of FieldError (empty if valid)
+        """
+        errors = []
+
+        if not content or not content.strip():
+            errors.append(FieldError("content", content, "Task content cannot be empty"))
+
+        if priority and priority not in self.valid_priorities:
+            errors.append(FieldError("priority", priority,
+                                     f"Invalid priority: {priority}. Must be one of: {self._priority_list}"))
+
+        if category and category not in self.valid_categories:
+            errors.append(FieldError("category", category,
+                                     f"Invalid category: {category}. Must be one of: {self._category_list}"))
+
+        if due_date and parse_due_date(due_date) is None:
+            errors.append(FieldError("due_date", due_date, f"Invalid date format: {due_date}. Must be YYYY-MM-DD"))
+
+        if repeat:
+            if parse_rule(repeat) is None:
+                errors.append(FieldError("repeat", repeat,
+                                         f"Invalid repeat: {repeat}. Must be daily, weekly, monthly "
+                                         "or a number of days/weeks/months like 3d, 2w, 6m"))
+            elif not due_date:
+                errors.append(FieldError("repeat", repeat, "A repeating task needs a due date to start from"))
+
+        return errors
@@ -0,0 +1,76 @@
+"""
+Unit tests for background_writer module
+"""
+from background_writer import BackgroundWriter
+from memory_store import MemoryStore
+
+
+class RecordingStore:
+    """Fake store that remembers every write() call"""
+
+    def __init__(self):
+        self.writes = []
+        self.version = 0
+
+    def prepare(self, memory):
+        self.version += 1
+        return self.version
+
+    def write(self, batches):
+        self.writes.append(list(batches))
+
+
+def test_rapid_saves_are_coalesced():
+    """Test that saves within the debounce delay become one write"""
+    store = RecordingStore()
+    writer = BackgroundWriter(store, delay=60)
+
+    for _ in range(5):
+        writer.save({})
+    writer.close()
+
+    assert store.writes == [[1, 2, 3, 4, 5]]
+
+
+def test_close_flushes_to_disk(tmp_path):
+    """Test that pending saves reach the journal on close"""
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path)
+    memory = store.load()
+    writer = BackgroundWriter(store, delay=60)
+
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    writer.save(memory)
+    assert not (tmp_path / "memory.json.journal").exists()
+
+    writer.close()
+
+    assert len(MemoryStore(path).load()["conversations"]) == 1
+
+
+def test_unchanged_memory_queues_nothing(tmp_path):
+    """Test that saving without changes doesn't schedule a write"""
+    store = MemoryStore(str(tmp_path / "memory.json"))
+    memory = store.load()
+    writer = BackgroundWriter(store, delay=60)
+
+    writer.save(memory)
+
+    assert writer._pending == []
+    writer.close()
+
+
+def test_close_waits_for_compaction(tmp_path):
+    """Test that a compaction started by the last write is finished before close returns"""
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path, compact_entries=1)
+    memory = store.load()
+    writer = BackgroundWriter(store, delay=60)
+
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    writer.save(memory)
+    writer.close()
+
+    assert not store._compaction.is_alive()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["memory.json"]
+    assert len(MemoryStore(path).load()["conversations"]) == 1
@@ -0,0 +1,75 @@
+"""
+Unit tests for binary_format module
+"""
+import json
+import pytest
+from binary_format import BinaryFormatError, convert, dumps, is_binary_snapshot, loads
+
+
+def sample_memory():
+    """Memory with the kinds of values MZ stores"""
+    return {
+        "conversations": [
+            {"role": "user", "content": "hi ✓"},
+            {"role": "assistant", "content": [{"type": "text", "text": "block content"}]}
+        ],
+        "tasks": [{
+            "id": "task_1",
+            "content": "Finish CS50P Week 4",
+            "priority": "high",
+            "category": "learning",
+            "due_date": "2025-12-15",
+            "priority_reasoning": None,
+            "completed": False,
+            "created_at": "2025-12-01T09:00:00",
+            "completed_at": None,
+            "estimate": 1.5,
+            "order": 3
+        }],
+        "conversation_log": "memory.conversations"
+    }
+
+
+def test_round_trip():
+    """Test that every value type survives encoding"""
+    memory = sample_memory()
+
+    assert loads(dumps(memory)) == memory
+
+
+def test_smaller_than_indented_json():
+    """Test that the binary form is smaller than the indent=4 JSON"""
+    memory = sample_memory()
+    memory["tasks"] = memory["tasks"] * 50
+
+    assert len(dumps(memory)) < len(json.dumps(memory, indent=4))
+
+
+def test_rejects_non_snapshot():
+    """Test that random bytes are refused"""
+    with pytest.raises(BinaryFormatError):
+        loads(b"not a snapshot at all")
+
+
+def test_truncated_snapshot_non_strict():
+    """Test that non-strict loading keeps the records before the damage"""
+    data = dumps(sample_memory())
+
+    memory = loads(data[:-40], strict=False)
+
+    assert len(memory["conversations"]) == 2
+    with pytest.raises(BinaryFormatError):
+        loads(data[:-40])
+
+
+def test_convert_both_ways(tmp_path):
+    """Test the JSON <-> binary converter"""
+    json_path = tmp_path / "memory.json"
+    binary_path = tmp_path / "memory.mzb"
+    back_path = tmp_path / "back.json"
+    json_path.write_text(json.dumps(sample_memory()))
+
+    assert convert(str(json_path), str(binary_path)) == "binary"
+    assert is_binary_snapshot(str(binary_path))
+    assert convert(str(binary_path), str(back_path)) == "json"
+    assert json.load(open(back_path)) == sample_memory()
@@ -0,0 +1,113 @@
+"""
+Unit tests for conversation_log module
+"""
+from conversation_log import ConversationLog, recent_messages
+
+
+def message(i):
+    """Build a numbered message, alternating user/assistant"""
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": f"msg {i}"}
+
+
+def fill(directory, count, segment_size=10):
+    """Create a log holding `count` persisted messages"""
+    log = ConversationLog(str(directory), segment_size=segment_size)
+    for i in range(count):
+        log.append(message(i))
+    log.flush()
+    return log
+
+
+def test_append_and_reopen(tmp_path):
+    """Test that flushed messages come back after reopening"""
+    fill(tmp_path, 25)
+
+    log = ConversationLog(str(tmp_path), segment_size=10, eager=5)
+
+    assert len(log) == 25
+    assert log[0] == message(0)
+    assert log[-1] == message(24)
+    assert [m["content"] for m in log[8:12]] == ["msg 8", "msg 9", "msg 10", "msg 11"]
+
+
+def test_only_recent_messages_loaded(tmp_path):
+    """Test that opening the log keeps just the eager window in RAM"""
+    fill(tmp_path, 25)
+
+    log = ConversationLog(str(tmp_path), segment_size=10, eager=5)
+
+    assert len(log._tail) == 5
+    assert log._pages == {}
+
+
+def test_old_segments_paged_in_and_evicted(tmp_path):
+    """Test that reading old messages caches a bounded number of segments"""
+    fill(tmp_path, 50)
+    log = ConversationLog(str(tmp_path), segment_size=10, eager=5, cache_segments=2)
+
+    for i in (0, 15, 25):
+        assert log[i] == message(i)
+
+    assert len(log._pages) == 2
+
+
+def test_write_is_idempotent(tmp_path):
+    """Test that writing the same batch twice doesn't duplicate messages"""
+    log = ConversationLog(str(tmp_path))
+    log.append(message(0))
+    log.write_messages(0, [message(0)])
+    log.write_messages(0, [message(0)])
+
+    assert len(ConversationLog(str(tmp_path))) == 1
+
+
+def test_torn_index_entry_is_dropped(tmp_path):
+    """Test that a half-written .idx entry is ignored"""
+    fill(tmp_path, 3)
+    with open(tmp_path / "seg-000000.idx", "ab") as f:
+        f.write(b"\x01\x02")
+
+    log = ConversationLog(str(tmp_path))
+
+    assert len(log) == 3
+
+
+def test_recent_messages_starts_with_user():
+    """Test that the window never opens with an assistant reply"""
+    conversations = [message(i) for i in range(7)]
+
+    window = recent_messages(conversations, 4)
+
+    assert window[0]["role"] == "user"
+    assert len(window) == 3
+
+
+def test_full_segments_are_archived(tmp_path):
+    """Test that sealed segments are compressed and still readable"""
+    log = ConversationLog(str(tmp_path), segment_size=10, codec="zlib")
+    for i in range(25):
+        log.append(message(i))
+    log.flush()
+
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert "seg-000000.jsonl.zz" in names
+    assert "seg-000001.jsonl.zz" in names
+    assert "seg-000000.jsonl" not in names
+    # The segment still being written stays plain
+    assert "seg-000002.jsonl" in names
+
+    reopened = ConversationLog(str(tmp_path), segment_size=10, eager=2, codec="zlib")
+    assert [m["content"] for m in reopened[5:15]] == [f"msg {i}" for i in range(5, 15)]
+
+
+def test_archives_readable_without_codec(tmp_path):
+    """Test that switching archiving off doesn't lose archived history"""
+    log = ConversationLog(str(tmp_path), segment_size=5, codec="lzma")
+    for i in range(12):
+        log.append(message(i))
+    log.flush()
+
+    reopened = ConversationLog(str(tmp_path), segment_size=5, eager=0)
+
+    assert reopened[0] == message(0)
+    assert len(reopened) == 12
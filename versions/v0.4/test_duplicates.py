@@ -0,0 +1,40 @@
+"""
+Tests for near-duplicate detection
+"""
+from duplicates import SimilarityIndex, jaccard, shingles
+
+
+def test_shingles_ignore_small_words_and_keep_numbers_whole():
+    assert shingles("Water the plants") == shingles("water plants")
+    assert "4" in shingles("Finish week 4") and "#4#" not in shingles("Finish week 4")
+
+
+def test_jaccard():
+    assert jaccard({"a", "b"}, {"b", "c"}) == 1 / 3
+    assert jaccard(set(), {"a"}) == 0.0
+
+
+def test_finds_rewordings_only():
+    """Test that near-duplicates are found and unrelated or differently numbered tasks aren't"""
+    index = SimilarityIndex()
+    index.add("interview", "Email Sarah about the interview")
+    index.add("week4", "Finish CS50P week 4")
+    index.add("groceries", "Buy groceries")
+
+    assert [doc for _, doc in index.similar("email sarah about interviews")] == ["interview"]
+    assert [doc for _, doc in index.similar("finish cs50p week 4 problems")] == ["week4"]
+    assert index.similar("Finish CS50P week 5") == []
+    assert index.similar("Buy milk") == []
+    assert index.similar("the") == []
+
+
+def test_reindex_and_discard():
+    index = SimilarityIndex()
+    index.add("a", "Call the dentist")
+    index.add("a", "Renew passport")
+    assert index.similar("call dentist") == []
+    assert [doc for _, doc in index.similar("renew my passport")] == ["a"]
+
+    index.discard("a")
+    index.discard("a")
+    assert index.similar("renew my passport") == [] and len(index) == 0
@@ -0,0 +1,262 @@
+"""
+Unit tests for memory_store module
+"""
+import json
+from memory_store import MemoryStore, open_store, validate_memory_structure
+
+
+def make_task(task_id, content):
+    """Build a minimal task dict"""
+    return {"id": task_id, "content": content, "completed": False}
+
+
+def add(memory, task):
+    """Add a task the way task_manager does, so the change gets recorded"""
+    memory["tasks"].append(task)
+    memory.task_changed(task)
+
+
+def test_load_creates_missing_file(tmp_path):
+    """Test that a missing memory file is created with defaults"""
+    path = tmp_path / "memory.json"
+    store = MemoryStore(str(path))
+
+    memory = store.load()
+
+    assert memory == {"schema_version": 3, "conversations": [], "tasks": []}
+    assert path.exists()
+
+
+def test_save_appends_only_new_messages(tmp_path):
+    """Test that journal mode writes one entry per new message"""
+    path = tmp_path / "memory.json"
+    store = MemoryStore(str(path))
+    memory = store.load()
+
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    store.save(memory)
+    memory["conversations"].append({"role": "assistant", "content": "hello"})
+    store.save(memory)
+
+    lines = open(store.journal_path).read().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])["message"]["content"] == "hello"
+
+    # The snapshot itself was not rewritten
+    assert json.load(open(path))["conversations"] == []
+
+
+def test_save_without_changes_writes_nothing(tmp_path):
+    """Test that saving unchanged memory doesn't touch the journal"""
+    store = MemoryStore(str(tmp_path / "memory.json"))
+    memory = store.load()
+
+    store.save(memory)
+
+    assert not (tmp_path / "memory.json.journal").exists()
+
+
+def test_load_replays_journal(tmp_path):
+    """Test that a new store sees messages and task changes from the journal"""
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path)
+    memory = store.load()
+
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    add(memory, make_task("task_1", "Keep"))
+    add(memory, make_task("task_2", "Remove"))
+    store.save(memory)
+
+    memory["tasks"][0]["completed"] = True
+    memory.task_changed(memory["tasks"][0])
+    memory["tasks"].pop(1)
+    memory.task_deleted("task_2")
+    store.save(memory)
+
+    reloaded = MemoryStore(path).load()
+    assert reloaded["conversations"] == [{"role": "user", "content": "hi"}]
+    assert len(reloaded["tasks"]) == 1
+    assert reloaded["tasks"][0]["completed"] == True
+
+
+def test_load_ignores_torn_journal_line(tmp_path):
+    """Test that a half-written last journal line doesn't break loading"""
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path)
+    memory = store.load()
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    store.save(memory)
+
+    with open(store.journal_path, "a") as f:
+        f.write('{"op": "message", "ind')
+
+    reloaded = MemoryStore(path).load()
+    assert len(reloaded["conversations"]) == 1
+
+
+def test_snapshot_mode_rewrites_file(tmp_path):
+    """Test that journal=False keeps the old full-rewrite behaviour"""
+    path = tmp_path / "memory.json"
+    store = MemoryStore(str(path), journal=False)
+    memory = store.load()
+
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    store.save(memory)
+
+    assert len(json.load(open(path))["conversations"]) == 1
+    assert not (tmp_path / "memory.json.journal").exists()
+
+
+def test_validate_rejects_missing_tasks():
+    """Test that validation requires a tasks list"""
+    assert validate_memory_structure({"conversations": []}) == False
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    """Test that crossing the entry limit rewrites the snapshot and empties the journal"""
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path, compact_entries=3)
+    memory = store.load()
+
+    for i in range(3):
+        memory["conversations"].append({"role": "user", "content": f"msg {i}"})
+        store.save(memory)
+    store.wait_for_compaction()
+
+    assert len(json.load(open(path))["conversations"]) == 3
+    assert not (tmp_path / "memory.json.journal.old").exists()
+
+    # Appends after compaction land in a fresh journal
+    memory["conversations"].append({"role": "user", "content": "after"})
+    store.save(memory)
+    reloaded = MemoryStore(path).load()
+    assert [m["content"] for m in reloaded["conversations"]] == ["msg 0", "msg 1", "msg 2", "after"]
+
+
+def test_load_finishes_interrupted_compaction(tmp_path):
+    """Test that a rotated journal left by a crash is replayed exactly once"""
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path)
+    memory = store.load()
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    add(memory, make_task("task_1", "Keep"))
+    store.save(memory)
+
+    # Simulate a crash after the snapshot was rewritten but before the old journal was removed
+    with open(path, "w") as f:
+        json.dump(memory, f, default=list)
+    (tmp_path / "memory.json.journal").rename(tmp_path / "memory.json.journal.old")
+
+    store = MemoryStore(path)
+    reloaded = store.load()
+    store.wait_for_compaction()
+
+    assert len(reloaded["conversations"]) == 1
+    assert len(reloaded["tasks"]) == 1
+    assert not (tmp_path / "memory.json.journal.old").exists()
+
+
+def test_open_store_selects_backend(tmp_path):
+    """Test that the storage config picks the backend"""
+    path = str(tmp_path / "memory.json")
+
+    assert isinstance(open_store(path, {}), MemoryStore)
+    assert type(open_store(path, {"backend": "sqlite"})).__name__ == "SqliteStore"
+
+
+def test_snapshot_write_leaves_no_temp_files(tmp_path):
+    """Test that atomic snapshot writes clean up after themselves"""
+    store = MemoryStore(str(tmp_path / "memory.json"), journal=False)
+    memory = store.load()
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    store.save(memory)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["memory.json"]
+
+
+def test_dirty_tracking(tmp_path):
+    """Test that loaded memory reports changes until they are saved"""
+    store = MemoryStore(str(tmp_path / "memory.json"))
+    memory = store.load()
+    assert memory.dirty == False
+
+    add(memory, make_task("task_1", "New"))
+    assert memory.dirty == True
+
+    store.save(memory)
+    assert memory.dirty == False
+
+
+def test_untracked_memory_still_diffs(tmp_path):
+    """Test that a plain dict is still saved correctly by comparing tasks"""
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path)
+    store.load()
+
+    memory = {"conversations": [], "tasks": [make_task("task_1", "Plain")]}
+    store.save(memory)
+
+    assert MemoryStore(path).load()["tasks"][0]["content"] == "Plain"
+
+
+def test_lazy_history_moves_conversations_out_of_snapshot(tmp_path):
+    """Test that lazy_history keeps messages in the conversation log"""
+    path = tmp_path / "memory.json"
+    path.write_text(json.dumps({
+        "conversations": [{"role": "user", "content": "old"}],
+        "tasks": []
+    }))
+
+    store = MemoryStore(str(path), lazy_history=True, history_window=10)
+    memory = store.load()
+    memory["conversations"].append({"role": "assistant", "content": "new"})
+    store.save(memory)
+
+    snapshot = json.load(open(path))
+    assert snapshot["conversations"] == []
+    assert "conversation_log" in snapshot
+
+    # The log is used even if lazy_history is later switched off
+    reloaded = MemoryStore(str(path)).load()
+    assert [m["content"] for m in reloaded["conversations"]] == ["old", "new"]
+
+
+def test_corrupted_file_is_salvaged(tmp_path):
+    """Test that a damaged memory.json keeps its intact history"""
+    path = tmp_path / "memory.json"
+    path.write_text('{"conversations": [{"role": "user", "content": "hi"}, {"role": "assi')
+
+    memory = MemoryStore(str(path)).load()
+
+    assert memory["conversations"] == [{"role": "user", "content": "hi"}]
+    assert len(list(tmp_path.glob("memory.json.corrupt-*"))) == 1
+
+
+def test_binary_snapshot_format(tmp_path):
+    """Test that compaction writes binary snapshots that load back"""
+    import binary_format
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path, snapshot_format="binary")
+    memory = store.load()
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    store.save(memory)
+    store.compact(wait=True)
+
+    assert binary_format.is_binary_snapshot(path)
+    assert MemoryStore(path).load()["conversations"] == [{"role": "user", "content": "hi"}]
+
+
+def test_columnar_load_keeps_tasks_in_a_task_table(tmp_path):
+    """Test that columnar=True loads tasks into a TaskTable that saves like a TaskStore"""
+    from task_table import TaskTable
+    path = str(tmp_path / "memory.json")
+    store = MemoryStore(path, columnar=True)
+    memory = store.load()
+    assert isinstance(memory["tasks"], TaskTable)
+
+    add(memory, make_task("task_1", "Columnar"))
+    store.save(memory)
+
+    reloaded = MemoryStore(path, columnar=True).load()
+    assert isinstance(reloaded["tasks"], TaskTable)
+    assert reloaded["tasks"].get("task_1")["content"] == "Columnar"
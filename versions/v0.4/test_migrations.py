@@ -0,0 +1,109 @@
+"""
+Tests for memory schema migrations
+"""
+import json
+
+from migrations import CURRENT_SCHEMA_VERSION, TASK_DEFAULTS, migrate_file, migrate_memory
+from memory_store import MemoryStore
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def old_task(i):
+    """A task as v0.2 saved it, before priority_reasoning and completed_at"""
+    return {"id": f"task_{i}", "content": f"Task {i}", "priority": "high",
+            "category": "learning", "due_date": None, "completed": False,
+            "created_at": "2025-12-01T09:00:00"}
+
+
+def test_migrate_memory_from_v1():
+    """Test that a v0.1 memory gains tasks and a schema version"""
+    data, version = migrate_memory({"conversations": [{"role": "user", "content": "hi"}]})
+
+    assert version == 1
+    assert data == {"conversations": [{"role": "user", "content": "hi"}], "tasks": [],
+                    "schema_version": CURRENT_SCHEMA_VERSION}
+    assert list(data) == ["schema_version", "conversations", "tasks"]
+
+
+def test_migrate_memory_fills_task_fields():
+    """Test that v2 tasks get every current field and keep their own values"""
+    data, version = migrate_memory({"conversations": [], "tasks": [old_task(1)]})
+
+    assert version == 2
+    assert set(data["tasks"][0]) == set(TASK_DEFAULTS)
+    assert data["tasks"][0]["priority"] == "high"
+    assert data["tasks"][0]["completed_at"] is None
+
+
+def test_migrate_file_v2_keeps_backup(tmp_path):
+    """Test that a v2 file is rewritten in place and the original kept"""
+    path = tmp_path / "memory.json"
+    original = {"conversations": [{"role": "user", "content": "hi"}], "tasks": [old_task(1)]}
+    write_json(path, original)
+
+    result = migrate_file(str(path))
+
+    assert result["from_version"] == 2
+    assert read_json(result["backup"]) == original
+    migrated = read_json(path)
+    assert migrated["schema_version"] == CURRENT_SCHEMA_VERSION
+    assert migrated["conversations"] == original["conversations"]
+    assert migrated["tasks"][0]["completed_at"] is None
+
+
+def test_migrate_file_skips_current(tmp_path):
+    """Test that a current file is left alone"""
+    path = tmp_path / "memory.json"
+    write_json(path, {"schema_version": CURRENT_SCHEMA_VERSION, "conversations": [], "tasks": []})
+
+    result = migrate_file(str(path))
+
+    assert result["backup"] is None
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_migrate_file_small_chunks(tmp_path):
+    """Test that streaming in tiny chunks gives the same result as loading whole"""
+    path = tmp_path / "memory.json"
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i} {{with braces}}"}
+                for i in range(200)]
+    tasks = [old_task(i) for i in range(20)]
+    write_json(path, {"conversations": messages, "tasks": tasks})
+
+    migrate_file(str(path), chunk_size=37)
+
+    expected, _ = migrate_memory({"conversations": messages, "tasks": [dict(t) for t in tasks]})
+    assert read_json(path) == expected
+
+
+def test_store_upgrades_on_load(tmp_path):
+    """Test that the JSON store migrates an old file when it loads it"""
+    path = tmp_path / "memory.json"
+    write_json(path, {"conversations": [{"role": "user", "content": "hi"}]})
+
+    memory = MemoryStore(str(path)).load()
+
+    assert memory["schema_version"] == CURRENT_SCHEMA_VERSION
+    assert memory["tasks"] == []
+    assert (tmp_path / "memory.json.v1.bak").exists()
+
+
+def test_store_upgraded_file_takes_the_fast_path(tmp_path):
+    """Test that a file upgraded on load starts with schema_version, so migrate_file only reads its head"""
+    path = tmp_path / "memory.json"
+    write_json(path, {"conversations": [{"role": "user", "content": "hi"}], "tasks": [old_task(1)]})
+    MemoryStore(str(path)).load()
+
+    result = migrate_file(str(path))
+
+    assert result["backup"] is None
+    assert result["messages"] is None
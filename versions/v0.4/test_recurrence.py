@@ -0,0 +1,49 @@
+"""
+Tests for repeat rules
+"""
+from datetime import date
+from itertools import islice
+
+from recurrence import describe, make_rule, next_occurrence, occurrences, parse_rule
+
+
+def test_parse_rule():
+    assert parse_rule("daily") == (1, "day")
+    assert parse_rule("Weekly") == (1, "week")
+    assert parse_rule("3d") == (3, "day")
+    assert parse_rule("6m") == (6, "month")
+    assert parse_rule("0d") is None
+    assert parse_rule("fortnightly") is None
+
+
+def test_describe():
+    assert describe(make_rule("monthly", "2026-01-31")) == "monthly"
+    assert describe(make_rule("2w", "2026-01-31")) == "every 2 weeks"
+
+
+def test_occurrences_in_a_window():
+    """Test that expansion starts at the window, not at the rule's first date"""
+    rule = make_rule("3d", "2026-01-01")
+    days = list(occurrences(rule, start=date(2026, 1, 5), end=date(2026, 1, 13)))
+    assert days == [date(2026, 1, 7), date(2026, 1, 10), date(2026, 1, 13)]
+
+    # Far in the future is just as quick - nothing before the window is made
+    far = next(occurrences(rule, start=date(3026, 1, 1)))
+    assert far >= date(3026, 1, 1) and (far - date(2026, 1, 1)).days % 3 == 0
+
+
+def test_monthly_keeps_the_day():
+    """Test that a rule starting on the 31st lands on each month's last day without drifting"""
+    rule = make_rule("monthly", "2026-01-31")
+    assert list(islice(occurrences(rule), 4)) == [
+        date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)
+    ]
+    assert list(occurrences(rule, start=date(2026, 6, 1), end=date(2026, 7, 31))) == [
+        date(2026, 6, 30), date(2026, 7, 31)
+    ]
+
+
+def test_next_occurrence():
+    rule = make_rule("weekly", "2026-01-05")
+    assert next_occurrence(rule, date(2026, 1, 5)) == date(2026, 1, 12)
+    assert next_occurrence(rule, date(2026, 1, 7)) == date(2026, 1, 12)
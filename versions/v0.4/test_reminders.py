@@ -0,0 +1,81 @@
+"""
+Tests for the due-date reminder wheel
+"""
+import threading
+from datetime import date
+
+import task_manager
+from reminders import ReminderThread, ReminderWheel
+
+
+def make_task(task_id, due_date, completed=False):
+    return {"id": task_id, "content": f"Task {task_id}", "due_date": due_date, "completed": completed}
+
+
+def ids(tasks):
+    return [task["id"] for task in tasks]
+
+
+def test_pop_due_hands_out_each_task_once():
+    """Test that due and overdue tasks come out soonest first, and only once"""
+    wheel = ReminderWheel([
+        make_task("later", "2026-01-20"),
+        make_task("today", "2026-01-10"),
+        make_task("overdue", "2026-01-02"),
+        make_task("done", "2026-01-01", completed=True),
+        make_task("undated", None),
+    ])
+    assert len(wheel) == 3
+
+    assert ids(wheel.pop_due(date(2026, 1, 10))) == ["overdue", "today"]
+    assert wheel.pop_due(date(2026, 1, 10)) == []
+    assert ids(wheel.pop_due(date(2026, 2, 1))) == ["later"]
+    assert len(wheel) == 0
+
+
+def test_changes_move_and_cancel_reminders():
+    """Test that rescheduling, completing and deleting update the wheel"""
+    wheel = ReminderWheel([make_task("a", "2026-01-05"), make_task("b", "2026-01-05"), make_task("c", "2026-01-06")])
+
+    wheel.task_changed(make_task("a", "2026-01-09"))
+    wheel.task_changed(make_task("b", "2026-01-05", completed=True))
+    wheel.task_deleted("c")
+    wheel.task_deleted("missing")
+
+    assert wheel.pop_due(date(2026, 1, 8)) == []
+    assert ids(wheel.pop_due(date(2026, 1, 9))) == ["a"]
+
+
+def test_task_manager_keeps_watchers_up_to_date(monkeypatch):
+    """Test that add, complete and delete reach the wheel through task_manager.watchers"""
+    wheel = ReminderWheel()
+    monkeypatch.setattr(task_manager, "watchers", [wheel])
+    monkeypatch.setattr(task_manager, "_today", lambda: date(2026, 1, 1))
+
+    memory = {"tasks": []}
+    keep = task_manager.add_task(memory, "Pay rent", due_date="2026-01-01", repeat="monthly")
+    gone = task_manager.add_task(memory, "Call bank", due_date="2026-01-01")
+    done = task_manager.add_task(memory, "Renew passport", due_date="2026-01-01")
+    task_manager.delete_task(memory, gone["id"])
+    task_manager.complete_task(memory, done["id"])
+    task_manager.complete_task(memory, keep["id"])
+
+    assert wheel.pop_due(date(2026, 1, 31)) == []
+    reminded = wheel.pop_due(date(2026, 2, 1))
+    assert ids(reminded) == [keep["id"]] and reminded[0]["due_date"] == "2026-02-01"
+
+
+def test_thread_notifies_on_start_and_stops():
+    wheel = ReminderWheel([make_task("a", "2026-01-01")])
+    notified = threading.Event()
+    seen = []
+
+    def notify(tasks):
+        seen.extend(tasks)
+        notified.set()
+
+    thread = ReminderThread(wheel, notify, interval=60, today=lambda: date(2026, 1, 1)).start()
+    assert notified.wait(5)
+    thread.close()
+    thread.close()
+    assert ids(seen) == ["a"]
@@ -0,0 +1,76 @@
+"""
+Unit tests for salvage module
+"""
+import json
+from salvage import salvage_memory
+
+
+def build_memory(messages, tasks):
+    """A memory dict with numbered messages and tasks"""
+    return {
+        "conversations": [{"role": "user", "content": f"msg {i}"} for i in range(messages)],
+        "tasks": [{"id": f"task_{i}", "content": f"Task {i}", "completed": False} for i in range(tasks)]
+    }
+
+
+def test_truncated_file(tmp_path):
+    """Test that everything before the cut-off point is recovered"""
+    path = tmp_path / "memory.json"
+    text = json.dumps(build_memory(5, 3), indent=4)
+    # Cut in the middle of the last task
+    path.write_text(text[:text.rindex('"Task 2"')])
+
+    result = salvage_memory(str(path))
+
+    data = json.load(open(path))
+    assert len(data["conversations"]) == 5
+    assert [task["id"] for task in data["tasks"]] == ["task_0", "task_1"]
+    assert result["tasks"] == 2
+
+
+def test_garbage_in_the_middle(tmp_path):
+    """Test that records on either side of a corrupted region survive"""
+    path = tmp_path / "memory.json"
+    text = json.dumps(build_memory(4, 0))
+    text = text.replace('{"role": "user", "content": "msg 1"}', '{"role": "us\x00{{{ broken')
+    path.write_text(text)
+
+    salvage_memory(str(path))
+
+    contents = [m["content"] for m in json.load(open(path))["conversations"]]
+    assert contents == ["msg 0", "msg 2", "msg 3"]
+
+
+def test_original_is_quarantined(tmp_path):
+    """Test that the damaged file is kept, not overwritten"""
+    path = tmp_path / "memory.json"
+    path.write_text('{"conversations": [{"role": "user", "content": "hi"}')
+
+    result = salvage_memory(str(path))
+
+    assert open(result["quarantine"]).read() == '{"conversations": [{"role": "user", "content": "hi"}'
+
+
+def test_records_across_chunk_boundaries(tmp_path):
+    """Test that small read chunks still find every record"""
+    path = tmp_path / "memory.json"
+    text = json.dumps(build_memory(50, 20))
+    path.write_text(text[:-2])
+
+    result = salvage_memory(str(path), chunk_size=16)
+
+    assert result["messages"] == 50
+    assert result["tasks"] == 20
+
+
+def test_schema_version_stays_at_the_top(tmp_path):
+    """Test that a salvaged file still starts with schema_version, so migrate_file can skip it"""
+    from migrations import migrate_file
+    path = tmp_path / "memory.json"
+    text = json.dumps({"schema_version": 3, **build_memory(3, 2)}, indent=4)
+    path.write_text(text[:text.rindex('"Task 1"')])
+
+    salvage_memory(str(path))
+
+    assert list(json.load(open(path)))[0] == "schema_version"
+    assert migrate_file(str(path))["messages"] is None
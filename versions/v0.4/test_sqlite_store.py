@@ -0,0 +1,137 @@
+"""
+Unit tests for sqlite_store module
+"""
+import json
+from sqlite_store import SqliteStore
+
+
+def make_task(task_id, content, **fields):
+    """Build a task dict with the usual fields"""
+    task = {
+        "id": task_id,
+        "content": content,
+        "priority": None,
+        "category": None,
+        "due_date": None,
+        "priority_reasoning": None,
+        "completed": False,
+        "created_at": "2025-12-01T09:00:00",
+        "completed_at": None
+    }
+    task.update(fields)
+    return task
+
+
+def add(memory, task):
+    """Add a task the way task_manager does, so the change gets recorded"""
+    memory["tasks"].append(task)
+    memory.task_changed(task)
+
+
+def test_round_trip(tmp_path):
+    """Test that messages and tasks survive a save and reload"""
+    path = str(tmp_path / "memory.db")
+    store = SqliteStore(path)
+    memory = store.load()
+
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    add(memory, make_task("task_1", "First", priority="high"))
+    add(memory, make_task("task_2", "Second"))
+    store.save(memory)
+
+    # Editing the first task must not move it behind the second
+    memory["tasks"][0]["completed"] = True
+    memory.task_changed(memory["tasks"][0])
+    store.save(memory)
+    store.close()
+
+    reloaded = SqliteStore(path).load()
+    assert reloaded["conversations"] == [{"role": "user", "content": "hi"}]
+    assert [task["id"] for task in reloaded["tasks"]] == ["task_1", "task_2"]
+    assert reloaded["tasks"][0]["completed"] == True
+
+
+def test_delete_task(tmp_path):
+    """Test that removing a task from memory deletes its row"""
+    store = SqliteStore(str(tmp_path / "memory.db"))
+    memory = store.load()
+    add(memory, make_task("task_1", "Delete me"))
+    store.save(memory)
+
+    memory["tasks"].pop(0)
+    memory.task_deleted("task_1")
+    store.save(memory)
+
+    assert SqliteStore(str(tmp_path / "memory.db")).load()["tasks"] == []
+
+
+def test_imports_existing_json(tmp_path):
+    """Test that a new database picks up an existing memory.json"""
+    json_path = tmp_path / "memory.json"
+    json_path.write_text(json.dumps({
+        "conversations": [{"role": "user", "content": "hi"}],
+        "tasks": [make_task("task_1", "Imported")]
+    }))
+
+    memory = SqliteStore(str(tmp_path / "memory.db"), import_from=str(json_path)).load()
+
+    assert len(memory["conversations"]) == 1
+    assert memory["tasks"][0]["content"] == "Imported"
+
+
+
+def saved_json_memory(json_path, **options):
+    """Save one message and one task with MemoryStore, the way MZ does before switching to sqlite"""
+    from memory_store import MemoryStore
+    store = MemoryStore(str(json_path), **options)
+    memory = store.load()
+    memory["conversations"].append({"role": "user", "content": "hi"})
+    add(memory, make_task("task_1", "Imported"))
+    store.save(memory)
+
+
+def test_imports_journaled_json(tmp_path):
+    """Test that changes still in memory.json.journal are imported too"""
+    json_path = tmp_path / "memory.json"
+    saved_json_memory(json_path)
+    assert (tmp_path / "memory.json.journal").exists()
+
+    memory = SqliteStore(str(tmp_path / "memory.db"), import_from=str(json_path)).load()
+
+    assert memory["conversations"] == [{"role": "user", "content": "hi"}]
+    assert memory["tasks"][0]["content"] == "Imported"
+
+
+def test_imports_binary_snapshot(tmp_path):
+    """Test that a binary memory.json is imported instead of crashing startup"""
+    json_path = tmp_path / "memory.json"
+    saved_json_memory(json_path, journal=False, snapshot_format="binary")
+
+    memory = SqliteStore(str(tmp_path / "memory.db"), import_from=str(json_path)).load()
+
+    assert memory["conversations"] == [{"role": "user", "content": "hi"}]
+    assert memory["tasks"][0]["content"] == "Imported"
+
+
+def test_imports_conversation_log(tmp_path):
+    """Test that history kept in a conversation log (lazy_history) is imported whole"""
+    json_path = tmp_path / "memory.json"
+    saved_json_memory(json_path, journal=False, lazy_history=True, history_window=1)
+
+    memory = SqliteStore(str(tmp_path / "memory.db"), import_from=str(json_path)).load()
+
+    assert memory["conversations"] == [{"role": "user", "content": "hi"}]
+    assert memory["tasks"][0]["content"] == "Imported"
+
+def test_columnar_load_keeps_tasks_in_a_task_table(tmp_path):
+    """Test that columnar=True loads tasks into a TaskTable"""
+    from task_table import TaskTable
+    path = str(tmp_path / "memory.db")
+    store = SqliteStore(path, columnar=True)
+    memory = store.load()
+    add(memory, make_task("task_1", "Columnar"))
+    store.save(memory)
+
+    reloaded = SqliteStore(path, columnar=True).load()
+    assert isinstance(reloaded["tasks"], TaskTable)
+    assert reloaded["tasks"].get("task_1")["content"] == "Columnar"
@@ -0,0 +1,59 @@
+"""
+Tests for the task dependency graph
+"""
+from task_graph import TaskGraph
+
+
+def make_task(task_id, depends_on=(), completed=False):
+    return {"id": task_id, "depends_on": list(depends_on), "completed": completed}
+
+
+def test_ready_follows_completion():
+    """Test that completing a task unblocks only what was waiting on it"""
+    graph = TaskGraph([
+        make_task("a"),
+        make_task("b", ["a"]),
+        make_task("c", ["a", "b"]),
+        make_task("d"),
+    ])
+    assert graph.ready() == {"a", "d"}
+    assert sorted(graph.blocked_by("c")) == ["a", "b"]
+
+    graph.update(make_task("a", completed=True))
+    assert graph.ready() == {"b", "d"}
+
+    graph.update(make_task("b", ["a"], completed=True))
+    assert graph.ready() == {"c", "d"}
+
+    # Reopening b blocks c again
+    graph.update(make_task("b", ["a"]))
+    assert graph.ready() == {"b", "d"}
+
+
+def test_dependencies_on_missing_or_deleted_tasks_count_as_done():
+    graph = TaskGraph([make_task("b", ["a"])])
+    assert graph.ready() == {"b"}
+
+    # a shows up later (e.g. an undone delete) and blocks b
+    graph.update(make_task("a"))
+    assert graph.ready() == {"a"}
+
+    graph.discard("a")
+    assert graph.ready() == {"b"}
+
+
+def test_changing_depends_on():
+    graph = TaskGraph([make_task("a"), make_task("b"), make_task("c", ["a"])])
+    graph.update(make_task("c", ["b"]))
+    assert graph.blocked_by("c") == ["b"]
+    graph.update(make_task("c"))
+    assert graph.ready() == {"a", "b", "c"}
+
+
+def test_would_cycle():
+    """Test that loops are found, and the loop is reported"""
+    graph = TaskGraph([make_task("a"), make_task("b", ["a"]), make_task("c", ["b"]), make_task("d")])
+    assert graph.would_cycle("a", ["c"]) == ["a", "c", "b", "a"]
+    assert graph.would_cycle("a", ["a"]) == ["a", "a"]
+    assert graph.would_cycle("a", ["d"]) is None
+    assert graph.would_cycle("c", ["a"]) is None
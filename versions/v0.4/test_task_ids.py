@@ -0,0 +1,70 @@
+"""
+Tests for time-sortable task ids
+"""
+from datetime import datetime, timedelta
+
+from task_ids import IdGenerator, SortedIds, id_at, id_time, is_sortable_id, short_id
+
+
+def test_ids_sort_in_creation_order_within_a_millisecond():
+    """Test that ids made in the same millisecond still come out in order"""
+    generate = IdGenerator(clock=lambda: 1_767_225_600.0)
+    ids = [generate() for _ in range(1000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 1000
+    assert all(is_sortable_id(task_id) for task_id in ids)
+
+
+def test_id_time_round_trips():
+    """Test that the creation time can be read back out of an id"""
+    moment = datetime(2026, 1, 10, 9, 30)
+    task_id = IdGenerator(clock=moment.timestamp)()
+
+    assert id_time(task_id) == moment
+    assert id_at(moment) <= task_id < id_at(moment + timedelta(milliseconds=1))
+    assert id_time("task_1a2b3c4d") is None
+
+
+def test_short_id():
+    """Test the display form of new and old ids"""
+    task_id = IdGenerator()()
+
+    assert short_id(task_id, 6) == task_id[-6:]
+    assert short_id("task_1a2b3c4d") == "1a2b3c4d"
+
+
+def test_sorted_ids_between():
+    """Test time-range lookups, ignoring old-style ids"""
+    day = datetime(2026, 1, 10)
+    ids = [IdGenerator(clock=(day + timedelta(hours=hour)).timestamp)() for hour in range(5)]
+    index = SortedIds(reversed(ids + ["task_1a2b3c4d"]))
+
+    assert index.between(day + timedelta(hours=1), day + timedelta(hours=3)) == ids[1:3]
+    assert index.between(end=day + timedelta(hours=1)) == ids[:1]
+
+    index.discard(ids[1])
+    index.add(ids[1])
+    index.add(ids[1])
+    assert index.between() == ids
+
+
+def test_id_lookup_prefixes_and_ambiguity():
+    """Test resolving abbreviated ids by full-id prefix or display-form prefix"""
+    from task_ids import IdLookup
+    generate = IdGenerator(clock=lambda: 1_767_225_600.0)
+    first, second = generate(), generate()
+    lookup = IdLookup([first, second, "task_1a2b3c4d"], display_length=8)
+
+    # Ids made together share their start, so a short prefix of the full id is ambiguous
+    assert sorted(lookup.matches(first[5:10])) == sorted([first, second])
+    assert lookup.matches(first) == [first]
+    assert lookup.matches(first[-8:].lower()) == [first]
+    assert lookup.matches("task_1a2") == ["task_1a2b3c4d"]
+    assert lookup.matches("zzz") == []
+    assert lookup.matches("") == []
+
+    lookup.discard(first)
+    assert lookup.matches(first[5:10]) == [second]
+    lookup.add(first)
+    assert len(lookup.matches(first[5:10])) == 2
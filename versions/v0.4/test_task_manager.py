@@ -1,8 +1,14 @@
 """
 Unit tests for task_manager module
 """
+from datetime import date
+
 import pytest
-from task_manager import add_task, list_tasks, complete_task, delete_task, validate_task_input
+from task_manager import (
+    add_task, list_tasks, next_tasks, complete_task, delete_task, validate_task_input,
+    add_tasks, complete_tasks, delete_tasks, TaskValidationError, list_page,
+    iter_occurrences, undo, redo, ready_tasks, add_dependencies, find_duplicates, blocked_by
+)
 
 
 def test_add_task_basic():
@@ -76,4 +82,369 @@ def test_delete_task():
     delete_task(memory, task["id"])
 
     # Check memory is now empty
-    assert len(memory["tasks"]) == 0
\ No newline at end of file
+    assert len(memory["tasks"]) == 0
+
+def test_changes_are_recorded_on_tracked_memory():
+    """Test that task changes are reported to a tracked Memory object"""
+    from memory_store import Memory
+    memory = Memory({"conversations": [], "tasks": []})
+
+    task = add_task(memory, "Tracked task")
+    assert task["id"] in memory.changed_tasks
+
+    delete_task(memory, task["id"])
+    assert task["id"] not in memory.changed_tasks
+    assert task["id"] in memory.deleted_tasks
+
+def test_complete_task_only_marks_matching_task():
+    """Test that completing one task leaves the others active"""
+    memory = {"tasks": []}
+    add_task(memory, "Task 1")
+    task2 = add_task(memory, "Task 2")
+
+    assert complete_task(memory, task2["id"]) == True
+    assert [task["completed"] for task in memory["tasks"]] == [False, True]
+    assert isinstance(task2["completed_at"], str)
+
+def test_missing_task_id_is_reported():
+    """Test that done/delete on an unknown id return False"""
+    memory = {"tasks": []}
+    add_task(memory, "Task 1")
+
+    assert complete_task(memory, "task_missing") == False
+    assert delete_task(memory, "task_missing") == False
+    assert len(memory["tasks"]) == 1
+
+def test_list_tasks_filters():
+    """Test filtering tasks by category, priority and due date"""
+    memory = {"tasks": []}
+    add_task(memory, "Read chapter", priority="high", category="learning", due_date="2026-01-10")
+    add_task(memory, "Apply to job", priority="high", category="job_search", due_date="2026-02-10")
+    add_task(memory, "Watch lecture", priority="low", category="learning")
+
+    assert len(list_tasks(memory, category="learning")) == 2
+    assert [t["content"] for t in list_tasks(memory, priority="high", due_before="2026-01-31")] == ["Read chapter"]
+
+    # Not a date - refused rather than compared as text
+    with pytest.raises(TaskValidationError):
+        list_tasks(memory, due_before="tomorrow")
+    with pytest.raises(TaskValidationError):
+        list_page(memory, due_before="2026-1-31")
+
+
+def test_list_page():
+    """Test that list_page gives one page at a time and says whether more follow"""
+    memory = {"tasks": []}
+    tasks = [add_task(memory, f"Task {number}", category="learning") for number in range(5)]
+    add_task(memory, "Elsewhere", category="personal")
+
+    page, more = list_page(memory, page=1, limit=2, category="learning")
+    assert page == tasks[:2] and more
+    page, more = list_page(memory, page=3, limit=2, category="learning")
+    assert page == tasks[4:] and not more
+    assert list_page(memory, page=4, limit=2, category="learning") == ([], False)
+
+
+def test_next_tasks_uses_config_priority_order():
+    """Test that /task next ranks priorities in config order"""
+    memory = {"tasks": []}
+    add_task(memory, "Low", priority="low", due_date="2026-01-10")
+    add_task(memory, "Urgent", priority="urgent", due_date="2026-01-10")
+    add_task(memory, "Later", priority="urgent", due_date="2026-03-01")
+
+    assert [t["content"] for t in next_tasks(memory, 2)] == ["Urgent", "Low"]
+
+def test_add_tasks_is_all_or_nothing():
+    """Test that one invalid task in a batch stops the whole batch"""
+    memory = {"tasks": []}
+    specs = [
+        {"content": "Read chapter", "priority": "high"},
+        {"content": "Bad date", "due_date": "tomorrow"},
+        {"content": ""},
+    ]
+
+    with pytest.raises(TaskValidationError) as excinfo:
+        add_tasks(memory, specs)
+
+    assert len(excinfo.value.errors) == 2
+    assert excinfo.value.errors[0].startswith("Task 2:")
+    assert len(memory["tasks"]) == 0
+
+    tasks = add_tasks(memory, specs[:1] * 3)
+    assert len(tasks) == 3
+    assert len(memory["tasks"]) == 3
+
+def test_bulk_complete_and_delete():
+    """Test completing and deleting several tasks, and rejecting unknown ids"""
+    from memory_store import Memory
+    memory = Memory({"conversations": [], "tasks": []})
+    ids = [task["id"] for task in add_tasks(memory, [{"content": f"Task {i}"} for i in range(4)])]
+
+    with pytest.raises(TaskValidationError):
+        complete_tasks(memory, [ids[0], "task_missing"])
+    assert list_tasks(memory, filter_completed=True) == list(memory["tasks"])
+
+    assert complete_tasks(memory, ids[:2]) == 2
+    assert delete_tasks(memory, [ids[2], ids[2], ids[3]]) == 2
+    assert [task["id"] for task in memory["tasks"]] == ids[:2]
+    assert memory.deleted_tasks == {ids[2], ids[3]}
+
+def test_search_tasks_follows_changes():
+    """Test that search results reflect tasks added and deleted after the first search"""
+    from task_manager import search_tasks
+    memory = {"tasks": []}
+    add_task(memory, "Finish CS50P week 4", reasoning="Problem set due Friday")
+    assert [t["content"] for t in search_tasks(memory, "friday")] == ["Finish CS50P week 4"]
+
+    task = add_task(memory, "CS50P final project")
+    assert len(search_tasks(memory, "cs50")) == 2
+
+    delete_task(memory, task["id"])
+    assert len(search_tasks(memory, "cs50")) == 1
+
+def test_columnar_table_behind_task_functions(monkeypatch):
+    """Test that the task functions work the same with tasks: table: columnar"""
+    import task_manager
+    from task_table import TaskTable
+    monkeypatch.setattr(task_manager, "COLUMNAR", True)
+
+    memory = {"tasks": []}
+    task1 = add_task(memory, "Task 1", category="learning")
+    task2 = add_task(memory, "Task 2", due_date="2026-01-10")
+    assert isinstance(memory["tasks"], TaskTable)
+
+    complete_task(memory, task1["id"])
+    assert [t["id"] for t in list_tasks(memory, filter_completed=True)] == [task2["id"]]
+    assert next_tasks(memory)[0]["id"] == task2["id"]
+
+    delete_task(memory, task2["id"])
+    assert len(memory["tasks"]) == 1
+
+def test_tasks_created_between():
+    """Test that new task ids double as a creation-time index"""
+    from datetime import datetime, timedelta
+    from task_manager import tasks_created_between
+    memory = {"tasks": [{"id": "task_1a2b3c4d", "content": "Old style id", "completed": False}]}
+
+    before = datetime.now() - timedelta(seconds=1)
+    task = add_task(memory, "New task")
+    after = datetime.now() + timedelta(seconds=1)
+
+    assert tasks_created_between(memory, before, after) == [task]
+    assert tasks_created_between(memory, end=before) == []
+
+def test_match_task_ids_follows_changes():
+    """Test that abbreviated ids resolve against the current tasks"""
+    from task_manager import display_id, match_task_ids
+    memory = {"tasks": []}
+    task = add_task(memory, "Task 1")
+    assert match_task_ids(memory, display_id(task["id"])[:4]) == [task["id"]]
+
+    other = add_task(memory, "Task 2")
+    assert match_task_ids(memory, display_id(other["id"])) == [other["id"]]
+
+    delete_task(memory, task["id"])
+    assert match_task_ids(memory, task["id"]) == []
+
+def test_repeating_task_moves_on_when_done(monkeypatch):
+    """Test that completing a repeating task moves its due date instead of finishing it"""
+    import task_manager
+    monkeypatch.setattr(task_manager, "_today", lambda: date(2026, 1, 1))
+    memory = {"tasks": []}
+    assert add_task(memory, "Water plants", repeat="weekly") is None  # needs a due date
+    task = add_task(memory, "Water plants", due_date="2026-01-05", repeat="weekly")
+
+    assert complete_task(memory, task["id"])
+    assert task["due_date"] == "2026-01-12" and not task["completed"]
+    assert len(memory["tasks"]) == 1
+
+    complete_tasks(memory, [task["id"]])
+    assert task["due_date"] == "2026-01-19"
+
+def test_overdue_repeating_task_catches_up(monkeypatch):
+    """Test that doing an overdue repeating task moves it past today, not one step"""
+    import task_manager
+    monkeypatch.setattr(task_manager, "_today", lambda: date(2026, 10, 17))
+    memory = {"tasks": []}
+    task = add_task(memory, "Pay rent", due_date="2026-01-31", repeat="monthly")
+
+    # Still overdue: shown at its real due date, before the window's own dates
+    found = [due for due, _ in iter_occurrences(memory, "2026-10-17", "2026-11-15")]
+    assert found == ["2026-01-31", "2026-10-31"]
+
+    complete_task(memory, task["id"])
+    assert task["due_date"] == "2026-10-31"
+    assert [due for due, _ in iter_occurrences(memory, "2026-10-17", "2026-11-15")] == ["2026-10-31"]
+
+def test_iter_occurrences_expands_only_the_window(monkeypatch):
+    """Test that repeats are expanded for the asked-for dates and merged with one-off tasks"""
+    import task_manager
+    monkeypatch.setattr(task_manager, "_today", lambda: date(2026, 1, 1))
+    memory = {"tasks": []}
+    daily = add_task(memory, "Stretch", due_date="2026-01-01", repeat="daily")
+    once = add_task(memory, "Dentist", due_date="2026-03-02")
+    add_task(memory, "Later", due_date="2026-04-01")
+
+    # Stretch hasn't been done since it was due, so it shows up overdue first
+    found = [(due, task["id"]) for due, task in iter_occurrences(memory, "2026-03-01", "2026-03-03")]
+    assert found == [("2026-01-01", daily["id"]),
+                     ("2026-03-01", daily["id"]), ("2026-03-02", daily["id"]),
+                     ("2026-03-02", once["id"]), ("2026-03-03", daily["id"])]
+
+    # Done today, so today's date is gone
+    complete_task(memory, daily["id"])
+    assert [due for due, _ in iter_occurrences(memory, "2026-01-01", "2026-01-03")] == ["2026-01-02", "2026-01-03"]
+
+def test_undo_and_redo(monkeypatch):
+    """Test that undo puts tasks back as they were and redo repeats the change"""
+    import task_manager
+    from undo_log import UndoLog
+    monkeypatch.setattr(task_manager, "history", UndoLog())
+
+    memory = {"tasks": []}
+    task1 = add_task(memory, "Task 1")
+    task2 = add_task(memory, "Task 2")
+    complete_task(memory, task1["id"])
+    delete_tasks(memory, [task1["id"], task2["id"]])
+    assert len(memory["tasks"]) == 0
+
+    assert undo(memory) == "delete 2 tasks"
+    assert memory["tasks"].get(task1["id"])["completed"]
+    assert undo(memory).startswith("complete task")
+    assert not memory["tasks"].get(task1["id"])["completed"]
+    assert [t["id"] for t in list_tasks(memory, filter_completed=True)] == [task1["id"], task2["id"]]
+
+    assert redo(memory).startswith("complete task")
+    assert memory["tasks"].get(task1["id"])["completed"]
+
+    # A new change means the undone delete can't be redone
+    add_task(memory, "Task 3")
+    assert redo(memory) is None
+    for _ in range(4):
+        assert undo(memory)
+    assert undo(memory) is None and len(memory["tasks"]) == 0
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_dependencies_and_ready_tasks(monkeypatch, columnar):
+    """Test that /task ready's list follows completes, deletes and undo, and loops are refused"""
+    import task_manager
+    from undo_log import UndoLog
+    monkeypatch.setattr(task_manager, "COLUMNAR", columnar)
+    monkeypatch.setattr(task_manager, "history", UndoLog())
+
+    memory = {"tasks": []}
+    write = add_task(memory, "Write cover letter")
+    send = add_task(memory, "Send application", depends_on=[write["id"]])
+    follow_up = add_task(memory, "Follow up")
+    assert add_task(memory, "Broken", depends_on=["task_missing"]) is None
+
+    def ready():
+        return [task["id"] for task in ready_tasks(memory)]
+
+    assert ready() == [write["id"], follow_up["id"]]
+    add_dependencies(memory, follow_up["id"], [send["id"]])
+    assert ready() == [write["id"]]
+
+    with pytest.raises(TaskValidationError):
+        add_dependencies(memory, write["id"], [follow_up["id"]])
+
+    complete_task(memory, write["id"])
+    assert ready() == [send["id"]]
+    undo(memory)
+    assert ready() == [write["id"]]
+
+    delete_task(memory, write["id"])
+    assert ready() == [send["id"]]
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_near_duplicates_warn_or_merge(monkeypatch, capsys, columnar):
+    """Test that add_task notices an active task with nearly the same wording"""
+    import task_manager
+    monkeypatch.setattr(task_manager, "COLUMNAR", columnar)
+
+    memory = {"tasks": []}
+    original = add_task(memory, "Email Sarah about the interview")
+    add_task(memory, "Finish CS50P week 4")
+
+    # warn: added anyway, with a message
+    warned = add_task(memory, "email sarah about interview", on_duplicate="warn")
+    assert warned["id"] != original["id"]
+    assert "Possible duplicate" in capsys.readouterr().out
+
+    # merge: the existing task gets the new details instead
+    complete_task(memory, warned["id"])
+    merged = add_task(memory, "Email Sarah about interview", priority="high", on_duplicate="merge")
+    assert merged["id"] == original["id"] and merged["priority"] == "high"
+    assert len(memory["tasks"]) == 3
+
+    assert find_duplicates(memory, "Finish CS50P week 5") == []
+    delete_task(memory, original["id"])
+    assert find_duplicates(memory, "Email Sarah about the interview") == []
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_merge_keeps_repeat_and_depends_on(monkeypatch, columnar):
+    """Test that merging fills in repeat and depends_on, and adds a new task when they can't be merged"""
+    import task_manager
+    monkeypatch.setattr(task_manager, "COLUMNAR", columnar)
+
+    memory = {"tasks": []}
+    plants = add_task(memory, "Water the plants", due_date="2026-01-10")
+    soil = add_task(memory, "Buy soil")
+    merged = add_task(memory, "Water plants", due_date="2026-01-12", repeat="weekly",
+                      depends_on=[soil["id"]], on_duplicate="merge")
+    assert merged["id"] == plants["id"]
+    assert merged["repeat"] == {"interval": 1, "unit": "week", "start": "2026-01-10"}
+    assert merged["depends_on"] == [soil["id"]]
+    assert blocked_by(memory, plants["id"]) == [soil["id"]]
+
+    # "Buy soil" is waited on, so it can't start repeating - it's added as a new task instead
+    repeating = add_task(memory, "Buy the soil", due_date="2026-01-12", repeat="weekly", on_duplicate="merge")
+    assert repeating["id"] != soil["id"] and "repeat" not in memory["tasks"].get(soil["id"])
+
+    # Report waiting on slides waiting on report would be a loop, so this is a new task too
+    memory = {"tasks": []}
+    slides = add_task(memory, "Make slides")
+    report = add_task(memory, "Write report", depends_on=[slides["id"]])
+    slides_again = add_task(memory, "Make the slides", depends_on=[report["id"]], on_duplicate="merge")
+    assert slides_again["id"] != slides["id"] and "depends_on" not in memory["tasks"].get(slides["id"])
+
+def test_repeating_tasks_cannot_be_waited_on(monkeypatch):
+    """Test that a repeating task is refused as a dependency, since it never gets completed"""
+    import task_manager
+    from undo_log import UndoLog
+    monkeypatch.setattr(task_manager, "history", UndoLog())
+
+    memory = {"tasks": []}
+    rent = add_task(memory, "Pay rent", due_date="2026-01-31", repeat="monthly")
+    other = add_task(memory, "One off")
+
+    assert add_task(memory, "After rent", depends_on=[rent["id"]]) is None
+    with pytest.raises(TaskValidationError) as error:
+        add_dependencies(memory, other["id"], [rent["id"]])
+    assert "repeats" in error.value.errors[0]
+    assert other.get("depends_on") is None
+
+def test_add_tasks_with_depends_on(monkeypatch):
+    """Test that imported tasks can wait on existing ones, with the same checks as add_dependencies"""
+    import task_manager
+    from undo_log import UndoLog
+    monkeypatch.setattr(task_manager, "history", UndoLog())
+
+    memory = {"tasks": []}
+    first = add_task(memory, "Write cover letter")
+    rent = add_task(memory, "Pay rent", due_date="2026-01-31", repeat="monthly")
+
+    # Abbreviated ids work, like in /task done
+    tasks = add_tasks(memory, [{"content": "Send application", "depends_on": [task_manager.display_id(first["id"])]}])
+    assert tasks[0]["depends_on"] == [first["id"]]
+    assert [t["id"] for t in ready_tasks(memory)] == [first["id"], rent["id"]]
+
+    with pytest.raises(TaskValidationError) as error:
+        add_tasks(memory, [
+            {"content": "Ok"},
+            {"content": "Missing", "depends_on": ["task_missing"]},
+            {"content": "Repeats", "depends_on": [rent["id"]]},
+            {"content": "Not a list", "depends_on": first["id"]},
+        ])
+    assert [e.split(":")[0] for e in error.value.errors] == ["Task 2", "Task 3", "Task 4"]
+    assert len(memory["tasks"]) == 3
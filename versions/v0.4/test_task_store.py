@@ -0,0 +1,153 @@
+"""
+Tests for the id-indexed TaskStore
+"""
+import json
+
+from task_store import TaskStore, task_store
+
+
+def make_task(task_id, content="Task"):
+    return {"id": task_id, "content": content, "completed": False}
+
+
+def test_lookup_and_order():
+    """Test that tasks are found by id and iterate oldest first"""
+    store = TaskStore([make_task("a"), make_task("b"), make_task("c")])
+
+    assert store.get("b")["id"] == "b"
+    assert store.get("missing") is None
+    assert "c" in store
+    assert [task["id"] for task in store] == ["a", "b", "c"]
+    assert store[0]["id"] == "a"
+    assert store[-1]["id"] == "c"
+
+
+def test_update_and_remove():
+    """Test that updating and removing by id leave the other tasks alone"""
+    store = TaskStore([make_task("a"), make_task("b"), make_task("c")])
+
+    assert store.update("b", completed=True)["completed"] == True
+    assert store.update("missing", completed=True) is None
+    assert store.remove("a")["id"] == "a"
+    assert store.remove("a") is None
+
+    assert [task["id"] for task in store] == ["b", "c"]
+    assert store.get("c")["completed"] == False
+
+
+def test_behaves_like_a_list():
+    """Test the list operations older code relies on"""
+    store = TaskStore()
+    store.append(make_task("a"))
+    store.append(make_task("b"))
+
+    assert len(store) == 2
+    assert store == [make_task("a"), make_task("b")]
+    assert store.pop(0)["id"] == "a"
+    assert json.dumps(store, default=list) == json.dumps([make_task("b")])
+
+
+def test_task_store_converts_plain_list():
+    """Test that a plain memory dict gets its list swapped for a TaskStore once"""
+    memory = {"tasks": [make_task("a")]}
+
+    store = task_store(memory)
+
+    assert isinstance(memory["tasks"], TaskStore)
+    assert task_store(memory) is store
+    assert store.get("a")["content"] == "Task"
+
+
+def test_list_tasks_uses_every_filter():
+    """Test that index queries combine filters and keep creation order"""
+    store = TaskStore([
+        {"id": "a", "category": "learning", "priority": "high", "due_date": "2026-01-10", "completed": False},
+        {"id": "b", "category": "personal", "priority": "high", "due_date": "2026-01-05", "completed": False},
+        {"id": "c", "category": "learning", "priority": "low", "due_date": None, "completed": False},
+        {"id": "d", "category": "learning", "priority": "high", "due_date": "2026-02-01", "completed": True},
+    ])
+
+    def ids(**filters):
+        return [task["id"] for task in store.list_tasks(**filters)]
+
+    assert ids(category="learning") == ["a", "c", "d"]
+    assert ids(category="learning", priority="high", completed=False) == ["a"]
+    assert ids(due_before="2026-01-10") == ["a", "b"]
+    assert ids(category="job_search") == []
+    assert len(ids()) == 4
+
+
+
+def test_iter_tasks_is_lazy():
+    """Test that iter_tasks hands out tasks one at a time, in the same order as list_tasks"""
+    store = TaskStore([make_task(str(number)) for number in range(5)])
+
+    tasks = store.iter_tasks(completed=False)
+    assert next(tasks)["id"] == "0"
+    assert [task["id"] for task in tasks] == ["1", "2", "3", "4"]
+
+    store.update("1", completed=True)
+    assert list(store.iter_tasks(completed=True)) == store.list_tasks(completed=True) == [store.get("1")]
+
+def test_reopened_task_goes_back_in_order():
+    """Test that a task coming back to a bucket is listed in creation order, and the bucket is only sorted once"""
+    store = TaskStore([make_task(str(number)) for number in range(5)])
+    store.update("1", completed=True)
+    store.update("1", completed=False)
+
+    assert [task["id"] for task in store.iter_tasks(completed=False)] == ["0", "1", "2", "3", "4"]
+    # Sorted back in place, so the next list streams it again
+    assert store._unordered == set()
+
+def test_indexes_follow_changes():
+    """Test that update, remove and reindex keep the indexes current"""
+    store = TaskStore([
+        {"id": "a", "category": "learning", "due_date": "2026-01-10", "completed": False},
+        {"id": "b", "category": "learning", "due_date": "2026-01-10", "completed": False},
+    ])
+
+    store.update("a", completed=True, due_date="2026-03-01")
+    assert [task["id"] for task in store.list_tasks(completed=False)] == ["b"]
+    assert [task["id"] for task in store.list_tasks(due_before="2026-01-31")] == ["b"]
+
+    store.remove("b")
+    assert store.list_tasks(category="learning") == [store.get("a")]
+
+    # Edited behind the store's back, then refiled
+    store.get("a")["category"] = "personal"
+    store.reindex(store.get("a"))
+    assert store.list_tasks(category="learning") == []
+    assert [task["id"] for task in store.list_tasks(category="personal")] == ["a"]
+
+
+def test_next_tasks_order():
+    """Test that next_tasks orders by due date, then priority, then age"""
+    order = ["urgent", "high", "medium", "low"]
+    store = TaskStore([
+        {"id": "a", "priority": "low", "due_date": None, "created_at": "1", "completed": False},
+        {"id": "b", "priority": "low", "due_date": "2026-01-02", "created_at": "2", "completed": False},
+        {"id": "c", "priority": "urgent", "due_date": "2026-01-02", "created_at": "3", "completed": False},
+        {"id": "d", "priority": None, "due_date": "2026-01-01", "created_at": "4", "completed": False},
+        {"id": "e", "priority": "high", "due_date": None, "created_at": "5", "completed": True},
+    ])
+
+    assert [task["id"] for task in store.next_tasks(10, order)] == ["d", "c", "b", "a"]
+    assert [task["id"] for task in store.next_tasks(2, order)] == ["d", "c"]
+
+
+def test_next_tasks_skips_stale_entries():
+    """Test that completed, deleted and rescheduled tasks are handled lazily"""
+    order = ["high", "low"]
+    store = TaskStore([
+        {"id": "a", "priority": "high", "due_date": "2026-01-01", "created_at": "1", "completed": False},
+        {"id": "b", "priority": "high", "due_date": "2026-01-02", "created_at": "2", "completed": False},
+        {"id": "c", "priority": "low", "due_date": "2026-01-03", "created_at": "3", "completed": False},
+    ])
+    assert store.next_tasks(1, order)[0]["id"] == "a"
+
+    store.update("a", completed=True)
+    store.remove("b")
+    store.update("c", due_date="2025-12-31")
+    store.add({"id": "d", "priority": "high", "due_date": "2026-01-01", "created_at": "4", "completed": False})
+
+    assert [task["id"] for task in store.next_tasks(5, order)] == ["c", "d"]
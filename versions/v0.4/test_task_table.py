@@ -0,0 +1,129 @@
+"""
+Tests for the column-oriented TaskTable
+"""
+import json
+
+import pytest
+
+import task_table
+from task_table import TaskTable
+
+
+def make_tasks():
+    return [
+        {"id": "a", "content": "Read chapter", "priority": "high", "category": "learning",
+         "due_date": "2026-01-10", "priority_reasoning": None, "completed": False,
+         "created_at": "1", "completed_at": None},
+        {"id": "b", "content": "Apply to job", "priority": "high", "category": "job_search",
+         "due_date": "2026-01-05", "priority_reasoning": "Deadline", "completed": False,
+         "created_at": "2", "completed_at": None},
+        {"id": "c", "content": "Watch lecture", "priority": "low", "category": "learning",
+         "due_date": None, "priority_reasoning": None, "completed": True,
+         "created_at": "3", "completed_at": "4", "source": "import"},
+    ]
+
+
+@pytest.fixture(params=["python", "numpy"])
+def filter_path(request, monkeypatch):
+    """Run a test with the pure-Python filters and, if it's installed, with NumPy"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(task_table, "np", None)
+    return request.param
+
+
+def ids(tasks):
+    return [task["id"] for task in tasks]
+
+
+def test_round_trips_tasks():
+    """Test that tasks come back exactly as they went in, extra fields included"""
+    table = TaskTable(make_tasks())
+
+    assert list(table) == make_tasks()
+    assert table.get("c")["source"] == "import"
+    assert json.loads(json.dumps(table, default=list)) == make_tasks()
+
+
+def test_filters(filter_path):
+    """Test that column filters combine like TaskStore.list_tasks"""
+    table = TaskTable(make_tasks())
+
+    assert ids(table.list_tasks(category="learning")) == ["a", "c"]
+    assert ids(table.list_tasks(priority="high", due_before="2026-01-07")) == ["b"]
+    assert ids(table.list_tasks(completed=False)) == ["a", "b"]
+    assert ids(table.list_tasks(category="personal")) == []
+    assert ids(table.list_tasks(due_before="not a date")) == []
+
+
+def test_iter_tasks(filter_path):
+    table = TaskTable(make_tasks())
+    tasks = table.iter_tasks(category="learning")
+    assert next(tasks)["id"] == "a"
+    assert ids(tasks) == ["c"]
+    assert list(table.iter_tasks(completed=False)) == table.list_tasks(completed=False)
+
+
+def test_changes_and_compaction(filter_path):
+    """Test update, remove, reindex and clearing out dead rows"""
+    table = TaskTable(make_tasks())
+
+    table.update("a", completed=True)
+    task = table.get("b")
+    task["category"] = "personal"
+    table.reindex(task)
+    assert ids(table.list_tasks(completed=False)) == ["b"]
+    assert ids(table.list_tasks(category="personal")) == ["b"]
+
+    for i in range(100):
+        table.add({"id": f"x{i}", "content": "filler", "completed": False})
+    for i in range(100):
+        table.remove(f"x{i}")
+
+    assert len(table) == 3
+    assert len(table._ids) < 100
+    assert ids(table.list_tasks(category="learning")) == ["a", "c"]
+
+
+def test_next_and_search():
+    """Test that scheduling and search work on the table too"""
+    table = TaskTable(make_tasks())
+
+    assert ids(table.next_tasks(5, ["high", "low"])) == ["b", "a"]
+    assert ids(table.search("deadline")) == ["b"]
+
+    table.remove("b")
+    assert table.search("deadline") == []
+
+
+def test_next_tasks_skips_stale_entries():
+    """Test that the scheduling heap handles completed, deleted and rescheduled tasks lazily"""
+    order = ["high", "low"]
+    table = TaskTable([
+        {"id": "a", "priority": "high", "due_date": "2026-01-01", "created_at": "1", "completed": False},
+        {"id": "b", "priority": "high", "due_date": "2026-01-02", "created_at": "2", "completed": False},
+        {"id": "c", "priority": "low", "due_date": "2026-01-03", "created_at": "3", "completed": False},
+    ])
+    assert ids(table.next_tasks(1, order)) == ["a"]
+
+    table.update("a", completed=True)
+    table.remove("b")
+    table.update("c", due_date="2025-12-31")
+    table.add({"id": "d", "priority": "high", "due_date": "2026-01-01", "created_at": "4", "completed": False})
+
+    assert ids(table.next_tasks(5, order)) == ["c", "d"]
+    assert ids(table.next_tasks(5, ["low", "high"])) == ["c", "d"]
+
+
+def test_created_between():
+    """Test time-range queries on the table"""
+    from datetime import datetime
+    from task_ids import IdGenerator
+
+    moment = datetime(2026, 1, 10, 9, 30)
+    table = TaskTable(make_tasks())
+    task = table.add({"id": IdGenerator(clock=moment.timestamp)(), "content": "New"})
+
+    assert ids(table.created_between(moment)) == [task["id"]]
+    assert table.created_between(end=moment) == []
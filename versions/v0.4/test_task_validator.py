@@ -0,0 +1,42 @@
+"""
+Tests for the precompiled task validator
+"""
+from task_validator import FieldError, TaskValidator, parse_due_date
+
+
+def make_validator():
+    return TaskValidator(["urgent", "high", "medium", "low"], ["learning", "personal"])
+
+
+def test_valid_task_has_no_errors():
+    """Test that a fully valid task passes"""
+    assert make_validator().check("Read chapter", "high", "learning", "2026-01-10") == []
+    assert make_validator().check("Read chapter") == []
+
+
+def test_errors_are_structured():
+    """Test that each problem names its field and value"""
+    errors = make_validator().check(" ", "super-high", "hobbies", "2026-13-01")
+
+    assert [error.field for error in errors] == ["content", "priority", "category", "due_date"]
+    assert errors[1] == FieldError("priority", "super-high",
+                                   "Invalid priority: super-high. Must be one of: ['urgent', 'high', 'medium', 'low']")
+    assert str(errors[3]) == "Invalid date format: 2026-13-01. Must be YYYY-MM-DD"
+
+
+def test_parse_due_date_only_takes_yyyy_mm_dd():
+    """Test that other ISO date forms are rejected"""
+    assert parse_due_date("2026-01-10").day == 10
+    assert parse_due_date("20260110") is None
+    assert parse_due_date("2026-02-30") is None
+    assert parse_due_date("2026-1-5") is None
+
+
+def test_repeat_rules():
+    """Test that repeat needs a known rule and a due date to start from"""
+    validator = make_validator()
+    assert validator.check("Stretch", due_date="2026-01-10", repeat="daily") == []
+    assert [e.field for e in validator.check("Stretch", due_date="2026-01-10", repeat="sometimes")] == ["repeat"]
+    assert [e.message for e in validator.check("Stretch", repeat="2w")] == [
+        "A repeating task needs a due date to start from"
+    ]
@@ -0,0 +1,56 @@
+"""
+Tests for the full-text task index
+"""
+from text_index import TextIndex, tokenize
+
+
+def ids(index, query):
+    return sorted(doc_id for _, doc_id in index.search(query))
+
+
+def test_tokenize():
+    """Test that text is split into lowercase words"""
+    assert tokenize("Finish CS50P week-4!") == ["finish", "cs50p", "week", "4"]
+    assert tokenize(None) == []
+
+
+def test_and_and_prefix_matching():
+    """Test that every term must match, each as a word or word prefix"""
+    index = TextIndex()
+    index.add("a", "Finish CS50P week 4")
+    index.add("b", "Week 5 reading for CS50P")
+    index.add("c", "Apply to weekend job")
+
+    assert ids(index, "cs50p") == ["a", "b"]
+    assert ids(index, "week") == ["a", "b", "c"]
+    assert ids(index, "cs50 wee") == ["a", "b"]
+    assert ids(index, "week finish") == ["a"]
+    assert ids(index, "missing") == []
+    assert ids(index, "") == []
+
+
+def test_whole_words_and_rare_words_rank_higher():
+    """Test the ranking of results"""
+    index = TextIndex()
+    index.add("exact", "plan week")
+    index.add("prefix", "plan weekend")
+    for i in range(10):
+        index.add(f"filler {i}", "plan")
+
+    ranked = sorted(index.search("plan week"), reverse=True)
+    assert [doc_id for _, doc_id in ranked] == ["exact", "prefix"]
+
+
+def test_reindex_and_discard():
+    """Test that changing and removing documents updates the postings"""
+    index = TextIndex()
+    index.add("a", "old words")
+    index.add("a", "new words")
+    index.add("b", "other")
+
+    assert ids(index, "old") == []
+    assert ids(index, "new") == ["a"]
+
+    index.discard("a")
+    assert ids(index, "words") == []
+    assert len(index) == 1
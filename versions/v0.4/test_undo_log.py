@@ -0,0 +1,48 @@
+"""
+Tests for the undo/redo log
+"""
+from undo_log import UndoLog
+
+
+def test_steps_group_changes():
+    """Test that changes inside step() undo together and outside it one at a time"""
+    log = UndoLog()
+    with log.step("add 2 tasks"):
+        log.record("a", None, {"id": "a"})
+        log.record("b", None, {"id": "b"})
+    log.record("a", {"id": "a"}, None, description="delete a")
+
+    assert log.undo().description == "delete a"
+    step = log.undo()
+    assert step.description == "add 2 tasks" and [change[0] for change in step.changes] == ["a", "b"]
+    assert log.undo() is None
+
+
+def test_records_are_copies():
+    log = UndoLog()
+    task = {"id": "a", "completed": False}
+    log.record("a", None, task)
+    task["completed"] = True
+    assert log.undo().changes[0][2] == {"id": "a", "completed": False}
+
+
+def test_new_change_clears_redo_and_limit_drops_oldest():
+    log = UndoLog(limit=2)
+    for task_id in "abc":
+        log.record(task_id, None, {"id": task_id})
+
+    assert log.undo().changes[0][0] == "c"
+    assert log.redo().changes[0][0] == "c"
+    log.undo()
+    log.record("d", None, {"id": "d"})
+    assert not log.can_redo()
+
+    assert [log.undo().changes[0][0] for _ in range(2)] == ["d", "b"]
+    assert not log.can_undo()
+
+
+def test_empty_step_is_not_kept():
+    log = UndoLog()
+    with log.step("nothing"):
+        pass
+    assert not log.can_undo()
@@ -0,0 +1,127 @@
+"""
+Full-text search for MZ tasks
+An inverted index from words to the tasks that contain them
+"""
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercase words in text, e.g. "Finish CS50P week-4" -> ["finish", "cs50p", "week", "4"]"""
+    return WORD.findall(text.lower()) if text else []
+
+
+class TextIndex:
+    """
+    Inverted index: word -> {task id: how many times it appears}.
+
+    Every word also goes in a sorted vocabulary list, so a query term can
+    match as a prefix ("cs" finds "cs50p") with a binary search instead of
+    checking every word. Each task's own word counts are kept too, which
+    is what lets a task be re-indexed or removed without a scan.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._vocabulary = []
+        self._words = {}
+
+    def __len__(self):
+        return len(self._words)
+
+    def add(self, doc_id, text):
+        """Index (or re-index) a document's text"""
+        words = Counter(tokenize(text))
+        old_words = self._words.get(doc_id, {})
+        if words == old_words:
+            return
+
+        for word in old_words:
+            if word not in words:
+                self._drop(word, doc_id)
+
+        for word, count in words.items():
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = {}
+                insort(self._vocabulary, word)
+            posting[doc_id] = count
+
+        self._words[doc_id] = words
+
+    def discard(self, doc_id):
+        """Remove a document from the index, if it's there"""
+        for word in self._words.pop(doc_id, {}):
+            self._drop(word, doc_id)
+
+    def _drop(self, word, doc_id):
+        posting = self._postings[word]
+        del posting[doc_id]
+        if not posting:
+            del self._postings[word]
+            del self._vocabulary[bisect_left(self._vocabulary, word)]
+
+    def _expand(self, term):
+        """Every indexed word that starts with term"""
+        vocabulary = self._vocabulary
+        words = []
+        position = bisect_left(vocabulary, term)
+        while position < len(vocabulary) and vocabulary[position].startswith(term):
+            words.append(vocabulary[position])
+            position += 1
+        return words
+
+    def search(self, query):
+        """
+        Find documents containing every term of the query.
+
+        Each term matches whole words and word prefixes. Documents are
+        scored by how often the matched words appear, weighted towards
+        rare words (idf), with whole-word matches counting double.
+
+        Args:
+            query: Search text, e.g. "cs50 week"
+
+        Returns:
+            List of (score, doc_id), in no particular order
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        expanded = [self._expand(term) for term in terms]
+        # Roughly how many documents each term could match
+        sizes = [sum(len(self._postings[word]) for word in words) for words in expanded]
+
+        # Start from the rarest term; the others only need checking against its matches
+        rarest = min(range(len(terms)), key=sizes.__getitem__)
+        candidates = set()
+        for word in expanded[rarest]:
+            candidates.update(self._postings[word])
+
+        # Per term: matched word -> weight
+        total = len(self._words)
+        term_weights = []
+        for term, words in zip(terms, expanded):
+            term_weights.append({
+                word: math.log(1 + total / len(self._postings[word])) * (2 if word == term else 1)
+                for word in words
+            })
+
+        results = []
+        for doc_id in candidates:
+            doc_words = self._words[doc_id].items()
+            score = 0.0
+            for weights in term_weights:
+                term_score = sum(weights.get(word, 0) * count for word, count in doc_words)
+                if not term_score:
+                    break
+                score += term_score
+            else:
+                results.append((score, doc_id))
+
+        return results
@@ -0,0 +1,108 @@
+"""
+Undo and redo for MZ task changes
+A log of what each change did, instead of copies of the whole memory
+"""
+from collections import deque
+from contextlib import contextmanager
+
+
+class Step:
+    """
+    One undoable action, e.g. "/task delete a1b2c3d4" or a whole /task import.
+
+    Attributes:
+        description: What was done, for messages like "Undid: ..."
+        changes: (task id, task before, task after) for each task touched,
+            in order. None for before means the task was added; None for
+            after means it was deleted.
+    """
+
+    __slots__ = ("description", "changes")
+
+    def __init__(self, description):
+        self.description = description
+        self.changes = []
+
+    def __repr__(self):
+        return f"Step({self.description!r}, {len(self.changes)} change(s))"
+
+
+class UndoLog:
+    """
+    Undo and redo stacks of Steps.
+
+    Each step keeps copies of just the tasks it changed, before and
+    after, so the log grows with the number of changes and not with the
+    number of tasks - hundreds of levels cost little even with a huge
+    task list. Undoing puts the "before" copies back; redoing puts the
+    "after" copies back. Only the last `limit` steps are kept.
+
+    Changes recorded inside `with log.step(...)` make up one step.
+    Changes recorded outside one are a step each.
+    """
+
+    def __init__(self, limit=200):
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+        self._open = None
+
+    @contextmanager
+    def step(self, description):
+        """Group every change recorded in the with block into one step"""
+        if self._open is not None:
+            # Already inside a step - it just carries on
+            yield self._open
+            return
+
+        self._open = Step(description)
+        try:
+            yield self._open
+        finally:
+            step, self._open = self._open, None
+            if step.changes:
+                self._push(step)
+
+    def record(self, task_id, before, after, description=None):
+        """
+        Note one task change. The tasks are copied, so later edits don't change the log.
+
+        Args:
+            task_id: The task's id
+            before: The task before the change (None if it was just added)
+            after: The task after the change (None if it was just deleted)
+            description: Used if this change isn't part of an open step
+        """
+        change = (task_id, dict(before) if before is not None else None, dict(after) if after is not None else None)
+        if self._open is not None:
+            self._open.changes.append(change)
+        else:
+            step = Step(description or f"change {task_id}")
+            step.changes.append(change)
+            self._push(step)
+
+    def _push(self, step):
+        self._undo.append(step)
+        # A new change starts a new branch of history, so what was undone can't be redone
+        self._redo.clear()
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        """Take the latest step off the undo stack (onto the redo stack). None if there's nothing to undo."""
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._redo.append(step)
+        return step
+
+    def redo(self):
+        """Take the latest undone step back onto the undo stack. None if there's nothing to redo."""
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._undo.append(step)
+        return step